@@ -0,0 +1,142 @@
+# rpa/benchmark.py
+
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from .desktop import VirtualDesktop, set_desktop
+from .player import play_session
+from .session_format import SESSION_EXTENSIONS
+from .session_stream import iter_events, screenshot_bytes
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
+
+# One JSON file per run, compared against the previous run
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "benchmarks")
+
+MIN_SCREEN = (1920, 1080)
+
+
+def build_scene(path):
+    """
+    Virtual desktop for a session: one window per recorded window title and
+    every click screenshot pasted where it was recorded, so playback finds it.
+    """
+    titles = []
+    sprites = []
+    width, height = MIN_SCREEN
+    for event in iter_events(path):
+        title = event.get("window")
+        if title and title != "Unknown" and title not in titles:
+            titles.append(title)
+        details = event["details"]
+        if event["action"] == "mouse_click" and details.get("pressed") and details.get("screenshot"):
+            image = cv2.imdecode(np.frombuffer(screenshot_bytes(details["screenshot"]), np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                sprites.append((image, details["x"], details["y"]))
+                width, height = max(width, details["x"] + 50), max(height, details["y"] + 50)
+
+    desktop = VirtualDesktop(width, height)
+    for title in titles:
+        desktop.add_window(title)
+    for image, x, y in sprites:
+        desktop.place(image, x, y)
+    return desktop
+
+
+def _summary(stats):
+    latencies = np.array([step["latency"] for step in stats["steps"]]) * 1000 if stats["steps"] else np.zeros(1)
+    return {
+        "steps": len(stats["steps"]),
+        "total_time": round(stats["total_time"], 4),
+        "step_latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "match_time": round(stats["match_time"], 4),
+        "matches": stats["matches"],
+        "matches_found": stats["matches_found"],
+        "focus_time": round(stats["focus_time"], 4),
+        "wait_time": round(stats["wait_time"], 4),
+    }
+
+
+def benchmark_session(path, mode="fast", speed=1.0):
+    """Play one session on its virtual desktop and return its timing summary."""
+    desktop = set_desktop(build_scene(path))
+    stats = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        play_session(path, mode=mode, speed=speed, stats=stats)
+    result = _summary(stats)
+    result["inputs"] = len(desktop.log)
+    return result
+
+
+def run(sessions_dir=SESSIONS_DIR, mode="fast", speed=1.0, results_dir=RESULTS_DIR):
+    """Benchmark every session and store the results as JSON; returns (results, path)."""
+    sessions = sorted(f for f in os.listdir(sessions_dir) if f.endswith(SESSION_EXTENSIONS))
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "mode": mode,
+        "speed": speed,
+        "sessions": {},
+    }
+    for name in sessions:
+        results["sessions"][name] = benchmark_session(os.path.join(sessions_dir, name), mode, speed)
+
+    os.makedirs(results_dir, exist_ok=True)
+    out_path = os.path.join(results_dir, f"bench_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    return results, out_path
+
+
+def latest_results(results_dir=RESULTS_DIR, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(results_dir, "bench_*.json")) if p != exclude)
+    if not paths:
+        return None
+    with open(paths[-1], "r") as f:
+        return json.load(f)
+
+
+def _change(new, old):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+
+def print_results(results, previous=None):
+    print(f"⏱️ Playback benchmark ({results['mode']}, {results['platform']})")
+    for name, r in results["sessions"].items():
+        lat = r["step_latency_ms"]
+        line = (f"  {name}: {r['steps']} steps in {r['total_time']:.3f}s | step p50 {lat['p50']:.2f} ms, "
+                f"p95 {lat['p95']:.2f} ms | match {r['match_time'] * 1000:.1f} ms "
+                f"({r['matches_found']}/{r['matches']}) | focus {r['focus_time'] * 1000:.1f} ms "
+                f"| waits {r['wait_time'] * 1000:.1f} ms")
+        old = (previous or {}).get("sessions", {}).get(name)
+        if old:
+            line += (f" | vs {previous['timestamp']}: total {_change(r['total_time'], old['total_time'])}, "
+                     f"p95 {_change(lat['p95'], old['step_latency_ms']['p95'])}")
+        print(line)
+
+
+# Usage: python -m RPA.benchmark [--mode fast|timed] [--speed N]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    mode = args[args.index("--mode") + 1] if "--mode" in args else "fast"
+    speed = float(args[args.index("--speed") + 1]) if "--speed" in args else 1.0
+    start = time.perf_counter()
+    results, out_path = run(mode=mode, speed=speed)
+    print_results(results, latest_results(exclude=out_path))
+    print(f"✅ Results saved to {out_path} ({time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,91 @@
+# rpa/conditions.py
+
+import time
+
+import numpy as np
+
+from .desktop import get_desktop
+from .frame_provider import get_provider
+from .template_matcher import locate_on_screen
+
+# Polling interval while waiting for a condition (seconds)
+POLL_INTERVAL = 0.05
+
+# Screen counts as stable when no more than this fraction of downsampled pixels changed
+STABLE_TOLERANCE = 0.001
+STABLE_PIXEL_DELTA = 8
+STABLE_DOWNSAMPLE = 8
+
+
+def wait_until(predicate, timeout, interval=POLL_INTERVAL, should_stop=None):
+    """
+    Poll `predicate()` until it returns something truthy or `timeout` expires.
+    Returns that value, or None on timeout (or when `should_stop()` becomes true).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result:
+            return result
+        if time.monotonic() >= deadline or (should_stop and should_stop()):
+            return None
+        time.sleep(interval)
+
+
+def active_window_title():
+    try:
+        return get_desktop().active_window()
+    except Exception:
+        return None
+
+
+def wait_for_window(title, timeout, should_stop=None):
+    """Wait until the foreground window's title contains `title`."""
+    if not title:
+        return True
+    return bool(wait_until(lambda: title in (active_window_title() or ""), timeout, should_stop=should_stop))
+
+
+def wait_for_template(img_data, timeout, hint=None, threshold=None, should_stop=None):
+    """Wait until a screenshot template is visible; returns its Match or None."""
+    provider = get_provider()
+
+    def visible():
+        provider.invalidate()  # need a fresh frame each poll
+        return locate_on_screen(img_data, hint=hint, threshold=threshold)
+
+    return wait_until(visible, timeout, should_stop=should_stop)
+
+
+def _thumbnail(image):
+    thumb = image[::STABLE_DOWNSAMPLE, ::STABLE_DOWNSAMPLE]
+    return thumb.mean(axis=2) if thumb.ndim == 3 else thumb.astype(np.float32)
+
+
+def screen_region(x, y, radius):
+    """(left, top, width, height) of a square around (x, y), clipped to the screen."""
+    left, top, width, height = get_provider().backend.bounds()
+    x0, y0 = max(left, int(x) - radius), max(top, int(y) - radius)
+    x1, y1 = min(left + width, int(x) + radius), min(top + height, int(y) + radius)
+    return (x0, y0, max(1, x1 - x0), max(1, y1 - y0))
+
+
+def wait_for_stable_screen(timeout, settle=0.1, should_stop=None, region=None):
+    """
+    Wait until two frames `settle` seconds apart are (almost) identical.
+    With `region`, only that part of the screen is compared, so a playing video
+    or animation elsewhere does not hold the wait up.
+    """
+    provider = get_provider()
+    previous = _thumbnail(provider.grab(region, max_age=0))
+
+    def stable():
+        nonlocal previous
+        time.sleep(settle)
+        current = _thumbnail(provider.grab(region, max_age=0))
+        changed = previous.shape != current.shape or \
+            float(np.mean(np.abs(current - previous) > STABLE_PIXEL_DELTA)) > STABLE_TOLERANCE
+        previous = current
+        return not changed
+
+    return bool(wait_until(stable, timeout, interval=0, should_stop=should_stop))
@@ -0,0 +1,347 @@
+# rpa/desktop.py
+
+import threading
+
+import numpy as np
+
+# Named keys pyautogui can press (anything else is silently ignored by it)
+KEY_NAMES = {
+    "accept", "add", "alt", "altleft", "altright", "apps", "backspace",
+    "browserback", "browserfavorites", "browserforward", "browserhome",
+    "browserrefresh", "browsersearch", "browserstop", "capslock", "clear",
+    "command", "convert", "ctrl", "ctrlleft", "ctrlright", "decimal", "del",
+    "delete", "divide", "down", "end", "enter", "esc", "escape", "execute",
+    "final", "fn", "hanguel", "hangul", "hanja", "help", "home", "insert",
+    "junja", "kana", "kanji", "launchapp1", "launchapp2", "launchmail",
+    "launchmediaselect", "left", "modechange", "multiply", "nexttrack",
+    "nonconvert", "numlock", "option", "optionleft", "optionright", "pagedown",
+    "pageup", "pause", "pgdn", "pgup", "playpause", "prevtrack", "print",
+    "printscreen", "prntscrn", "prtsc", "prtscr", "return", "right",
+    "scrolllock", "select", "separator", "shift", "shiftleft", "shiftright",
+    "sleep", "space", "stop", "subtract", "tab", "up", "volumedown",
+    "volumemute", "volumeup", "win", "winleft", "winright", "yen",
+} | {f"f{i}" for i in range(1, 25)} | {f"num{i}" for i in range(10)}
+
+
+# pynput key names (as recorded, without "Key.") that pyautogui spells differently
+KEY_ALIASES = {
+    "alt_l": "altleft", "alt_r": "altright", "alt_gr": "altright",
+    "ctrl_l": "ctrlleft", "ctrl_r": "ctrlright",
+    "shift_l": "shiftleft", "shift_r": "shiftright",
+    "cmd": "win", "cmd_l": "winleft", "cmd_r": "winright",
+    "page_down": "pagedown", "page_up": "pageup",
+    "caps_lock": "capslock", "num_lock": "numlock", "scroll_lock": "scrolllock",
+    "print_screen": "printscreen",
+    "media_play_pause": "playpause", "media_next": "nexttrack", "media_previous": "prevtrack",
+    "media_volume_up": "volumeup", "media_volume_down": "volumedown", "media_volume_mute": "volumemute",
+}
+
+
+def normalize_key(key):
+    """Recorded key ("a", "Key.ctrl_l") -> the name playback presses ("a", "ctrlleft")."""
+    if len(key) == 1:
+        return key
+    name = key.replace("Key.", "")
+    return KEY_ALIASES.get(name, name)
+
+
+def key_supported(key):
+    """True for single characters and named keys playback can press."""
+    return len(key) == 1 or key in KEY_NAMES
+
+
+def _check_key(key):
+    if not key_supported(key):
+        raise ValueError(f"Unsupported key: {key}")
+
+
+class SystemDesktop:
+    """
+    The real desktop: pyautogui for input, pygetwindow/win32gui for windows,
+    pywinauto for UI Automation. Everything is imported on first use.
+    """
+
+    name = "system"
+
+    def screen_backend(self):
+        from .frame_provider import default_backend
+        return default_backend()
+
+    def input_blocker(self):
+        from .input_blocker import InputBlocker
+        return InputBlocker()
+
+    # --- Input ---
+
+    def click(self, x, y, button="left"):
+        import pyautogui
+        pyautogui.click(x, y, button=button)
+
+    def scroll(self, dy, x, y):
+        import pyautogui
+        pyautogui.scroll(dy, x=x, y=y)
+
+    def key_down(self, key):
+        import pyautogui
+        _check_key(key)
+        pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        import pyautogui
+        _check_key(key)
+        pyautogui.keyUp(key)
+
+    def write(self, text, interval=0.0):
+        import pyautogui
+        pyautogui.write(text, interval=interval)
+
+    # --- Windows ---
+
+    def focus_window(self, title):
+        """Try to focus a window by its title (best-effort)."""
+        try:
+            import pygetwindow as gw
+            for w in gw.getWindowsWithTitle(title):
+                if not w.isActive:
+                    w.activate()
+                return True
+        except Exception:
+            pass
+        return False
+
+    def active_window(self):
+        """Title of the foreground window, or None."""
+        try:
+            import win32gui
+            return win32gui.GetWindowText(win32gui.GetForegroundWindow())
+        except Exception:
+            pass
+        try:
+            import pygetwindow as gw
+            window = gw.getActiveWindow()
+            return window.title if window else None
+        except Exception:
+            return None
+
+    def foreground_window(self):
+        """Cheap handle of the foreground window, resolved later with window_title()."""
+        try:
+            import win32gui
+            return win32gui.GetForegroundWindow()
+        except Exception:
+            return self.active_window()  # no handles without win32gui: take the title now
+
+    def window_title(self, handle):
+        if handle is None or isinstance(handle, str):
+            return handle
+        try:
+            import win32gui
+            return win32gui.GetWindowText(handle)
+        except Exception:
+            return None
+
+    def click_control(self, app_title, name):
+        """Click a named control through UI Automation."""
+        from pywinauto import Application
+        app = Application(backend="uia").connect(title_re=app_title)
+        app.window(title_re=app_title)[name].click_input()
+        return True
+
+
+class VirtualWindow:
+    __slots__ = ("title", "rect", "color", "controls")
+
+    def __init__(self, title, rect, color, controls=None):
+        self.title = title
+        self.rect = rect  # (left, top, width, height)
+        self.color = color  # BGR fill
+        self.controls = dict(controls or {})  # name -> (x, y)
+
+    def contains(self, x, y):
+        left, top, width, height = self.rect
+        return left <= x < left + width and top <= y < top + height
+
+
+class VirtualBlocker:
+    """InputBlocker stand-in; stop() plays the role of the user pressing ESC."""
+
+    def __init__(self):
+        self._stopped = False
+
+    def start_blocking(self):
+        self._stopped = False
+
+    def stop_blocking(self):
+        pass
+
+    def stop(self):
+        self._stopped = True
+
+    def is_stopped(self):
+        return self._stopped
+
+
+class VirtualDesktop:
+    """
+    Deterministic in-memory desktop: stacked windows, sprites pasted on the
+    screen, a cursor and a log of every input. It is also a frame_provider
+    backend, so the screen it renders is what template matching sees.
+    """
+
+    name = "virtual"
+
+    def __init__(self, width=1920, height=1080, seed=0):
+        rng = np.random.default_rng(seed)
+        # Textured background so pasted screenshots match in exactly one place
+        self._background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self.width = width
+        self.height = height
+        self.windows = []  # bottom -> top
+        self.sprites = []  # (left, top, image)
+        self.cursor = (width // 2, height // 2)
+        self.log = []
+        self.version = 0  # bumped whenever the rendered screen changes
+        self.blocker = VirtualBlocker()
+        self._frame = None
+        self._frame_version = -1
+        self._lock = threading.Lock()
+
+    # --- Scene setup ---
+
+    def add_window(self, title, rect=None, color=None, controls=None):
+        """Open a window on top (and focus it)."""
+        rect = rect or (0, 0, self.width, self.height)
+        if color is None:
+            seed = sum(title.encode("utf-8"))
+            color = (seed * 37 % 256, seed * 91 % 256, seed * 53 % 256)
+        window = VirtualWindow(title, rect, color, controls)
+        with self._lock:
+            self.windows.append(window)
+            self.version += 1
+        return window
+
+    def place(self, image, x, y):
+        """Paste a BGR image centred on (x, y), e.g. a recorded click screenshot."""
+        h, w = image.shape[:2]
+        with self._lock:
+            self.sprites.append((int(x) - w // 2, int(y) - h // 2, image[:, :, :3]))
+            self.version += 1
+
+    def _render(self):
+        frame = self._background.copy()
+        for window in self.windows:
+            left, top, width, height = window.rect
+            frame[max(0, top):top + height, max(0, left):left + width] = window.color
+        for left, top, image in self.sprites:
+            h, w = image.shape[:2]
+            x0, y0 = max(0, left), max(0, top)
+            x1, y1 = min(self.width, left + w), min(self.height, top + h)
+            if x1 > x0 and y1 > y0:
+                frame[y0:y1, x0:x1] = image[y0 - top:y1 - top, x0 - left:x1 - left]
+        return frame
+
+    # --- frame_provider backend ---
+
+    def screen_backend(self):
+        return self
+
+    def bounds(self):
+        return 0, 0, self.width, self.height
+
+    def grab(self, region):
+        with self._lock:
+            if self._frame_version != self.version:
+                self._frame = self._render()
+                self._frame_version = self.version
+            frame = self._frame
+        left, top, width, height = region
+        return frame[max(0, top):top + height, max(0, left):left + width]
+
+    # --- Input ---
+
+    def input_blocker(self):
+        return self.blocker
+
+    def click(self, x, y, button="left"):
+        self.cursor = (x, y)
+        self.log.append(("click", x, y, button))
+        for window in reversed(self.windows):
+            if window.contains(x, y):
+                self._raise(window)
+                break
+
+    def scroll(self, dy, x, y):
+        self.cursor = (x, y)
+        self.log.append(("scroll", dy, x, y))
+
+    def key_down(self, key):
+        _check_key(key)
+        self.log.append(("key_down", key))
+
+    def key_up(self, key):
+        _check_key(key)
+        self.log.append(("key_up", key))
+
+    def write(self, text, interval=0.0):
+        self.log.append(("write", text))
+
+    # --- Windows ---
+
+    def _raise(self, window):
+        with self._lock:
+            if self.windows and self.windows[-1] is window:
+                return
+            self.windows.remove(window)
+            self.windows.append(window)
+            self.version += 1
+
+    def focus_window(self, title):
+        for window in reversed(self.windows):
+            if title in window.title:
+                self._raise(window)
+                return True
+        return False
+
+    def active_window(self):
+        return self.windows[-1].title if self.windows else None
+
+    def foreground_window(self):
+        return self.windows[-1] if self.windows else None
+
+    def window_title(self, handle):
+        return handle.title if handle is not None else None
+
+    def click_control(self, app_title, name):
+        for window in reversed(self.windows):
+            if app_title in window.title and name in window.controls:
+                self._raise(window)
+                self.click(*window.controls[name])
+                return True
+        raise LookupError(f"No control '{name}' in '{app_title}'")
+
+
+# Process-wide desktop used by player/actions/recorder
+_desktop = None
+_desktop_lock = threading.Lock()
+
+
+def get_desktop():
+    global _desktop
+    with _desktop_lock:
+        if _desktop is None:
+            _desktop = SystemDesktop()
+        return _desktop
+
+
+def set_desktop(desktop, share_screen=True):
+    """
+    Replace the shared desktop (e.g. a VirtualDesktop for benchmarks or headless runs).
+    With share_screen=True the shared frame provider captures from it too.
+    """
+    global _desktop
+    with _desktop_lock:
+        _desktop = desktop
+    if share_screen:
+        from .frame_provider import FrameProvider, set_provider
+        set_provider(FrameProvider(desktop.screen_backend()))
+    return desktop
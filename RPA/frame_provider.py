@@ -0,0 +1,198 @@
+# rpa/frame_provider.py
+
+import threading
+import time
+
+import numpy as np
+
+# Frames younger than this are reused by every consumer (seconds)
+DEFAULT_MAX_AGE = 0.05
+
+
+class Frame:
+    """A captured screen image (BGR/BGRA, OpenCV channel order) and its screen position."""
+
+    __slots__ = ("image", "left", "top", "timestamp")
+
+    def __init__(self, image, left, top, timestamp):
+        self.image = image
+        self.left = left
+        self.top = top
+        self.timestamp = timestamp
+
+    @property
+    def origin(self):
+        return self.left, self.top
+
+    def crop(self, region):
+        """Zero-copy view of (left, top, width, height) in screen coordinates, clipped to the frame."""
+        left, top, width, height = region
+        height_px, width_px = self.image.shape[:2]
+        x0 = min(max(0, left - self.left), width_px)
+        y0 = min(max(0, top - self.top), height_px)
+        x1 = min(max(0, left + width - self.left), width_px)
+        y1 = min(max(0, top + height - self.top), height_px)
+        return Frame(self.image[y0:y1, x0:x1], self.left + x0, self.top + y0, self.timestamp)
+
+
+class MssBackend:
+    """Fast capture through mss; the BGRA buffer is wrapped without copying."""
+
+    name = "mss"
+
+    def __init__(self):
+        import mss  # noqa: F401 - fail early if unavailable
+        self._local = threading.local()
+
+    def _sct(self):
+        # mss handles are per-thread (GDI on Windows)
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def bounds(self):
+        monitor = self._sct().monitors[0]  # all monitors combined
+        return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+
+    def grab(self, region):
+        left, top, width, height = region
+        shot = self._sct().grab({"left": left, "top": top, "width": width, "height": height})
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+class PyAutoGuiBackend:
+    """Fallback through pyautogui/PIL (one RGB -> BGR conversion per capture)."""
+
+    name = "pyautogui"
+
+    def bounds(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return 0, 0, width, height
+
+    def grab(self, region):
+        import pyautogui
+        image = np.asarray(pyautogui.screenshot(region=region))
+        return image[:, :, ::-1]
+
+
+class FakeBackend:
+    """
+    In-memory backend for headless tests: serves a fixed frame,
+    or calls `source()` on each capture to get the current frame.
+    """
+
+    name = "fake"
+
+    def __init__(self, frame=None, source=None, left=0, top=0, capture_delay=0.0):
+        self.frame = frame
+        self.source = source
+        self.left = left
+        self.top = top
+        self.capture_delay = capture_delay
+        self.captures = 0
+
+    def _current(self):
+        return self.source() if self.source else self.frame
+
+    def bounds(self):
+        height, width = self._current().shape[:2]
+        return self.left, self.top, width, height
+
+    def grab(self, region):
+        self.captures += 1
+        if self.capture_delay:
+            time.sleep(self.capture_delay)
+        left, top, width, height = region
+        x0, y0 = left - self.left, top - self.top
+        return self._current()[y0:y0 + height, x0:x0 + width]
+
+
+def default_backend():
+    try:
+        return MssBackend()
+    except Exception:
+        return PyAutoGuiBackend()
+
+
+class FrameProvider:
+    """
+    Shared screen capture for the player, actions, recorder and YouTube watcher.
+    A full-screen frame is reused by every consumer while it is younger than
+    `max_age`; region requests are served as views into that frame.
+    """
+
+    def __init__(self, backend=None, max_age=DEFAULT_MAX_AGE):
+        self.backend = backend or default_backend()
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._frame = None
+        self.stats = {"requests": 0, "hits": 0, "captures": 0, "capture_time": 0.0, "last_capture_time": 0.0}
+
+    def _capture(self, region):
+        start = time.perf_counter()
+        image = self.backend.grab(region)
+        elapsed = time.perf_counter() - start
+        self.stats["captures"] += 1
+        self.stats["capture_time"] += elapsed
+        self.stats["last_capture_time"] = elapsed
+        return Frame(image, region[0], region[1], time.monotonic())
+
+    def capture(self, region=None, max_age=None):
+        """
+        Return a Frame of the whole screen or of `region` (left, top, width, height).
+        A cached full frame is reused if it is fresh enough; otherwise the screen is
+        captured again (full-screen requests refresh the shared frame).
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            self.stats["requests"] += 1
+            frame = self._frame
+            if frame is not None and time.monotonic() - frame.timestamp <= max_age:
+                self.stats["hits"] += 1
+                return frame.crop(region) if region else frame
+            if region is None:
+                self._frame = self._capture(self.backend.bounds())
+                return self._frame
+        # Region misses capture only the region and leave the shared frame alone
+        return self._capture(region)
+
+    def grab(self, region=None, max_age=None):
+        """Like capture(), but returns only the image array."""
+        return self.capture(region, max_age).image
+
+    def invalidate(self):
+        """Drop the cached frame (e.g. right after a click changed the screen)."""
+        with self._lock:
+            self._frame = None
+
+    def report(self):
+        info = dict(self.stats)
+        captures = info["captures"] or 1
+        info["avg_capture_ms"] = round(info["capture_time"] / captures * 1000, 2)
+        info["hit_rate"] = round(info["hits"] / info["requests"], 3) if info["requests"] else 0.0
+        info["backend"] = self.backend.name
+        return info
+
+
+# Process-wide provider shared by every consumer
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = FrameProvider()
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the shared provider (e.g. FrameProvider(FakeBackend(frame)) in tests)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    return provider
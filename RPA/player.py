@@ -1,58 +1,136 @@
-import json
 import time
-import pyautogui
 import os
-import base64
-import io
-from PIL import Image
-import pygetwindow as gw
-from .input_blocker import InputBlocker
+from .desktop import get_desktop
+from .session_compiler import plan_steps, compile_event
+from .template_matcher import locate_on_screen
+from .frame_provider import get_provider
+from .conditions import wait_for_window, wait_for_template, wait_for_stable_screen, screen_region
+
+# Minimum template-match confidence for screenshot-based clicks
+MATCH_CONFIDENCE = 0.85
+
+# Default speed for type_text steps (characters per second, None = no delay between keys)
+TYPE_RATE = None
+
+# Playback modes:
+#   "timed" - reproduce the recorded gaps (divided by `speed`)
+#   "fast"  - ignore recorded gaps, wait only until the next step is ready
+PLAYBACK_MODES = ("timed", "fast")
+
+# Max seconds a fast-mode step waits for its readiness condition before falling back
+STEP_TIMEOUT = 5.0
+
+# Fast mode: after a screen-changing step, only the area this far around the next target
+# (or the last one, for keys) has to stop changing, for at most STABLE_TIMEOUT seconds.
+# A playing video or a caret elsewhere then cannot stall every step.
+STABLE_RADIUS = 150
+STABLE_TIMEOUT = 1.0
+
+# Special keys after which the screen is expected to change
+SCREEN_CHANGING_KEYS = {"enter", "tab", "esc", "pagedown", "pageup"}
 
 
 def _focus_window(window_title):
     """Try to focus a window by its title (best-effort)."""
-    try:
-        for w in gw.getWindowsWithTitle(window_title):
-            if not w.isActive:
-                w.activate()
-            return True
-    except Exception:
-        pass
-    return False
+    return get_desktop().focus_window(window_title)
 
 
-def _find_image_on_screen(img_data):
-    """Try to locate a screenshot snippet on the screen."""
+def _find_image_on_screen(img_data, hint=None):
+    """
+    Try to locate a screenshot snippet on the screen.
+    Searches around `hint` (the recorded click position) first, then widens.
+    Returns a Match with .x/.y/.confidence, or None.
+    """
     try:
-        image_bytes = base64.b64decode(img_data)
-        img = Image.open(io.BytesIO(image_bytes))
-        location = pyautogui.locateOnScreen(img, confidence=0.85)
-        if location:
-            return pyautogui.center(location)
+        match = locate_on_screen(img_data, hint=hint, threshold=MATCH_CONFIDENCE)
+        if match:
+            print(f"🔍 Screenshot matched at ({match.x},{match.y}) "
+                  f"confidence={match.confidence:.2f} in {match.elapsed * 1000:.0f} ms")
+        return match
     except Exception as e:
         print(f"⚠️ Image match failed: {e}")
     return None
 
 
-def play_session(file_path, llm_instructions=None, dry_run=False):
+def _sleep(seconds, stopped, interval=0.05):
+    """Sleep for `seconds`, waking early (returns True) once `stopped()` is true."""
+    deadline = time.monotonic() + seconds
+    while not stopped():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+    return True
+
+
+def _new_stats():
+    return {"steps": [], "match_time": 0.0, "matches": 0, "matches_found": 0,
+            "focus_time": 0.0, "wait_time": 0.0, "total_time": 0.0}
+
+
+def play_session(file_path, llm_instructions=None, dry_run=False, type_rate=TYPE_RATE,
+                 mode="timed", speed=1.0, step_timeout=STEP_TIMEOUT, stats=None, should_stop=None):
     """
-    Replays a recorded session from a JSON file.
+    Replays a recorded session from a JSON or compact binary (.rpab) file.
     Uses window info, image matching, or coordinates as fallbacks.
     Supports 'dry_run' mode for simulation/testing without actual clicks/typing.
+    `type_text` steps are written in bulk at `type_rate` characters/second
+    (None = as fast as possible); the time saved shifts later steps earlier.
+
+    The session is played from its compiled execution plan (see session_compiler.py),
+    cached on disk until the file changes. `llm_instructions` maps event indices to
+    "skip" or a replacement event; a click is addressed by its release event.
+
+    mode="timed" keeps the recorded gaps, scaled down by `speed` (2.0 = twice as fast).
+    mode="fast" skips recorded gaps and, before each step, only waits (up to
+    `step_timeout` seconds) for the target window to be focused or the click's
+    screenshot to be visible, and (up to STABLE_TIMEOUT) for the area around
+    the target to settle after the previous action.
+
+    A click is performed on its release, located with the screenshot the
+    recorder stored on the matching press (releases carry none of their own).
+
+    Input and windows go through the shared desktop backend (see desktop.py).
+    Pass a dict as `stats` to collect per-step latency, template-match,
+    window-focus, readiness-wait and total times.
+
+    Playback stops when ESC is pressed or, if given, when `should_stop()` returns
+    true (e.g. a cancelled task); both are checked between steps and during waits.
+    Returns True if the session ran to the end.
     """
-    with open(file_path, "r") as f:
-        events = json.load(f)
+    if mode not in PLAYBACK_MODES:
+        raise ValueError(f"Unknown playback mode '{mode}' (expected one of {PLAYBACK_MODES})")
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    # Readiness waits need a real screen; dry runs never touch it
+    fast_wait = mode == "fast" and not dry_run
+    # Cached plan when the session is unchanged, otherwise compiled as playback reaches each step
+    call_time = time.perf_counter()
+    steps = plan_steps(file_path)
+    desktop = get_desktop()
+    if stats is not None:
+        stats.update(_new_stats())
 
     print(f"▶️ Replaying session from {file_path}... (Press ESC to stop)")
-    blocker = InputBlocker()
+    blocker = desktop.input_blocker()
+
+    def stopped():
+        return blocker.is_stopped() or bool(should_stop and should_stop())
+
     blocker.start_blocking()
     start_time = time.time()
-    last_clicks = {}
+    first_action_reported = False
+    time_saved = 0.0  # recorded time skipped by bulk-typing text
+    screen_dirty = False  # previous step is expected to have changed the screen
+    last_target = None  # (x, y) of the last click or scroll
+    completed = True
 
-    for idx, event in enumerate(events):
-        if blocker.is_stopped():
-            print("⏹️ Stopped by user.")
+    for step in steps:
+        if stopped():
+            print("⏹️ Stopped by user." if blocker.is_stopped() else "⏹️ Playback cancelled.")
+            completed = False
             break
+        idx = step["index"]
 
         # --- LLM Override Hook ---
         if llm_instructions:
@@ -61,99 +139,142 @@ def play_session(file_path, llm_instructions=None, dry_run=False):
                 print(f"⏭️ Skipping step {idx}")
                 continue
             elif isinstance(action_override, dict):
-                event = action_override
+                step = compile_event(action_override, idx, step.get("template"))
+                if step is None:
+                    continue
+
+        if not first_action_reported:
+            # Load/parse overhead only; the recorded delay before the step is not included
+            first_action_reported = True
+            print(f"⏱️ Time to first action: {(time.perf_counter() - call_time) * 1000:.1f} ms")
+
+        etype = step["action"]
 
         # --- Timing ---
-        delay = event["time"] - (time.time() - start_time)
-        if delay > 0:
-            time.sleep(delay)
-
-        etype = event["action"]
-        details = event["details"]
-        tag = details.get("tag")
-        desc = details.get("description")
+        if mode == "timed":
+            delay = (step["time"] - time_saved) / speed - (time.time() - start_time)
+            if delay > 0 and _sleep(delay, stopped):
+                print("⏹️ Stopped by user." if blocker.is_stopped() else "⏹️ Playback cancelled.")
+                completed = False
+                break
+        step_start = time.perf_counter()  # step latency excludes recorded gaps
+        if fast_wait and screen_dirty:
+            # Let the previous action finish redrawing where the next one acts
+            target = (step["x"], step["y"]) if "x" in step else last_target
+            region = screen_region(*target, STABLE_RADIUS) if target else None
+            if not wait_for_stable_screen(STABLE_TIMEOUT, should_stop=stopped, region=region):
+                print(f"⚠️ Screen still changing after {STABLE_TIMEOUT}s, continuing")
+            screen_dirty = False
+            if stats is not None:
+                stats["wait_time"] += time.perf_counter() - step_start
+
+        tag = step.get("tag")
+        desc = step.get("description")
         if tag or desc:
             print(f"📝 Step {idx}: {tag or ''} {desc or ''}".strip())
 
-        # === Mouse Clicks ===
+        # === Mouse Clicks (press/release merged by the compiler) ===
         if etype == "mouse_click":
-            x, y = details["x"], details["y"]
-            button = details["button"].split(".")[-1]
-            pressed = details.get("pressed", False)
-
-            if not pressed:  # only handle release to perform click
-                pos = None
-                action_desc = f"Click at ({x},{y}) with {button}"
-                
-                # Try window focus
-                if details.get("window") and _focus_window(details["window"]):
-                    pos = (x, y)
-                    action_desc += f" in window '{details['window']}'"
-                # Try screenshot matching
-                elif details.get("screenshot"):
-                    center_pos = _find_image_on_screen(details["screenshot"])
-                    if center_pos:
-                        pos = (center_pos.x, center_pos.y)
-                        action_desc += " using screenshot match"
-                    else:
-                        print("⚠️ Screenshot not found, using raw coords")
-                        pos = (x, y)
+            x, y = step["x"], step["y"]
+            button = step["button"]
+            template = step["template"]
+            pos = None
+            action_desc = f"Click at ({x},{y}) with {button}"
+
+            if fast_wait and step["focus"]:
+                focus_start = time.perf_counter()
+                _focus_window(step["focus"])
+                if not wait_for_window(step["focus"], step_timeout, should_stop=stopped):
+                    print(f"⚠️ Window '{step['focus']}' not focused after {step_timeout}s")
+                if stats is not None:
+                    stats["focus_time"] += time.perf_counter() - focus_start
+
+            # Try window focus
+            if step["window"] and _focus_window(step["window"]):
+                pos = (x, y)
+                action_desc += f" in window '{step['window']}'"
+            # Try screenshot matching
+            elif template is not None:
+                match_start = time.perf_counter()
+                if fast_wait:
+                    center_pos = wait_for_template(template, step_timeout, hint=(x, y),
+                                                   threshold=MATCH_CONFIDENCE, should_stop=stopped)
+                else:
+                    center_pos = _find_image_on_screen(template, hint=(x, y))
+                if stats is not None:
+                    stats["match_time"] += time.perf_counter() - match_start
+                    stats["matches"] += 1
+                    stats["matches_found"] += bool(center_pos)
+                if center_pos:
+                    pos = (center_pos.x, center_pos.y)
+                    action_desc += " using screenshot match"
                 else:
+                    print("⚠️ Screenshot not found, using raw coords")
                     pos = (x, y)
+            else:
+                pos = (x, y)
 
-                if dry_run:
-                    print(f"[DRY RUN] Would {action_desc}")
-                else:
-                    pyautogui.click(pos[0], pos[1], button=button)
+            if dry_run:
+                print(f"[DRY RUN] Would {action_desc}")
+            else:
+                desktop.click(pos[0], pos[1], button=button)
+                get_provider().invalidate()  # the click changed the screen
+                screen_dirty = True
+                last_target = pos
+                if mode == "timed":
                     time.sleep(0.1)
 
         # === Mouse Scroll ===
         elif etype == "mouse_scroll":
-            dx, dy = details.get("dx", 0), details.get("dy", 0)
+            dx, dy = step["dx"], step["dy"]
             if dry_run:
-                print(f"[DRY RUN] Would scroll dx={dx}, dy={dy} at ({details['x']},{details['y']})")
+                print(f"[DRY RUN] Would scroll dx={dx}, dy={dy} at ({step['x']},{step['y']})")
             else:
-                pyautogui.scroll(dy, x=details["x"], y=details["y"])
-                time.sleep(0.05)
+                desktop.scroll(dy, step["x"], step["y"])
+                screen_dirty = True
+                last_target = (step["x"], step["y"])
+                if mode == "timed":
+                    time.sleep(0.05)
 
         # === Keyboard Input ===
-        elif etype == "key_press":
-            key = details["key"]
-            if len(key) == 1:
-                if dry_run:
-                    print(f"[DRY RUN] Would press key '{key}'")
-                else:
-                    pyautogui.keyDown(key)
+        elif etype in ("key_press", "key_release"):
+            name = step["name"]
+            verb = "press" if etype == "key_press" else "release"
+            if dry_run:
+                print(f"[DRY RUN] Would {verb} {'special key' if step['special'] else 'key'} '{name}'")
             else:
-                special_key = key.replace("Key.", "")
-                if dry_run:
-                    print(f"[DRY RUN] Would press special key '{special_key}'")
-                else:
-                    try:
-                        pyautogui.keyDown(special_key)
-                    except Exception:
-                        print(f"⚠️ Unsupported key: {key}")
-
-        elif etype == "key_release":
-            key = details["key"]
-            if len(key) == 1:
-                if dry_run:
-                    print(f"[DRY RUN] Would release key '{key}'")
-                else:
-                    pyautogui.keyUp(key)
+                try:
+                    if etype == "key_press":
+                        desktop.key_down(name)
+                        screen_dirty = screen_dirty or name in SCREEN_CHANGING_KEYS
+                    else:
+                        desktop.key_up(name)
+                except Exception:
+                    print(f"⚠️ Unsupported key: {step['key']}")
+
+        # === Typed text (coalesced key presses) ===
+        elif etype == "type_text":
+            text = step["text"]
+            if dry_run:
+                print(f"[DRY RUN] Would type text '{text}'")
+                typing_time = 0.0
             else:
-                special_key = key.replace("Key.", "")
-                if dry_run:
-                    print(f"[DRY RUN] Would release special key '{special_key}'")
-                else:
-                    try:
-                        pyautogui.keyUp(special_key)
-                    except Exception:
-                        print(f"⚠️ Unsupported key: {key}")
+                typing_start = time.time()
+                desktop.write(text, interval=(1.0 / type_rate) if type_rate else 0.0)
+                typing_time = time.time() - typing_start
+            time_saved += max(0.0, step["duration"] - typing_time)
 
         # === Future: LLM Action ===
         elif etype == "llm_action":
-            print(f"🤖 LLM action: {details['command']}")
+            print(f"🤖 LLM action: {step['command']}")
+
+        if stats is not None:
+            stats["steps"].append({"index": idx, "action": etype,
+                                   "latency": round(time.perf_counter() - step_start, 6)})
 
     blocker.stop_blocking()
-    print("✅ Session finished.")
\ No newline at end of file
+    if stats is not None:
+        stats["total_time"] = time.perf_counter() - call_time
+    if completed:
+        print("✅ Session finished.")
+    return completed
@@ -1,56 +1,158 @@
 import json
 import time
 import os
+import queue
+import threading
 from pynput import mouse, keyboard
 from datetime import datetime
-import pyautogui
-import win32gui  # for window titles
-import io
+import cv2
+import numpy as np
 import base64
+from .session_format import JSON_EXT, BINARY_EXT, save_events
+from .desktop import get_desktop
+from .frame_provider import get_provider
+from .text_macros import coalesce_typing
 
 SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
 os.makedirs(SESSIONS_DIR, exist_ok=True)
 
+# Crash-safe event log written while recording (one JSON event per line)
+LOG_EXT = ".jsonl"
+
+# Flush the log to disk at least this often (seconds)
+LOG_FSYNC_INTERVAL = 0.5
+
+# Sentinel telling the worker that recording ended
+_STOP = object()
+
+
+def _iter_log(log_path):
+    """Yield the events of a JSONL recording log (stops at a torn last line after a crash)."""
+    with open(log_path, "r") as log:
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+
+def _write_json_session(events, out_path):
+    """Stream events into the regular indented JSON session format."""
+    with open(out_path, "w") as out:
+        out.write("[")
+        first = True
+        for event in events:
+            body = json.dumps(event, indent=2).replace("\n", "\n  ")
+            out.write(("\n  " if first else ",\n  ") + body)
+            first = False
+        out.write("\n]" if not first else "]")
+
+
+def _counted(events, stats, key):
+    for event in events:
+        stats[key] += 1
+        yield event
+
+
+def finalize_log(log_path, out_path=None, coalesce=True, stats=None):
+    """
+    Turn a recording log into a session file (format from the extension of out_path).
+    With coalesce=True, runs of typed characters become single type_text events.
+    Also used to recover a session from the log left behind by a crashed recording.
+    Pass a dict as `stats` to get the number of logged and saved events.
+    """
+    out_path = out_path or os.path.splitext(log_path)[0] + JSON_EXT
+    stats = {} if stats is None else stats
+    stats.update(logged=0, saved=0)
+    events = _counted(_iter_log(log_path), stats, "logged")
+    if coalesce:
+        events = coalesce_typing(events)
+    events = _counted(events, stats, "saved")
+    if out_path.endswith(BINARY_EXT):
+        save_events(list(events), out_path)
+    else:
+        _write_json_session(events, out_path)
+    return out_path
+
+
 class Recorder:
-    def __init__(self):
-        self.events = []
+    """
+    Records mouse/keyboard input into a session.
+    The pynput callbacks only take what must be read at that instant (time,
+    foreground window handle, raw pixels under a click) and queue it; a worker
+    thread resolves window titles, encodes screenshots and appends each event
+    to an on-disk log, which becomes the session file when ESC is pressed.
+    """
+
+    def __init__(self, file_format=JSON_EXT, coalesce_typing=True):
+        self.file_format = file_format  # ".json" or ".rpab" (compact binary)
+        self.coalesce_typing = coalesce_typing  # merge typed characters into type_text events
         self.start_time = None
         self.next_tag = None  # manual tag for next action
+        self.event_count = 0  # events in the saved session (after typing is coalesced)
+        self.logged_count = 0  # raw events written to the log
+        self._queue = queue.Queue()
+        self._worker = None
+        self._log = None
+        self._last_fsync = 0.0
 
-    def _get_active_window(self):
-        """Return title of the currently active window."""
+    def _window_title(self, handle):
+        """Title of the window that was in front when the event happened."""
         try:
-            hwnd = win32gui.GetForegroundWindow()
-            return win32gui.GetWindowText(hwnd)
+            return get_desktop().window_title(handle) or "Unknown"
         except Exception:
             return "Unknown"
 
-    def _take_screenshot(self, x, y):
-        """Capture a small 50x50 screenshot around (x, y) and encode in base64."""
+    def _encode_screenshot(self, snippet):
+        """PNG-encode the pixels grabbed in the hook, as base64."""
+        if snippet is None:
+            return None
         try:
-            box = (x - 25, y - 25, 50, 50)  # 50x50 area
-            screenshot = pyautogui.screenshot(region=box)
-            buffer = io.BytesIO()
-            screenshot.save(buffer, format="PNG")
-            return base64.b64encode(buffer.getvalue()).decode("utf-8")
+            ok, png = cv2.imencode(".png", np.ascontiguousarray(snippet))
+            if not ok:
+                raise ValueError("PNG encoding failed")
+            return base64.b64encode(png.tobytes()).decode("utf-8")
         except Exception as e:
             print(f"⚠️ Screenshot failed: {e}")
             return None
 
     def _get_new_session_file(self):
-        """Always create a new JSON file for the session."""
-        filename = f"session_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+        """Always create a new session file (JSON or compact binary)."""
+        filename = f"session_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{self.file_format}"
         return os.path.join(SESSIONS_DIR, filename)
 
-    def _record_event(self, action, details):
-        timestamp = time.time() - self.start_time
-        window = self._get_active_window()
+    # --- Hook side: must stay cheap ---
 
+    def _foreground(self):
+        try:
+            return get_desktop().foreground_window()
+        except Exception:
+            return None
+
+    def _grab(self, x, y):
+        """Raw 50x50 pixels around (x, y) as they are at the click; encoding happens on the worker."""
+        try:
+            # Shared provider: reuses a frame captured a few ms earlier instead of grabbing again
+            return np.array(get_provider().grab(region=(x - 25, y - 25, 50, 50))[:, :, :3])
+        except Exception as e:
+            print(f"⚠️ Screenshot failed: {e}")
+            return None
+
+    def _enqueue(self, action, details, snippet=None):
+        """Called from input hooks: timestamp, foreground window and raw pixels, then queue."""
+        self._queue.put((time.time(), action, details, self._foreground(), snippet))
+
+    # --- Worker side ---
+
+    def _build_event(self, timestamp, action, details, window):
         event = {
-            "time": round(timestamp, 3),
+            "time": round(timestamp - self.start_time, 3),
             "action": action,
             "details": details,
-            "window": window,
+            "window": self._window_title(window),
         }
 
         # Add description
@@ -67,33 +169,56 @@ class Recorder:
         if self.next_tag:
             event["tag"] = self.next_tag
             self.next_tag = None
+        return event
 
-        self.events.append(event)
+    def _append(self, event):
+        self._log.write(json.dumps(event) + "\n")
+        self.logged_count += 1
+        now = time.monotonic()
+        if now - self._last_fsync >= LOG_FSYNC_INTERVAL:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._last_fsync = now
+
+    def _process(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            timestamp, action, details, window, snippet = item
+            try:
+                if action == "tag_request":
+                    self.next_tag = input("🏷 Enter tag for next action: ")
+                    print(f"✅ Tag '{self.next_tag}' will be applied to the next event.")
+                    continue
+                if action == "mouse_click":
+                    details["screenshot"] = self._encode_screenshot(snippet)
+                self._append(self._build_event(timestamp, action, details, window))
+            except Exception as e:
+                print(f"⚠️ Failed to record {action}: {e}")
+        self._log.flush()
+        os.fsync(self._log.fileno())
 
     def record(self):
+        filepath = self._get_new_session_file()
+        log_path = os.path.splitext(filepath)[0] + LOG_EXT
+        self._log = open(log_path, "w")
         self.start_time = time.time()
+        self._worker = threading.Thread(target=self._process, daemon=True, name="recorder-worker")
+        self._worker.start()
         print("🎥 Recording started... Press ESC to stop, F2 to tag next action.")
 
         # --- Mouse ---
         def on_click(x, y, button, pressed):
-            screenshot_data = None
-            if pressed:
-                screenshot_data = self._take_screenshot(x, y)
-
-            details = {
+            self._enqueue("mouse_click", {
                 "x": x,
                 "y": y,
                 "button": str(button),
                 "pressed": pressed,
-                "screenshot": screenshot_data,
-            }
-            self._record_event("mouse_click", details)
+            }, self._grab(x, y) if pressed else None)
 
         def on_scroll(x, y, dx, dy):
-            self._record_event(
-                "mouse_scroll",
-                {"x": x, "y": y, "dx": dx, "dy": dy},
-            )
+            self._enqueue("mouse_scroll", {"x": x, "y": y, "dx": dx, "dy": dy})
 
         # --- Keyboard ---
         def on_press(key):
@@ -102,13 +227,12 @@ class Recorder:
             except AttributeError:
                 k = str(key)
 
-            # F2 = tagging mode
+            # F2 = tagging mode (prompted on the worker, not in the hook)
             if k == "Key.f2":
-                self.next_tag = input("🏷 Enter tag for next action: ")
-                print(f"✅ Tag '{self.next_tag}' will be applied to the next event.")
+                self._enqueue("tag_request", None)
                 return
 
-            self._record_event("key_press", {"key": k})
+            self._enqueue("key_press", {"key": k})
 
             if key == keyboard.Key.esc:  # stop recording
                 return False
@@ -118,7 +242,7 @@ class Recorder:
                 k = key.char
             except AttributeError:
                 k = str(key)
-            self._record_event("key_release", {"key": k})
+            self._enqueue("key_release", {"key": k})
 
         mouse_listener = mouse.Listener(on_click=on_click, on_scroll=on_scroll)
         keyboard_listener = keyboard.Listener(on_press=on_press, on_release=on_release)
@@ -128,14 +252,18 @@ class Recorder:
         keyboard_listener.join()  # wait until ESC pressed
         mouse_listener.stop()
 
-        # --- Save session to new file ---
-        filepath = self._get_new_session_file()
-        with open(filepath, "w") as f:
-            json.dump(self.events, f, indent=2)
+        # --- Drain the queue, then turn the log into the session file ---
+        self._queue.put(_STOP)
+        self._worker.join()
+        self._log.close()
+        counts = {}
+        finalize_log(log_path, filepath, coalesce=self.coalesce_typing, stats=counts)
+        os.remove(log_path)
+        self.event_count = counts["saved"]
 
-        print(f"✅ Session saved: {filepath}")
+        print(f"✅ Session saved: {filepath} ({self.event_count} events, {counts['logged']} recorded)")
         return filepath
 
 
 if __name__ == "__main__":
-    Recorder().record()
\ No newline at end of file
+    Recorder().record()
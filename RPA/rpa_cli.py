@@ -1,21 +1,47 @@
 import os
-from recorder import Recorder
-from player import play_session
+import sys
+import time
+from .session_format import SESSION_EXTENSIONS
 
 SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "RPA/sessions")
 os.makedirs(SESSIONS_DIR, exist_ok=True)
 
+
+def validate(update_plans=False, workers=None):
+    """Dry-run every session in parallel (headless: input and screen are stubbed)."""
+    from .validator import validate_sessions, print_report
+
+    start = time.perf_counter()
+    reports = validate_sessions(SESSIONS_DIR, workers=workers, update_plans=update_plans)
+    if not reports:
+        print("⚠️ No sessions found.")
+        return True
+    print_report(reports, time.perf_counter() - start)
+    return all(r["ok"] for r in reports)
+
+
+# Usage: python -m RPA.rpa_cli              (interactive)
+#        python -m RPA.rpa_cli validate [--update-plans] [--workers N]
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "validate":
+        args = sys.argv[2:]
+        workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+        sys.exit(0 if validate("--update-plans" in args, workers) else 1)
+
     print("🤖 Omega RPA CLI")
     print("1. Record session")
     print("2. Play session")
-    choice = input("Choose option (1/2): ").strip()
+    print("3. Recover interrupted recording")
+    print("4. Validate all sessions (dry-run)")
+    choice = input("Choose option (1/2/3/4): ").strip()
 
     if choice == "1":
+        from .recorder import Recorder
         Recorder().record()
     elif choice == "2":
+        from .player import play_session
         sessions = [
-            f for f in os.listdir(SESSIONS_DIR) if f.endswith(".json")
+            f for f in os.listdir(SESSIONS_DIR) if f.endswith(SESSION_EXTENSIONS)
         ]
         if not sessions:
             print("⚠️ No sessions found.")
@@ -23,4 +49,17 @@ if __name__ == "__main__":
             for i, s in enumerate(sessions):
                 print(f"{i+1}. {s}")
             sel = int(input("Select session number: ")) - 1
-            play_session(os.path.join(SESSIONS_DIR, sessions[sel]))
\ No newline at end of file
+            fast = input("Fast mode (skip recorded delays)? (y/N): ").strip().lower() == "y"
+            play_session(os.path.join(SESSIONS_DIR, sessions[sel]), mode="fast" if fast else "timed")
+    elif choice == "3":
+        from .recorder import finalize_log, LOG_EXT
+        logs = [f for f in os.listdir(SESSIONS_DIR) if f.endswith(LOG_EXT)]
+        if not logs:
+            print("⚠️ No interrupted recordings found.")
+        else:
+            for log in logs:
+                log_path = os.path.join(SESSIONS_DIR, log)
+                print(f"✅ Recovered: {finalize_log(log_path)}")
+                os.remove(log_path)
+    elif choice == "4":
+        validate()
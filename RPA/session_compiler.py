@@ -0,0 +1,228 @@
+# rpa/session_compiler.py
+
+import hashlib
+import os
+import pickle
+
+from .desktop import normalize_key
+from .session_format import SESSION_EXTENSIONS
+from .session_stream import iter_events
+from .template_matcher import get_matcher
+
+# Compiled plans, one file per session path; a plan is valid while the file's
+# size/mtime (or, when those changed, its content hash) match. Plans of sessions
+# that are gone are pruned by compile_all().
+PLAN_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".plan_cache")
+PLAN_EXT = ".plan"
+
+# Bump when the step layout changes so stale cached plans are recompiled
+COMPILER_VERSION = 2
+
+
+def session_hash(path):
+    """SHA-256 of the session file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _focus_target(event):
+    window = event.get("window")
+    return window if window and window != "Unknown" else None
+
+
+def _template(screenshot):
+    if not screenshot:
+        return None
+    try:
+        return get_matcher().prepare(screenshot)
+    except Exception as e:
+        print(f"⚠️ Could not decode screenshot: {e}")
+        return None
+
+
+def compile_event(event, index, template=None):
+    """
+    Resolve one event into a playback step. Clicks become a single "click" step
+    (the release), carrying `template` decoded from the matching press.
+    Returns None for events that do nothing on their own (presses).
+    """
+    action = event["action"]
+    details = event["details"]
+    step = {
+        "index": index,
+        "time": event["time"],
+        "action": action,
+        "tag": details.get("tag"),
+        "description": details.get("description"),
+    }
+    if action == "mouse_click":
+        if details.get("pressed", False):
+            return None
+        step.update({
+            "x": details["x"],
+            "y": details["y"],
+            "button": details["button"].split(".")[-1],
+            "template": _template(details.get("screenshot")) or template,
+            "window": details.get("window"),
+            "focus": _focus_target(event),
+        })
+    elif action == "mouse_scroll":
+        step.update({"x": details["x"], "y": details["y"], "dx": details.get("dx", 0), "dy": details.get("dy", 0)})
+    elif action in ("key_press", "key_release"):
+        key = details["key"]
+        step.update({"key": key, "name": normalize_key(key), "special": len(key) != 1})
+    elif action == "type_text":
+        step.update({"text": details["text"], "duration": details.get("duration", 0.0)})
+    elif action == "llm_action":
+        step["command"] = details["command"]
+    return step
+
+
+def compile_events(events):
+    """Yield the execution plan for an event stream: press/release pairs merged, keys and templates resolved."""
+    pressed = {}  # button -> decoded template of the pending press
+    for index, event in enumerate(events):
+        details = event["details"]
+        if event["action"] == "mouse_click" and details.get("pressed", False):
+            pressed[details["button"]] = _template(details.get("screenshot"))
+            continue
+        template = pressed.pop(details["button"], None) if event["action"] == "mouse_click" else None
+        step = compile_event(event, index, template)
+        if step is not None:
+            yield step
+
+
+def _plan_path(session_path, cache_dir):
+    # Keyed on the full path so same-named sessions in different folders keep separate plans
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(session_path)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(session_path)}.{key}{PLAN_EXT}")
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _save_plan(session_path, digest, stamp, steps, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _plan_path(session_path, cache_dir)
+    tmp = path + ".tmp"
+    # A small header first, so pruning can check a plan's source without loading its steps
+    header = {"version": COMPILER_VERSION, "source": os.path.abspath(session_path), "hash": digest, "stamp": stamp}
+    with open(tmp, "wb") as f:
+        pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(steps, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_header(f):
+    header = pickle.load(f)
+    return header if isinstance(header, dict) and header.get("version") == COMPILER_VERSION else None
+
+
+def load_plan(session_path, cache_dir=PLAN_CACHE_DIR):
+    """
+    Cached steps for the session as it is on disk now, or None. The file is only
+    hashed when its size or mtime differ from the cached plan's (e.g. after a copy).
+    """
+    try:
+        with open(_plan_path(session_path, cache_dir), "rb") as f:
+            header = _read_header(f)
+            if header is None:
+                return None
+            steps = pickle.load(f)
+        stamp = _file_stamp(session_path)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if tuple(header.get("stamp", ())) == stamp:
+        return steps
+    if header.get("hash") != session_hash(session_path):
+        return None
+    try:
+        _save_plan(session_path, header["hash"], stamp, steps, cache_dir)  # same content, new stamp
+    except OSError:
+        pass
+    return steps
+
+
+def compile_session(session_path, cache_dir=PLAN_CACHE_DIR):
+    """Compile a session and cache the plan; returns the steps."""
+    stamp = _file_stamp(session_path)
+    steps = list(compile_events(iter_events(session_path)))
+    _save_plan(session_path, session_hash(session_path), stamp, steps, cache_dir)
+    return steps
+
+
+def plan_steps(session_path, cache_dir=PLAN_CACHE_DIR):
+    """
+    Yield the session's execution plan. An unchanged session is served from the
+    cache; otherwise steps are compiled as they are consumed, and the plan is
+    cached (with the file's hash) once the last one has been produced.
+    """
+    steps = load_plan(session_path, cache_dir)
+    if steps is not None:
+        yield from steps
+        return
+    stamp = _file_stamp(session_path)
+    steps = []
+    for step in compile_events(iter_events(session_path)):
+        steps.append(step)
+        yield step
+    try:
+        if _file_stamp(session_path) == stamp:  # not re-recorded while it played
+            _save_plan(session_path, session_hash(session_path), stamp, steps, cache_dir)
+    except OSError as e:
+        print(f"⚠️ Could not cache plan: {e}")
+
+
+def prune_plans(cache_dir=PLAN_CACHE_DIR):
+    """
+    Delete cached plans whose session file is gone (moved, renamed or deleted), plans of
+    other compiler versions and leftover temp files. Returns how many were removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(PLAN_EXT):
+            try:
+                with open(path, "rb") as f:
+                    header = _read_header(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                header = None
+            if header is not None and os.path.exists(header["source"]):
+                continue
+        elif not name.endswith(".tmp"):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def compile_all(sessions_dir, cache_dir=PLAN_CACHE_DIR):
+    """
+    Precompile every session whose cached plan is missing or stale, and prune plans of
+    sessions that no longer exist; returns how many were compiled.
+    """
+    compiled = 0
+    for name in sorted(os.listdir(sessions_dir)):
+        path = os.path.join(sessions_dir, name)
+        if not name.endswith(SESSION_EXTENSIONS) or load_plan(path, cache_dir) is not None:
+            continue
+        try:
+            compile_session(path, cache_dir)
+            compiled += 1
+        except Exception as e:
+            print(f"⚠️ Could not compile {name}: {e}")
+    pruned = prune_plans(cache_dir)
+    if pruned:
+        print(f"🧹 Removed {pruned} orphaned plan(s)")
+    return compiled
@@ -0,0 +1,325 @@
+# rpa/session_format.py
+
+import base64
+import binascii
+import json
+import os
+import struct
+
+import numpy as np
+
+# Compact columnar session file (".rpab"):
+#   MAGIC | uint32 version | uint32 header length | JSON header | 8-byte aligned column arrays
+# The header holds the interned string table and the offset/dtype of every column,
+# so the whole file is read once and each column is a numpy view over that buffer.
+MAGIC = b"OMEGARPA"
+VERSION = 1
+BINARY_EXT = ".rpab"
+JSON_EXT = ".json"
+SESSION_EXTENSIONS = (JSON_EXT, BINARY_EXT)
+
+_PREFIX = struct.Struct("<8sII")
+
+# Presence flags per event
+HAS_X = 1 << 0
+HAS_Y = 1 << 1
+HAS_DX = 1 << 2
+HAS_DY = 1 << 3
+HAS_PRESSED = 1 << 4
+PRESSED = 1 << 5
+HAS_SCREENSHOT = 1 << 6
+RAW_EVENT = 1 << 7      # event did not fit the columns; stored verbatim in "raw"
+
+# String columns: index into the string table, or one of these markers
+STR_ABSENT = -1
+STR_NONE = -2
+
+# Screenshot length markers
+SHOT_NONE = -1
+SHOT_BASE64_TEXT = -2   # not canonical base64: kept as text in the string table
+
+COLUMNS = {
+    "time": "<f8",
+    "action": "<i4",
+    "flags": "<u2",
+    "x": "<i4",
+    "y": "<i4",
+    "dx": "<i4",
+    "dy": "<i4",
+    "button": "<i4",
+    "key": "<i4",
+    "window": "<i4",
+    "description": "<i4",
+    "tag": "<i4",
+    "shot_offset": "<i8",
+    "shot_length": "<i8",
+}
+
+_INT_FIELDS = (("x", HAS_X), ("y", HAS_Y), ("dx", HAS_DX), ("dy", HAS_DY))
+_DETAIL_STR_FIELDS = ("button", "key")
+_EVENT_STR_FIELDS = ("window", "description", "tag")
+_KNOWN_EVENT_KEYS = {"time", "action", "details", "window", "description", "tag"}
+_KNOWN_DETAIL_KEYS = {"x", "y", "dx", "dy", "button", "pressed", "screenshot", "key"}
+_INT32 = (-2 ** 31, 2 ** 31 - 1)
+
+
+def is_binary_session(path):
+    return str(path).lower().endswith(BINARY_EXT)
+
+
+def _is_int(value):
+    return type(value) is int and _INT32[0] <= value <= _INT32[1]
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def intern(self, value):
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+
+def _fits_columns(event):
+    """True if the event can be stored in typed columns without losing anything."""
+    if not isinstance(event, dict) or set(event) - _KNOWN_EVENT_KEYS:
+        return False
+    if type(event.get("time")) not in (int, float) or not isinstance(event.get("action"), str):
+        return False
+    details = event.get("details")
+    if not isinstance(details, dict) or set(details) - _KNOWN_DETAIL_KEYS:
+        return False
+    if type(event["time"]) is int:
+        return False  # would come back as float
+    for name, _flag in _INT_FIELDS:
+        if name in details and not _is_int(details[name]):
+            return False
+    if "pressed" in details and type(details["pressed"]) is not bool:
+        return False
+    for name in _DETAIL_STR_FIELDS:
+        if name in details and not (details[name] is None or isinstance(details[name], str)):
+            return False
+    for name in _EVENT_STR_FIELDS:
+        if name in event and not (event[name] is None or isinstance(event[name], str)):
+            return False
+    shot = details.get("screenshot")
+    if shot is not None and not isinstance(shot, str):
+        return False
+    return True
+
+
+def encode_session(events):
+    """Encode a list of session events into the compact binary format (bytes)."""
+    n = len(events)
+    cols = {name: np.zeros(n, dtype=dtype) for name, dtype in COLUMNS.items()}
+    for name in ("button", "key", "window", "description", "tag"):
+        cols[name][:] = STR_ABSENT
+    strings = _StringTable()
+    blobs = bytearray()
+    raw = {}
+
+    def str_index(value):
+        return STR_NONE if value is None else strings.intern(value)
+
+    for i, event in enumerate(events):
+        if not _fits_columns(event):
+            cols["flags"][i] = RAW_EVENT
+            cols["action"][i] = strings.intern(str(event.get("action", ""))) if isinstance(event, dict) else 0
+            raw[str(i)] = event
+            continue
+
+        details = event["details"]
+        flags = 0
+        cols["time"][i] = event["time"]
+        cols["action"][i] = strings.intern(event["action"])
+        for name, flag in _INT_FIELDS:
+            if name in details:
+                cols[name][i] = details[name]
+                flags |= flag
+        if "pressed" in details:
+            flags |= HAS_PRESSED | (PRESSED if details["pressed"] else 0)
+        for name in _DETAIL_STR_FIELDS:
+            if name in details:
+                cols[name][i] = str_index(details[name])
+        for name in _EVENT_STR_FIELDS:
+            if name in event:
+                cols[name][i] = str_index(event[name])
+        if "screenshot" in details:
+            flags |= HAS_SCREENSHOT
+            shot = details["screenshot"]
+            if shot is None:
+                cols["shot_length"][i] = SHOT_NONE
+            else:
+                try:
+                    data = base64.b64decode(shot, validate=True)
+                    canonical = base64.b64encode(data).decode("ascii") == shot
+                except (binascii.Error, ValueError):
+                    canonical = False
+                if canonical:
+                    cols["shot_offset"][i] = len(blobs)
+                    cols["shot_length"][i] = len(data)
+                    blobs += data
+                else:
+                    cols["shot_offset"][i] = strings.intern(shot)
+                    cols["shot_length"][i] = SHOT_BASE64_TEXT
+        cols["flags"][i] = flags
+
+    header = {"count": n, "strings": strings.strings, "raw": raw, "columns": {}}
+    body = bytearray()
+    for name, array in cols.items():
+        body += b"\0" * (-len(body) % 8)
+        header["columns"][name] = {"dtype": array.dtype.str, "offset": len(body)}
+        body += array.tobytes()
+    body += b"\0" * (-len(body) % 8)
+    header["blobs"] = {"offset": len(body), "length": len(blobs)}
+    body += blobs
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-(len(header_bytes) + _PREFIX.size) % 8)
+    return _PREFIX.pack(MAGIC, VERSION, len(header_bytes)) + header_bytes + bytes(body)
+
+
+class ColumnarSession:
+    """
+    A binary session loaded with a single read.
+    Columns are numpy views over the file buffer; `strings` is the interned string table.
+    """
+
+    def __init__(self, buffer):
+        magic, version, header_len = _PREFIX.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an Omega binary session")
+        if version != VERSION:
+            raise ValueError(f"Unsupported session format version {version}")
+        start = _PREFIX.size + header_len
+        header = json.loads(bytes(buffer[_PREFIX.size:start]).decode("utf-8"))
+        self.count = header["count"]
+        self.strings = header["strings"]
+        self.raw = {int(k): v for k, v in header["raw"].items()}
+        self.columns = {
+            name: np.frombuffer(buffer, dtype=spec["dtype"], count=self.count, offset=start + spec["offset"])
+            for name, spec in header["columns"].items()
+        }
+        blob_start = start + header["blobs"]["offset"]
+        self.blobs = memoryview(buffer)[blob_start:blob_start + header["blobs"]["length"]]
+
+    def __len__(self):
+        return self.count
+
+    def string(self, idx):
+        idx = int(idx)
+        return None if idx == STR_NONE else self.strings[idx]
+
+    def action(self, i):
+        return self.strings[int(self.columns["action"][i])]
+
+    def screenshot_bytes(self, i):
+        """Raw PNG bytes of event i's screenshot (no base64), or None."""
+        length = int(self.columns["shot_length"][i])
+        if length < 0:
+            return None
+        offset = int(self.columns["shot_offset"][i])
+        return self.blobs[offset:offset + length].tobytes()
+
+    def event(self, i, lazy_screenshots=False):
+        """
+        Rebuild event i exactly as it appears in the JSON format.
+        With lazy_screenshots=True a screenshot is returned as a callable yielding PNG bytes.
+        """
+        if i in self.raw:
+            return self.raw[i]
+        c = self.columns
+        flags = int(c["flags"][i])
+        details = {}
+        for name, flag in _INT_FIELDS:
+            if flags & flag:
+                details[name] = int(c[name][i])
+        if c["button"][i] != STR_ABSENT:
+            details["button"] = self.string(c["button"][i])
+        if flags & HAS_PRESSED:
+            details["pressed"] = bool(flags & PRESSED)
+        if flags & HAS_SCREENSHOT:
+            length = int(c["shot_length"][i])
+            if length == SHOT_NONE:
+                details["screenshot"] = None
+            elif length == SHOT_BASE64_TEXT:
+                details["screenshot"] = self.strings[int(c["shot_offset"][i])]
+            elif lazy_screenshots:
+                details["screenshot"] = lambda i=i: self.screenshot_bytes(i)
+            else:
+                details["screenshot"] = base64.b64encode(self.screenshot_bytes(i)).decode("utf-8")
+        if c["key"][i] != STR_ABSENT:
+            details["key"] = self.string(c["key"][i])
+
+        event = {"time": float(c["time"][i]), "action": self.action(i), "details": details}
+        for name in _EVENT_STR_FIELDS:
+            if c[name][i] != STR_ABSENT:
+                event[name] = self.string(c[name][i])
+        return event
+
+    def to_events(self):
+        return [self.event(i) for i in range(self.count)]
+
+    def release(self):
+        """Drop the views into the buffer so it can be closed (e.g. an mmap)."""
+        self.blobs.release()
+        self.columns = {}
+
+
+def load_binary(path):
+    with open(path, "rb") as f:
+        return ColumnarSession(f.read())
+
+
+def save_binary(events, path):
+    data = encode_session(events)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def load_events(path):
+    """Load session events from either format."""
+    if is_binary_session(path):
+        return load_binary(path).to_events()
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_events(events, path):
+    """Save session events in the format implied by the file extension."""
+    if is_binary_session(path):
+        return save_binary(events, path)
+    with open(path, "w") as f:
+        json.dump(events, f, indent=2)
+    return path
+
+
+def json_to_binary(json_path, out_path=None):
+    out_path = out_path or os.path.splitext(json_path)[0] + BINARY_EXT
+    return save_events(load_events(json_path), out_path)
+
+
+def binary_to_json(bin_path, out_path=None):
+    out_path = out_path or os.path.splitext(bin_path)[0] + JSON_EXT
+    return save_events(load_events(bin_path), out_path)
+
+
+# ✅ Simple CLI: convert between formats and check the round trip
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m rpa.session_format <session.json|session.rpab> [output]")
+        sys.exit(1)
+
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else None
+    out = binary_to_json(src, dst) if is_binary_session(src) else json_to_binary(src, dst)
+    lossless = load_events(src) == load_events(out)
+    print(f"✅ {src} ({os.path.getsize(src)} bytes) -> {out} ({os.path.getsize(out)} bytes), "
+          f"lossless: {lossless}")
@@ -0,0 +1,237 @@
+# rpa/session_index.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from .session_format import SESSION_EXTENSIONS
+from .session_stream import iter_events
+
+# Same acceptance rule as the old process.extractOne lookup
+MATCH_THRESHOLD = 80
+
+# Phrases rescored with the full fuzzy scorer after the n-gram prefilter
+CANDIDATES = 32
+
+NGRAM = 3
+
+# Rescan the sessions directory at most this often (seconds)
+REFRESH_INTERVAL = 1.0
+
+
+def _process(text):
+    """Same normalisation as fuzzywuzzy's full_process: lowercase alphanumerics, single spaces."""
+    from fuzzywuzzy import utils
+    return utils.full_process(text, force_ascii=True)
+
+
+def _score(query, phrase):
+    from fuzzywuzzy import fuzz
+    return fuzz.WRatio(query, phrase, force_ascii=True, full_process=False)
+
+
+def _grams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class FuzzyIndex:
+    """
+    Character n-gram inverted index over phrases.
+    A lookup scores every phrase at once by n-gram overlap (one bincount over the
+    posting lists), then rescores only the best CANDIDATES with fuzzywuzzy's WRatio,
+    so scores and thresholds mean the same as with process.extractOne. With at most
+    CANDIDATES phrases the result is exactly extractOne's.
+    """
+
+    def __init__(self, candidates=CANDIDATES):
+        self.candidates = candidates
+        self._phrases = []            # id -> processed phrase
+        self._keys = []               # id -> payload
+        self._alive = []              # id -> still indexed
+        self._sizes = []              # id -> number of distinct n-grams
+        self._postings = {}           # n-gram -> [ids]
+        self._arrays = {}             # n-gram -> np.array(ids), rebuilt lazily
+        self._by_key = {}             # payload -> [ids]
+        self._dead = 0
+        self.stats = {"lookups": 0, "rescored": 0, "lookup_time": 0.0}
+
+    def __len__(self):
+        return len(self._phrases) - self._dead
+
+    def add(self, phrase, key):
+        processed = _process(phrase)
+        if not processed:
+            return
+        phrase_id = len(self._phrases)
+        grams = _grams(processed)
+        self._phrases.append(processed)
+        self._keys.append(key)
+        self._alive.append(True)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(phrase_id)
+            self._arrays.pop(gram, None)
+        self._by_key.setdefault(key, []).append(phrase_id)
+
+    def remove(self, key):
+        """Drop every phrase of `key` (tombstoned; compacted when too many are dead)."""
+        for phrase_id in self._by_key.pop(key, []):
+            self._alive[phrase_id] = False
+            self._dead += 1
+        if self._dead > 64 and self._dead > len(self._phrases) // 2:
+            self._compact()
+
+    def _compact(self):
+        live = [(self._phrases[i], self._keys[i]) for i in range(len(self._phrases)) if self._alive[i]]
+        stats = self.stats
+        self.__init__(self.candidates)
+        self.stats = stats
+        for processed, key in live:
+            self.add(processed, key)
+
+    def phrases(self):
+        return [p for p, alive in zip(self._phrases, self._alive) if alive]
+
+    def _posting(self, gram):
+        array = self._arrays.get(gram)
+        if array is None:
+            array = self._arrays[gram] = np.array(self._postings[gram], dtype=np.int32)
+        return array
+
+    def search(self, query):
+        """Best (phrase, key, score) for `query`, or None."""
+        start = time.perf_counter()
+        self.stats["lookups"] += 1
+        try:
+            processed = _process(query)
+            if not processed or not len(self):
+                return None
+            grams = [g for g in _grams(processed) if g in self._postings]
+            count = len(self._phrases)
+            alive = np.array(self._alive, dtype=bool)
+            if count <= self.candidates:
+                ids = np.flatnonzero(alive)
+            elif not grams:
+                return None
+            else:
+                shared = np.bincount(np.concatenate([self._posting(g) for g in grams]), minlength=count)
+                # Either side may be contained in the other ("run idu" vs "idu", WRatio's partial scores)
+                overlap = np.maximum(shared / np.array(self._sizes), shared / len(_grams(processed)))
+                overlap[~alive] = -1
+                ids = np.argpartition(-overlap, self.candidates)[:self.candidates]
+                ids = np.sort(ids[overlap[ids] > 0])
+            best = None
+            for phrase_id in ids:
+                score = _score(processed, self._phrases[phrase_id])
+                if best is None or score > best[2]:
+                    best = (self._phrases[phrase_id], self._keys[phrase_id], score)
+            self.stats["rescored"] += len(ids)
+            return best
+        finally:
+            self.stats["lookup_time"] += time.perf_counter() - start
+
+
+def _session_name(filename):
+    return os.path.splitext(filename)[0].replace("_", " ").replace("-", " ")
+
+
+def _session_tags(path):
+    tags = set()
+    try:
+        for event in iter_events(path):
+            tag = event.get("tag") or event.get("details", {}).get("tag")
+            if tag:
+                tags.add(tag)
+    except Exception as e:
+        print(f"⚠️ Could not read tags from {os.path.basename(path)}: {e}")
+    return tags
+
+
+class SessionIndex:
+    """
+    Voice lookup over the sessions directory: every session is indexed by its
+    file name ("defense_matrix.json" -> "defense matrix") and its recorded tags,
+    plus optional fixed aliases. Files added, changed or removed are picked up
+    incrementally on the next lookup.
+    """
+
+    def __init__(self, sessions_dir, aliases=None, refresh_interval=REFRESH_INTERVAL):
+        self.sessions_dir = sessions_dir
+        self.aliases = dict(aliases or {})  # phrase -> session file name
+        self.refresh_interval = refresh_interval
+        self.index = FuzzyIndex()
+        self._files = {}  # session stem -> {file name: mtime}
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self.version = 0  # bumped whenever a refresh changes the indexed phrases
+        for phrase, filename in self.aliases.items():
+            self.index.add(phrase, os.path.splitext(filename)[0])
+
+    def _scan(self):
+        found = {}
+        with os.scandir(self.sessions_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(SESSION_EXTENSIONS):
+                    stem = os.path.splitext(entry.name)[0]
+                    found.setdefault(stem, {})[entry.name] = entry.stat().st_mtime
+        return found
+
+    def refresh(self, force=False):
+        """Re-index sessions whose files appeared, changed or disappeared. Returns the number re-indexed."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return 0
+            self._last_refresh = now
+            found = self._scan() if os.path.isdir(self.sessions_dir) else {}
+            changed = 0
+            for stem in set(self._files) - set(found):
+                self.index.remove(stem)
+                del self._files[stem]
+                changed += 1
+            for stem, files in found.items():
+                if self._files.get(stem) == files:
+                    continue
+                self.index.remove(stem)
+                phrases = {_session_name(stem)}
+                for name in files:
+                    phrases |= _session_tags(os.path.join(self.sessions_dir, name))
+                for phrase in self.aliases:
+                    if os.path.splitext(self.aliases[phrase])[0] == stem:
+                        phrases.add(phrase)
+                for phrase in sorted(phrases):
+                    self.index.add(phrase, stem)
+                self._files[stem] = files
+                changed += 1
+            if changed:
+                self.version += 1
+            return changed
+
+    def session_file(self, stem):
+        """Path of a session (JSON preferred, then the compact binary copy), or None."""
+        for ext in SESSION_EXTENSIONS:
+            path = os.path.join(self.sessions_dir, stem + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def lookup(self, command, threshold=MATCH_THRESHOLD):
+        """Return (matched phrase, session path, score) if the best score reaches `threshold`, else None."""
+        self.refresh()
+        with self._lock:
+            best = self.index.search(command)
+        if best is None or best[2] < threshold:
+            return None
+        phrase, stem, score = best
+        path = self.session_file(stem)
+        return (phrase, path, score) if path else None
+
+    def phrases(self, refresh=True):
+        """Indexed phrases; with refresh=False, what is indexed already (no disk access)."""
+        if refresh:
+            self.refresh()
+        with self._lock:
+            return self.index.phrases()
@@ -0,0 +1,138 @@
+# rpa/session_stream.py
+
+import base64
+import io
+import json
+import mmap
+
+from .session_format import ColumnarSession, is_binary_session
+
+# Initial read size for JSON sessions; doubled while a single event does not fit
+CHUNK_SIZE = 64 * 1024
+
+
+class LazyScreenshot:
+    """
+    Screenshot payload that is only decoded when a step actually uses it.
+    Wraps either a base64 string (JSON sessions) or a loader returning PNG bytes (binary sessions).
+    """
+
+    __slots__ = ("_b64", "_loader", "_png")
+
+    def __init__(self, b64=None, loader=None):
+        self._b64 = b64
+        self._loader = loader
+        self._png = None
+
+    def png_bytes(self):
+        if self._png is None:
+            self._png = self._loader() if self._loader else base64.b64decode(self._b64)
+        return self._png
+
+    def image(self):
+        from PIL import Image
+        return Image.open(io.BytesIO(self.png_bytes()))
+
+    def b64(self):
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.png_bytes()).decode("utf-8")
+        return self._b64
+
+
+def screenshot_bytes(payload):
+    """PNG bytes for a screenshot given as LazyScreenshot or base64 string."""
+    if isinstance(payload, LazyScreenshot):
+        return payload.png_bytes()
+    return base64.b64decode(payload)
+
+
+def _iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array while reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def more(size):
+        nonlocal buf, pos, eof
+        data = f.read(size)
+        if not data:
+            eof = True
+        buf = buf[pos:] + data
+        pos = 0
+
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of session file")
+            more(chunk_size)
+            continue
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Session file must contain a JSON array of events")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more(chunk_size)
+            chunk_size *= 2
+            continue
+        if end >= len(buf) and not eof:
+            # A scalar could continue past the buffer; read on before trusting it
+            more(chunk_size)
+            continue
+        pos = end
+        yield item
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def _lazy_json_event(event):
+    details = event.get("details") if isinstance(event, dict) else None
+    if isinstance(details, dict) and isinstance(details.get("screenshot"), str):
+        details["screenshot"] = LazyScreenshot(b64=details["screenshot"])
+    return event
+
+
+def _iter_binary_events(path):
+    with open(path, "rb") as f:
+        # The mapping outlives the file handle; pages are only read as events are touched
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    session = ColumnarSession(buffer)
+    try:
+        for i in range(len(session)):
+            event = session.event(i, lazy_screenshots=True)
+            details = event.get("details")
+            if isinstance(details, dict) and callable(details.get("screenshot")):
+                details["screenshot"] = LazyScreenshot(loader=details["screenshot"])
+            yield event
+    finally:
+        session.release()
+        try:
+            buffer.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes when it is collected
+
+
+def iter_events(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield session events one at a time, in file order, from either format.
+    Screenshot payloads are wrapped in LazyScreenshot and decoded on first use;
+    for binary sessions that must happen before iteration ends, when the file is unmapped.
+    """
+    if is_binary_session(path):
+        yield from _iter_binary_events(path)
+        return
+    with open(path, "r") as f:
+        for event in _iter_json_array(f, chunk_size):
+            yield _lazy_json_event(event)
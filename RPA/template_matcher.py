@@ -0,0 +1,260 @@
+# rpa/template_matcher.py
+
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .frame_provider import get_provider
+
+# Default search settings
+DEFAULT_THRESHOLD = 0.85
+ROI_RADII = (120, 480)                   # widened in this order, then the full screen
+SCALES = (1.0, 1.25, 1.5, 0.8, 2.0)      # template scales for DPI differences
+TEMPLATE_CACHE_SIZE = 256
+
+
+class Match:
+    """Result of a template search, in screen coordinates."""
+
+    __slots__ = ("x", "y", "confidence", "scale", "region", "elapsed")
+
+    def __init__(self, x, y, confidence, scale, region, elapsed):
+        self.x = x                    # center of the match
+        self.y = y
+        self.confidence = confidence  # TM_CCOEFF_NORMED score (0..1)
+        self.scale = scale            # template scale that matched
+        self.region = region          # (left, top, width, height) searched
+        self.elapsed = elapsed        # seconds spent searching
+
+    def __repr__(self):
+        return (f"Match(x={self.x}, y={self.y}, confidence={self.confidence:.3f}, "
+                f"scale={self.scale}, region={self.region})")
+
+
+def _to_gray(image):
+    """Grayscale from a BGR/BGRA (OpenCV channel order) or grayscale image."""
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+class TemplateMatcher:
+    """
+    OpenCV template matcher shared by the player and actions.
+    Decoded grayscale templates (and their rescaled variants) are cached, and
+    searches start in a region around the recorded coordinates, widening on a miss.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, roi_radii=ROI_RADII, scales=SCALES,
+                 cache_size=TEMPLATE_CACHE_SIZE):
+        self.threshold = threshold
+        self.roi_radii = tuple(roi_radii)
+        self.scales = tuple(scales)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "searches": 0, "search_time": 0.0}
+
+    # --- Templates ---
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+            return entry
+
+    def _cache_put(self, key, entry):
+        with self._lock:
+            self.stats["cache_misses"] += 1
+            self._cache[key] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def template(self, source):
+        """
+        Return the cached grayscale template for `source`:
+        PNG bytes, a base64 string, an object with png_bytes() (LazyScreenshot),
+        a file path, an already decoded numpy image, or an entry from prepare().
+        """
+        if isinstance(source, dict):
+            return source
+        if isinstance(source, np.ndarray):
+            return self._entry(_to_gray(source))
+
+        if isinstance(source, str) and os.path.exists(source):
+            key = ("file", os.path.abspath(source), os.path.getmtime(source))
+            entry = self._cache_get(key)
+            if entry is None:
+                image = cv2.imread(source, cv2.IMREAD_GRAYSCALE)
+                if image is None:
+                    raise ValueError(f"Could not read template image '{source}'")
+                entry = self._entry(image)
+                self._cache_put(key, entry)
+            return entry
+
+        if hasattr(source, "png_bytes"):
+            data = source.png_bytes()
+        elif isinstance(source, str):
+            data = base64.b64decode(source)
+        else:
+            data = bytes(source)
+        key = ("png", hashlib.sha1(data).digest())
+        entry = self._cache_get(key)
+        if entry is None:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise ValueError("Could not decode template image")
+            entry = self._entry(image)
+            self._cache_put(key, entry)
+        return entry
+
+    def _entry(self, image):
+        """Template entry with every search scale computed up front; entries are never modified after."""
+        return {scale: self._resize(image, scale) for scale in self.scales} | {1.0: image}
+
+    def _resize(self, base, scale):
+        if scale == 1.0:
+            return base
+        size = (max(1, round(base.shape[1] * scale)), max(1, round(base.shape[0] * scale)))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        return cv2.resize(base, size, interpolation=interpolation)
+
+    def _scaled(self, entry, scale):
+        scaled = entry.get(scale)
+        # Only entries built with other scales lack one; resize without touching the (shared) entry
+        return scaled if scaled is not None else self._resize(entry[1.0], scale)
+
+    def prepare(self, source):
+        """Decoded template with every search scale precomputed (picklable, reusable across runs)."""
+        entry = self.template(source)
+        return {scale: self._scaled(entry, scale) for scale in self.scales} | {1.0: entry[1.0]}
+
+    # --- Search ---
+
+    def _regions(self, screen_shape, hint, template_shape):
+        height, width = screen_shape[:2]
+        if hint is not None:
+            hx, hy = int(hint[0]), int(hint[1])
+            th, tw = template_shape
+            for radius in self.roi_radii:
+                left = max(0, hx - radius - tw)
+                top = max(0, hy - radius - th)
+                right = min(width, hx + radius + tw)
+                bottom = min(height, hy + radius + th)
+                if right - left >= tw and bottom - top >= th:
+                    yield (left, top, right - left, bottom - top)
+        yield (0, 0, width, height)
+
+    def match(self, screen, source, hint=None, threshold=None, origin=(0, 0)):
+        """
+        Find `source` in `screen` (numpy image, BGR/BGRA or grayscale).
+        `hint` is the recorded (x, y) in screen coordinates; `origin` is the screen
+        coordinate of screen[0, 0] when `screen` is itself a region.
+        Returns a Match (best confidence >= threshold) or None.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        start = time.perf_counter()
+        gray = _to_gray(screen)
+        entry = self.template(source)
+        local_hint = (hint[0] - origin[0], hint[1] - origin[1]) if hint is not None else None
+
+        best = None
+        searched = set()
+        for region in self._regions(gray.shape, local_hint, entry[1.0].shape):
+            if region in searched:
+                continue
+            searched.add(region)
+            left, top, w, h = region
+            roi = gray[top:top + h, left:left + w]
+            for scale in self.scales:
+                templ = self._scaled(entry, scale)
+                if templ.shape[0] > roi.shape[0] or templ.shape[1] > roi.shape[1]:
+                    continue
+                result = cv2.matchTemplate(roi, templ, cv2.TM_CCOEFF_NORMED)
+                _min_val, max_val, _min_loc, max_loc = cv2.minMaxLoc(result)
+                if best is None or max_val > best[0]:
+                    best = (max_val, scale, region,
+                            left + max_loc[0] + templ.shape[1] // 2,
+                            top + max_loc[1] + templ.shape[0] // 2)
+                if max_val >= threshold:
+                    break
+            if best and best[0] >= threshold:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.stats["searches"] += 1
+        self.stats["search_time"] += elapsed
+        if best is None or best[0] < threshold:
+            return None
+        confidence, scale, region, cx, cy = best
+        region = (region[0] + origin[0], region[1] + origin[1], region[2], region[3])
+        return Match(cx + origin[0], cy + origin[1], float(confidence), scale, region, elapsed)
+
+
+def grab_screen():
+    """Full-screen Frame from the shared frame provider."""
+    return get_provider().capture()
+
+
+# Shared instance for player/actions so the template cache is process-wide
+_default_matcher = None
+
+
+def get_matcher():
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = TemplateMatcher()
+    return _default_matcher
+
+
+def locate_on_screen(source, hint=None, threshold=None, screen=None):
+    """
+    Convenience wrapper: take the shared (possibly cached) screen frame unless
+    a numpy image is given, and match with the shared matcher.
+    """
+    if screen is not None:
+        return get_matcher().match(screen, source, hint=hint, threshold=threshold)
+    frame = grab_screen()
+    return get_matcher().match(frame.image, source, hint=hint, threshold=threshold, origin=frame.origin)
+
+
+# ✅ Benchmark on synthetic screenshots (no display needed)
+# Usage: python -m RPA.template_matcher   (run as a module: the matcher uses package-relative imports)
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    screen = cv2.GaussianBlur(rng.integers(0, 255, (2160, 3840), dtype=np.uint8), (5, 5), 0)
+    tx, ty = 2900, 1400
+    template = screen[ty - 25:ty + 25, tx - 25:tx + 25].copy()
+    ok, png = cv2.imencode(".png", template)
+    png = png.tobytes()
+
+    matcher = TemplateMatcher()
+    runs = 5
+
+    def bench(label, image=screen, **kwargs):
+        times = []
+        result = None
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            result = matcher.match(image, png, **kwargs)
+            times.append(time.perf_counter() - t0)
+        print(f"{label:<28} {min(times) * 1000:8.1f} ms  {result}")
+
+    bench("ROI around recorded coords", hint=(tx + 10, ty - 8))
+    bench("full screen (no hint)")
+    bench("ROI miss -> widen", hint=(400, 300))
+
+    # DPI difference: the screen is rendered at 125% of the recording scale
+    scaled_screen = cv2.resize(screen, None, fx=1.25, fy=1.25, interpolation=cv2.INTER_LINEAR)
+    bench("125% DPI, ROI", image=scaled_screen, hint=(int(tx * 1.25), int(ty * 1.25)), threshold=0.6)
+    print(f"stats: {matcher.stats}")
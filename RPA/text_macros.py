@@ -0,0 +1,151 @@
+# rpa/text_macros.py
+
+# Runs shorter than this stay as individual key events
+MIN_CHARS = 2
+
+# While any of these is held, characters are shortcuts (ctrl+c), not text
+MODIFIER_KEYS = {
+    "Key.ctrl", "Key.ctrl_l", "Key.ctrl_r",
+    "Key.alt", "Key.alt_l", "Key.alt_r", "Key.alt_gr",
+    "Key.cmd", "Key.cmd_l", "Key.cmd_r",
+}
+
+
+def _plain_key(event):
+    """Return the character of a plain printable key press/release event, else None."""
+    if not isinstance(event, dict) or event.get("action") not in ("key_press", "key_release"):
+        return None
+    key = event.get("details", {}).get("key")
+    if isinstance(key, str) and len(key) == 1 and key.isprintable():
+        return key
+    return None
+
+
+def _type_text_event(events, text):
+    first, last = events[0], events[-1]
+    event = {
+        "time": first["time"],
+        "action": "type_text",
+        "details": {
+            "text": text,
+            "duration": round(last["time"] - first["time"], 3),
+            "keys": len(events),
+        },
+        "window": first.get("window"),
+        "description": f"Type text: {text}",
+    }
+    if first.get("tag"):
+        event["tag"] = first["tag"]
+    return event
+
+
+def _flush(run, min_chars):
+    """
+    Replace balanced stretches of a plain-key run (every press released inside the stretch)
+    with type_text events; anything unbalanced is passed through unchanged.
+    """
+    segment = []        # events since the last emitted point
+    balanced_at = 0     # length of the longest balanced prefix of segment
+    text = []
+    balanced_text = 0
+    pending = {}
+
+    def emit():
+        head = segment[:balanced_at]
+        chars = "".join(text[:balanced_text])
+        if head and len(chars) >= min_chars:
+            yield _type_text_event(head, chars)
+        else:
+            yield from head
+
+    for event in run:
+        key = _plain_key(event)
+        if event["action"] == "key_press":
+            segment.append(event)
+            text.append(key)
+            pending[key] = pending.get(key, 0) + 1
+        elif pending.get(key):
+            segment.append(event)
+            pending[key] = 0  # one release ends auto-repeated presses too
+        else:
+            # Release of a key pressed before the run: keep everything exact from here
+            yield from emit()
+            yield from segment[balanced_at:]
+            yield event
+            segment, text, pending = [], [], {}
+            balanced_at = balanced_text = 0
+            continue
+        if not any(pending.values()):
+            balanced_at, balanced_text = len(segment), len(text)
+
+    yield from emit()
+    yield from segment[balanced_at:]
+
+
+def coalesce_typing(events, min_chars=MIN_CHARS):
+    """
+    Yield events with runs of plain-character key_press/key_release pairs
+    merged into single `type_text` events. Modifiers, special keys, tagged
+    events and shortcuts (chars typed while ctrl/alt/cmd is held) stay exact.
+    Works on any iterable, so it can sit between a streaming reader and writer.
+    """
+    held = set()
+    run = []
+    for event in events:
+        if _plain_key(event) is not None and not held:
+            if run and event.get("tag"):
+                # A tag marks a step boundary: start a new run at the tagged key
+                yield from _flush(run, min_chars)
+                run = []
+            run.append(event)
+            continue
+
+        if run:
+            yield from _flush(run, min_chars)
+            run = []
+        if isinstance(event, dict):
+            key = event.get("details", {}).get("key")
+            if key in MODIFIER_KEYS:
+                if event.get("action") == "key_press":
+                    held.add(key)
+                elif event.get("action") == "key_release":
+                    held.discard(key)
+        yield event
+
+    if run:
+        yield from _flush(run, min_chars)
+
+
+def expand_typing(events):
+    """Inverse view for checks: the key press/release sequence a type_text event stands for."""
+    for event in events:
+        if event.get("action") == "type_text":
+            for ch in event["details"]["text"]:
+                yield "key_press", ch
+                yield "key_release", ch
+        elif event.get("action") in ("key_press", "key_release"):
+            yield event["action"], event["details"]["key"]
+
+
+def typed_text(events):
+    """Characters typed by a session (presses only), for comparing before/after coalescing."""
+    return "".join(key for action, key in expand_typing(events)
+                   if action == "key_press" and isinstance(key, str) and len(key) == 1)
+
+
+# ✅ Simple CLI: coalesce an existing session file
+if __name__ == "__main__":
+    import sys
+    from session_format import load_events, save_events
+
+    if len(sys.argv) < 2:
+        print("Usage: python text_macros.py <session> [output]")
+        sys.exit(1)
+
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else src
+    original = load_events(src)
+    merged = list(coalesce_typing(original))
+    assert typed_text(merged) == typed_text(original), "typed text changed"
+    save_events(merged, dst)
+    print(f"✅ {len(original)} events -> {len(merged)} events, saved to {dst}")
@@ -0,0 +1,153 @@
+# rpa/validator.py
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .desktop import VirtualDesktop, key_supported, normalize_key, set_desktop
+from .session_format import SESSION_EXTENSIONS
+from .session_stream import iter_events, screenshot_bytes
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
+
+# Plan fingerprints of the last accepted run; a session whose plan differs is flagged
+PLANS_FILE = os.path.join(os.path.dirname(__file__), "validation_plans.json")
+
+# Virtual screen served during validation. Nothing can be found on it anyway, so it is
+# smaller than any template and screenshot matching returns immediately
+SCREEN_SIZE = (1, 1)
+
+
+def _init_worker():
+    """
+    Worker initializer: play against an in-memory virtual desktop (no real input,
+    no real screen), so sessions dry-run on a headless machine.
+    """
+    width, height = SCREEN_SIZE
+    set_desktop(VirtualDesktop(width, height))
+
+
+def _key_supported(key):
+    return key_supported(normalize_key(key))
+
+
+def _screenshot_ok(payload):
+    import cv2
+    import numpy as np
+
+    try:
+        png = np.frombuffer(screenshot_bytes(payload), np.uint8)
+        return cv2.imdecode(png, cv2.IMREAD_UNCHANGED) is not None
+    except Exception:
+        return False
+
+
+def _check_events(path):
+    """Static checks: step counts, keys playback can't press, missing or broken screenshots."""
+    actions = Counter()
+    unsupported = set()
+    missing = broken = 0
+    for event in iter_events(path):
+        action = event["action"]
+        details = event["details"]
+        actions[action] += 1
+        if action in ("key_press", "key_release") and not _key_supported(details["key"]):
+            unsupported.add(details["key"])
+        elif action == "mouse_click" and details.get("pressed"):
+            if not details.get("screenshot"):
+                missing += 1
+            elif not _screenshot_ok(details["screenshot"]):
+                broken += 1
+    return actions, unsupported, missing, broken
+
+
+def validate_session(path):
+    """
+    Dry-run one session with timing disabled and return a report dict.
+    Must run in a process set up by _init_worker.
+    """
+    from .player import play_session
+
+    start = time.perf_counter()
+    report = {"session": os.path.basename(path), "ok": False, "error": None}
+    try:
+        actions, unsupported, missing, broken = _check_events(path)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            play_session(path, dry_run=True, mode="fast")
+        plan = [line for line in output.getvalue().splitlines() if line.startswith("[DRY RUN]")]
+        report.update({
+            "ok": not unsupported and not broken,
+            "steps": sum(actions.values()),
+            "actions": dict(actions),
+            "unsupported_keys": sorted(unsupported),
+            "missing_screenshots": missing,
+            "broken_screenshots": broken,
+            "plan_steps": len(plan),
+            "plan_hash": hashlib.sha1("\n".join(plan).encode("utf-8")).hexdigest(),
+        })
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["wall_time"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def _load_plans(plans_file):
+    try:
+        with open(plans_file, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def validate_sessions(sessions_dir=SESSIONS_DIR, workers=None, plans_file=PLANS_FILE, update_plans=False):
+    """
+    Dry-run every session in `sessions_dir` concurrently across a process pool.
+    Each report gets `plan_changed` (True/False, None without a stored plan);
+    update_plans=True stores the current plans as the accepted ones.
+    """
+    paths = sorted(
+        os.path.join(sessions_dir, f) for f in os.listdir(sessions_dir) if f.endswith(SESSION_EXTENSIONS)
+    )
+    if not paths:
+        return []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        reports = list(pool.map(validate_session, paths))
+
+    plans = _load_plans(plans_file)
+    for report in reports:
+        expected = plans.get(report["session"])
+        report["plan_changed"] = None if expected is None or report["error"] else expected != report["plan_hash"]
+        if report["plan_changed"]:
+            report["ok"] = False
+
+    if update_plans:
+        plans.update({r["session"]: r["plan_hash"] for r in reports if not r["error"]})
+        with open(plans_file, "w") as f:
+            json.dump(plans, f, indent=2, sort_keys=True)
+    return reports
+
+
+def print_report(reports, wall_time=None):
+    for r in reports:
+        if r["error"]:
+            print(f"❌ {r['session']}: {r['error']} ({r['wall_time']:.2f}s)")
+            continue
+        print(f"{'✅' if r['ok'] else '⚠️'} {r['session']}: {r['steps']} steps, "
+              f"{r['plan_steps']} planned actions, {r['wall_time']:.2f}s")
+        if r["unsupported_keys"]:
+            print(f"   unsupported keys: {', '.join(r['unsupported_keys'])}")
+        if r["missing_screenshots"] or r["broken_screenshots"]:
+            print(f"   screenshots: {r['missing_screenshots']} missing, {r['broken_screenshots']} broken")
+        if r["plan_changed"]:
+            print("   action plan differs from the stored one")
+    failed = sum(1 for r in reports if not r["ok"])
+    summary = f"📋 {len(reports)} sessions, {failed} with problems"
+    if wall_time is not None:
+        summary += f" in {wall_time:.2f}s"
+    print(summary)
@@ -1,47 +1,106 @@
 # rpa/voice_rpa.py
 
 import os
+from threading import Thread
 import numpy as np
 import sounddevice as sd
-import whisper
-from fuzzywuzzy import process
 from .player import play_session
+from .session_compiler import compile_all
+from .session_index import SessionIndex, MATCH_THRESHOLD
+from voice import asr_engine
+from voice import capture
+from voice.ring_buffer import BackgroundCapture
 
 # Folder where sessions are saved
 SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
 
-# Map voice commands to session files
+# Extra spoken aliases for session files; every session in SESSIONS_DIR is also
+# found by its file name and recorded tags
 VOICE_COMMANDS = {
     "defense matrix": "defense_matrix.json",
     "idu": "idu.json",
     "wifi": "wifi.json"
 }
 
-# Load Whisper model once
-MODEL = whisper.load_model("small")
+# Prebuilt fuzzy index over session names/tags, updated as files come and go
+SESSION_INDEX = SessionIndex(SESSIONS_DIR, aliases=VOICE_COMMANDS)
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
 
+# Decode session commands greedily, biased towards the indexed session names (see voice.asr_engine)
+COMMAND_MODE = True
+CONTROL_PHRASES = ["dry run on", "dry run off", "fast mode on", "fast mode off", "exit", "quit"]
+_command_prompt = (None, None)  # (session index version, prompt)
+
+# Stream the mic and stop on trailing silence instead of fixed windows
+STREAMING_CAPTURE = True
+
+# Keep one mic stream open in the background (ring buffer) instead of reopening it per command,
+# so speech during decoding is kept. Opened on first use.
+CONTINUOUS_CAPTURE = True
+MIC = None
+
 # Track dry-run mode
 DRY_RUN_MODE = False
 
-def record_and_transcribe(duration=5) -> str | None:
+# Playback: "timed" replays recorded gaps (divided by PLAYBACK_SPEED), "fast" waits only for readiness
+PLAYBACK_MODE = "timed"
+PLAYBACK_SPEED = 1.0
+
+def get_mic():
+    """The shared background capture, started on first use."""
+    global MIC
+    if MIC is None:
+        MIC = BackgroundCapture(sample_rate=SAMPLE_RATE)
+    MIC.start()
+    return MIC
+
+
+def command_prompt():
+    """Vocabulary prompt for session commands, rebuilt only when the session index changes."""
+    global _command_prompt
+    SESSION_INDEX.refresh()
+    version, prompt = _command_prompt
+    if version != SESSION_INDEX.version:
+        version = SESSION_INDEX.version
+        prompt = asr_engine.vocabulary_prompt(SESSION_INDEX.phrases(refresh=False) + CONTROL_PHRASES)
+        _command_prompt = (version, prompt)
+    return prompt
+
+
+def record_and_transcribe(duration=5, source=None) -> str | None:
     """
-    Record mic input for given duration and transcribe with Whisper.
+    Record mic input (until trailing silence, or for `duration` seconds when
+    streaming is off) and transcribe with the configured ASR engine.
+    `source` is a running BackgroundCapture to read from (e.g. one the caller
+    already holds the microphone with); by default the module's own is used.
     Returns recognized text (lowercase) or None if nothing captured.
     """
     print("🎙 Listening for RPA command...")
-    audio = sd.rec(int(duration * SAMPLE_RATE),
-                   samplerate=SAMPLE_RATE,
-                   channels=CHANNELS,
-                   dtype="float32")
-    sd.wait()
+    if source is None and STREAMING_CAPTURE and CONTINUOUS_CAPTURE:
+        source = get_mic()
+    if source is not None:
+        audio = source.next_utterance()
+        if audio is None:
+            return None
+    elif STREAMING_CAPTURE:
+        audio = capture.capture_utterance(sample_rate=SAMPLE_RATE)
+        if audio is None:
+            return None
+    else:
+        audio = sd.rec(int(duration * SAMPLE_RATE),
+                       samplerate=SAMPLE_RATE,
+                       channels=CHANNELS,
+                       dtype="float32")
+        sd.wait()
+        audio = audio.flatten()
 
     try:
-        result = MODEL.transcribe(audio.flatten(),
-                                  fp16=False,
-                                  language="en")
+        if COMMAND_MODE:
+            result = asr_engine.transcribe_command(audio, command_prompt(), language="en")
+        else:
+            result = asr_engine.transcribe(audio, language="en")
         text = result.get("text", "").strip()
         if text:
             print(f"🗣 You said: {text}")
@@ -51,19 +110,32 @@ def record_and_transcribe(duration=5) -> str | None:
 
     return None
 
-def run_session(command: str, dry_run=False, llm_instructions=None):
+def precompile_sessions():
+    """Index sessions and compile/cache their execution plans ahead of the first command."""
+    SESSION_INDEX.refresh(force=True)
+    compiled = compile_all(SESSIONS_DIR)
+    if compiled:
+        print(f"⚙️ Compiled {compiled} session plan(s)")
+    return compiled
+
+def find_session(command: str):
+    """(matched phrase, session path, score) for a voice command, or None."""
+    # Only match if similarity is high; a JSON session is preferred over its compact binary copy
+    return SESSION_INDEX.lookup(command, MATCH_THRESHOLD)
+
+
+def run_session(command: str, dry_run=False, llm_instructions=None, should_stop=None):
     """
     Match the voice command to a recorded session and play it.
+    `should_stop` is passed to play_session (e.g. a task's cancel check).
     """
-    choices = VOICE_COMMANDS.keys()
-    match, score = process.extractOne(command, choices)
-    if score >= 80:  # only match if similarity is high
-        session_file = VOICE_COMMANDS[match]
-        file_path = os.path.join(SESSIONS_DIR, session_file)
-        if os.path.exists(file_path):
-            print(f"▶️ Running session for '{match}'{' (dry-run)' if dry_run else ''}...")
-            play_session(file_path, llm_instructions=llm_instructions, dry_run=dry_run)
-            return True
+    found = find_session(command)
+    if found:
+        match, file_path, score = found
+        print(f"▶️ Running session for '{match}' (score {score}){' (dry-run)' if dry_run else ''}...")
+        play_session(file_path, llm_instructions=llm_instructions, dry_run=dry_run,
+                     mode=PLAYBACK_MODE, speed=PLAYBACK_SPEED, should_stop=should_stop)
+        return True
     return False
 
 def main():
@@ -71,7 +143,8 @@ def main():
     Standalone mode: run RPA sessions via direct voice input.
     Supports toggling dry-run mode via voice.
     """
-    global DRY_RUN_MODE
+    global DRY_RUN_MODE, PLAYBACK_MODE
+    Thread(target=precompile_sessions, daemon=True).start()
     while True:
         command = record_and_transcribe()
         if not command:
@@ -87,6 +160,16 @@ def main():
             print("✅ Dry-run mode deactivated. Sessions will execute normally.")
             continue
 
+        # Toggle fast playback
+        if "fast mode on" in command:
+            PLAYBACK_MODE = "fast"
+            print("⚡ Fast playback: steps run as soon as the screen is ready.")
+            continue
+        elif "fast mode off" in command:
+            PLAYBACK_MODE = "timed"
+            print("✅ Timed playback: recorded delays are replayed.")
+            continue
+
         # Run session
         if run_session(command, dry_run=DRY_RUN_MODE):
             continue
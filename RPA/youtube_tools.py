@@ -1,30 +1,238 @@
 # rpa/youtube_tools.py
 
-import pyautogui
+import glob
+import os
+import threading
 import time
 
+import numpy as np
+
+from .desktop import get_desktop
+from .frame_provider import get_provider
+from .template_matcher import TemplateMatcher, get_matcher
+
+# Screenshot of the Skip Ad button
+SKIP_AD_TEMPLATE = os.path.join(os.path.dirname(__file__), "..", "core", "skip_ad_button.png")
+
+# Extra variants: any PNG here is used too. Ships with the bare "Skip" label cut from the bundled
+# button, which also matches "Skip Ad"/"Skip Ads"; add screenshots of localized labels here.
+SKIP_AD_TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "skip_ad_templates")
+
+SKIP_AD_CONFIDENCE = 0.7
+
+# Change detection on a downsampled frame: a pixel counts as changed above PIXEL_DELTA (0-255),
+# matching runs when at least CHANGE_THRESHOLD of the pixels changed (small buttons must register)
+PIXEL_DELTA = 12
+CHANGE_THRESHOLD = 0.002
+DOWNSAMPLE = 8
+
+# The skip button sits in the lower-right part of the player
+WATCH_AREA = (0.6, 0.6, 0.4, 0.4)  # (left, top, width, height) as fractions of the player region
+
+# Once a button has been seen, only a box this size around it is watched (the layout puts it
+# in the same spot every time); every WIDE_POLL_EVERY polls the whole WATCH_AREA is checked again
+BUTTON_BOX = (240, 120)
+WIDE_POLL_EVERY = 5
+
+# Same as the original polling loop: with a playing video the area changes on every poll
+POLL_INTERVAL = 2.0
+
+
+_templates_cache = {"key": None, "templates": []}
+
+
+def skip_ad_templates():
+    """
+    All skip-button template images: the bundled one plus any variants in
+    SKIP_AD_TEMPLATE_DIR. The folder is only listed again when it changes.
+    """
+    try:
+        key = os.stat(SKIP_AD_TEMPLATE_DIR).st_mtime_ns
+    except OSError:
+        key = 0
+    if _templates_cache["key"] != key:
+        templates = [SKIP_AD_TEMPLATE] if os.path.exists(SKIP_AD_TEMPLATE) else []
+        templates += sorted(glob.glob(os.path.join(SKIP_AD_TEMPLATE_DIR, "*.png")))
+        _templates_cache.update(key=key, templates=templates)
+    return _templates_cache["templates"]
+
+
+def _watch_region(player_region):
+    if player_region is None:
+        left, top, width, height = get_provider().backend.bounds()
+    else:
+        left, top, width, height = player_region
+    fx, fy, fw, fh = WATCH_AREA
+    return (left + int(width * fx), top + int(height * fy), int(width * fw), int(height * fh))
+
+
+def _button_region(button, bounds):
+    """BUTTON_BOX centred on a matched button, kept inside the screen."""
+    width, height = BUTTON_BOX
+    left = min(max(bounds[0], button.x - width // 2), bounds[0] + bounds[2] - width)
+    top = min(max(bounds[1], button.y - height // 2), bounds[1] + bounds[3] - height)
+    return (max(bounds[0], left), max(bounds[1], top), min(width, bounds[2]), min(height, bounds[3]))
+
+
+def _find_skip_button(frame, templates, threshold=SKIP_AD_CONFIDENCE, matcher=None):
+    """One batched pass: grayscale the watched area once and try every template variant on it."""
+    import cv2
+
+    image = frame.image
+    gray = image if image.ndim == 2 else cv2.cvtColor(
+        image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    matcher = matcher or get_matcher()
+    best = None
+    for template in templates:
+        match = matcher.match(gray, template, threshold=threshold, origin=frame.origin)
+        if match and (best is None or match.confidence > best.confidence):
+            best = match
+    return best
+
+
 def skip_youtube_ad():
     """
     Detects YouTube 'Skip Ad' button on screen and clicks it.
     Returns True if ad was skipped, False otherwise.
     """
     try:
-        # Screenshot of Skip Ad button saved as 'skip_ad_button.png'
-        button = pyautogui.locateOnScreen("skip_ad_button.png", confidence=0.7)
+        frame = get_provider().capture(_watch_region(None))
+        button = _find_skip_button(frame, skip_ad_templates())
         if button:
-            pyautogui.click(pyautogui.center(button))
+            get_desktop().click(button.x, button.y)
+            get_provider().invalidate()
             print("✅ Skipped YouTube ad")
             return True
     except Exception as e:
         print(f"⚠️ Error skipping ad: {e}")
     return False
 
-def auto_skip_ads(duration=60, interval=2):
+
+class AdWatcher:
+    """
+    Background 'Skip Ad' watcher.
+    Polls a cheap downsampled frame difference of the skip-button area and only
+    runs template matching when that area changed. After the first skip it
+    watches just the box around the button, at the scale it matched at.
+    Can be extended, stopped and inspected.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, player_region=None, change_threshold=CHANGE_THRESHOLD):
+        self.interval = interval
+        self.player_region = player_region
+        self.change_threshold = change_threshold
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._deadline = 0.0
+        self._previous = {}  # region -> last thumbnail
+        self._button = None  # region around the last skipped button
+        self._matcher = None  # single-scale matcher once the button's scale is known
+        self.started_at = None
+        self.stats = {"polls": 0, "changes": 0, "match_runs": 0, "skips": 0, "match_time": 0.0,
+                      "narrow_polls": 0}
+
+    def start(self, duration=300):
+        """Start watching for `duration` seconds, or extend the deadline if already running."""
+        with self._lock:
+            self._deadline = max(self._deadline, time.monotonic() + duration)
+            if self.running:
+                return self
+            self._stop.clear()
+            self._previous = {}
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="youtube-ad-watcher")
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def status(self):
+        info = dict(self.stats)
+        info["running"] = self.running
+        info["remaining"] = max(0.0, round(self._deadline - time.monotonic(), 1)) if self.running else 0.0
+        info["templates"] = len(skip_ad_templates())
+        return info
+
+    def _changed(self, region, frame):
+        thumb = frame.image[::DOWNSAMPLE, ::DOWNSAMPLE]
+        thumb = thumb.mean(axis=2) if thumb.ndim == 3 else thumb.astype(np.float32)
+        previous = self._previous.get(region)
+        self._previous[region] = thumb
+        if previous is None or previous.shape != thumb.shape:
+            return True
+        return float(np.mean(np.abs(thumb - previous) > PIXEL_DELTA)) >= self.change_threshold
+
+    def _region(self):
+        if self._button is not None and self.stats["polls"] % WIDE_POLL_EVERY:
+            self.stats["narrow_polls"] += 1
+            return self._button
+        return _watch_region(self.player_region)
+
+    def poll(self):
+        """One watcher step. Returns True if an ad was skipped."""
+        self.stats["polls"] += 1
+        provider = get_provider()
+        region = self._region()
+        frame = provider.capture(region)
+        if not self._changed(region, frame):
+            return False
+        self.stats["changes"] += 1
+        templates = skip_ad_templates()
+        if not templates:
+            return False
+        self.stats["match_runs"] += 1
+        start = time.perf_counter()
+        button = _find_skip_button(frame, templates, matcher=self._matcher)
+        self.stats["match_time"] += time.perf_counter() - start
+        if not button:
+            return False
+        get_desktop().click(button.x, button.y)
+        provider.invalidate()
+        self.stats["skips"] += 1
+        self._button = _button_region(button, provider.backend.bounds())
+        if self._matcher is None:
+            self._matcher = TemplateMatcher(threshold=SKIP_AD_CONFIDENCE, scales=(button.scale,))
+        print(f"✅ Skipped YouTube ad (confidence {button.confidence:.2f})")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set() and time.monotonic() < self._deadline:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Error skipping ad: {e}")
+            self._stop.wait(self.interval)
+
+
+# One watcher shared by every "play video" command
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = AdWatcher()
+        return _watcher
+
+
+def auto_skip_ads(duration=60, interval=None):
     """
-    Continuously checks for Skip Ad button for a given duration.
-    Useful for videos with multiple ads in a row.
+    Watch for Skip Ad buttons for `duration` seconds on the shared background watcher
+    (polling every POLL_INTERVAL seconds unless `interval` is given).
+    Repeated calls extend the running watcher instead of starting new threads.
+    Returns the watcher so callers can stop() it or read status().
     """
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        skipped = skip_youtube_ad()
-        time.sleep(interval)
\ No newline at end of file
+    watcher = get_watcher()
+    if interval is not None:
+        watcher.interval = interval
+    return watcher.start(duration)
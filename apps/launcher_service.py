@@ -1,114 +1,331 @@
 import json
 import os
+import shlex
+import shutil
 import subprocess
+import sys
+import threading
+import time
 import psutil  # dependency to manage processes
 from pathlib import Path
-import pygetwindow as gw  # ✅ For window-level closing
+from threading import Thread
 
-APPS_FILE = os.path.join(os.path.dirname(__file__), "apps.json")
+try:
+    import pygetwindow as gw  # ✅ For window-level closing
+except Exception:  # pygetwindow is Windows-only
+    gw = None
+
+# OMEGA_APPS_FILE points the launcher at another registry (e.g. harmless test commands)
+APPS_FILE = os.environ.get("OMEGA_APPS_FILE", os.path.join(os.path.dirname(__file__), "apps.json"))
+
+# Registry of harmless POSIX stand-ins used by `python -m apps.launcher_service --check`
+TEST_APPS_FILE = os.path.join(os.path.dirname(__file__), "apps.test.json")
+
+# Seconds to wait after terminate() before falling back to kill()
+TERMINATE_TIMEOUT = 3
+
+# Children of a launched process are polled this often, for up to ADOPT_TIMEOUT seconds.
+# Launchers such as `cmd /c` or `start` exit almost at once, so they must be caught quickly.
+ADOPT_POLL_INTERVAL = 0.02
+ADOPT_TIMEOUT = 5.0
+
+# Characters that need the shell (pipes, redirection, variables, command chaining)
+SHELL_CHARS = set("&|<>^%$`;")
 
 # ✅ Synonyms for user-friendly commands
 LAUNCH_KEYWORDS = ["open", "launch", "start", "run"]
 CLOSE_KEYWORDS = ["close", "quit"]
 
 
+# Parsed apps.json, reloaded only when the file changes
+_apps_cache = {"mtime": None, "apps": [], "index": {}}
+
+
 def load_apps():
-    """Load apps from apps.json"""
+    """Load apps from apps.json (cached until the file changes)"""
     if not os.path.exists(APPS_FILE):
         return []
-    with open(APPS_FILE, "r") as f:
-        data = json.load(f)
-        return data.get("apps", [])
+    mtime = os.path.getmtime(APPS_FILE)
+    if _apps_cache["mtime"] != mtime:
+        with open(APPS_FILE, "r") as f:
+            apps = json.load(f).get("apps", [])
+        index = {}
+        for app in apps:
+            for name in [app["name"]] + app.get("aliases", []):
+                index.setdefault(name.lower(), app)
+        _apps_cache.update(mtime=mtime, apps=apps, index=index)
+    return _apps_cache["apps"]
+
+
+def find_app(app_name):
+    """Return the registry entry whose name or alias equals app_name (case-insensitive)"""
+    load_apps()
+    return _apps_cache["index"].get(app_name.lower())
+
+
+# Processes we spawned: app name (lowercase) -> list of {"pid", "create_time", "name"}
+_spawned = {}
+_spawned_lock = threading.Lock()
+
+
+def _track(app_key, proc):
+    """Remember a process (identified by PID + create time so reused PIDs are not confused)."""
+    try:
+        entry = {"pid": proc.pid, "create_time": proc.create_time(), "name": proc.name()}
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return
+    with _spawned_lock:
+        tracked = _spawned.setdefault(app_key, [])
+        if not any(e["pid"] == entry["pid"] and e["create_time"] == entry["create_time"] for e in tracked):
+            tracked.append(entry)
+
+
+def _launch_argv(command):
+    """argv to run `command` without a shell, or None if it needs one (builtins such as `start`, pipes...)."""
+    if os.path.isfile(command):
+        return [command]  # a plain path, possibly with spaces
+    if SHELL_CHARS & set(command):
+        return None
+    try:
+        argv = [arg.strip('"') for arg in shlex.split(command, posix=os.name != "nt")]
+    except ValueError:
+        return None
+    executable = shutil.which(argv[0]) if argv else None
+    if not executable or executable.lower().endswith((".bat", ".cmd")):
+        return None
+    return [executable] + argv[1:]
+
+
+def _find_orphans(root_pid, root_created):
+    """
+    Processes left behind by a launcher that has exited: its process group on
+    POSIX (launches start a new session), or its parent PID on Windows, which
+    keeps the parent PID of orphans.
+    """
+    found = []
+    for proc in psutil.process_iter(["ppid", "create_time"]):
+        try:
+            if proc.pid == root_pid or proc.info["create_time"] < root_created:
+                continue
+            if os.name == "nt":
+                if proc.info["ppid"] == root_pid:
+                    found.append(proc)
+            elif os.getpgid(proc.pid) == root_pid:
+                found.append(proc)
+        except (OSError, TypeError, psutil.Error):
+            continue
+    return found
+
+
+def _adopt_children(app_key, handle, root):
+    """
+    Track the processes a launched command starts. Children are polled while it
+    runs; if it exits (shells, `start`, launcher stubs) what it left behind is adopted.
+    """
+    deadline = time.monotonic() + ADOPT_TIMEOUT
+    while handle.poll() is None:
+        try:
+            for child in root.children(recursive=True):
+                _track(app_key, child)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            break
+        if time.monotonic() >= deadline:
+            return  # still running: its descendants are found through it when closing
+        time.sleep(ADOPT_POLL_INTERVAL)
+    try:
+        created = root.create_time()
+    except psutil.Error:
+        created = 0.0
+    for proc in _find_orphans(root.pid, created):
+        _track(app_key, proc)
+
+
+def _alive_tracked(app_key):
+    """Return live psutil.Process objects (plus descendants) for an app we launched."""
+    with _spawned_lock:
+        entries = list(_spawned.get(app_key, []))
+    alive, seen = [], set()
+    for entry in entries:
+        try:
+            proc = psutil.Process(entry["pid"])
+            if proc.create_time() != entry["create_time"]:
+                continue  # PID was reused by another process
+            family = [proc] + proc.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        for p in family:
+            if p.pid not in seen:
+                seen.add(p.pid)
+                alive.append(p)
+    with _spawned_lock:
+        _spawned[app_key] = [e for e in _spawned.get(app_key, []) if e["pid"] in seen]
+    return alive
+
+
+def launched_apps():
+    """Return {app name: [pids]} for apps launched by us that are still running."""
+    with _spawned_lock:
+        keys = list(_spawned.keys())
+    return {key: [p.pid for p in procs] for key in keys if (procs := _alive_tracked(key))}
+
+
+def _snapshot_by_name(process_names):
+    """One pass over the process table, indexed by lowercase process name."""
+    wanted = {p.lower() for p in process_names}
+    index = {}
+    for proc in psutil.process_iter(["pid", "name"]):
+        name = (proc.info["name"] or "").lower()
+        if name in wanted:
+            index.setdefault(name, []).append(proc)
+    return index
+
+
+def _terminate_all(procs, timeout=TERMINATE_TIMEOUT):
+    """Terminate processes together, wait once for all of them, then kill survivors."""
+    signalled = []
+    for proc in procs:
+        try:
+            print(f"🛑 Closing {proc.name()} (PID: {proc.pid})...")
+            proc.terminate()
+            signalled.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    _gone, alive = psutil.wait_procs(signalled, timeout=timeout)
+    for proc in alive:
+        try:
+            print(f"⚠️ {proc.pid} ignored terminate, killing...")
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    if alive:
+        psutil.wait_procs(alive, timeout=timeout)
+    return len(signalled)
 
 
 def launch_app(app_name):
     """Launch app by name or alias"""
-    apps = load_apps()
-    app_name_lower = app_name.lower()
-    for app in apps:
-        if app_name_lower == app["name"].lower() or app_name_lower in [a.lower() for a in app.get("aliases", [])]:
+    app = find_app(app_name)
+    if app:
+        try:
+            print(f"🚀 Launching {app['name']}...")
+            # Direct launches keep the real app's PID; only commands that need it go through the shell.
+            # A new session on POSIX lets processes orphaned by a shell be found by process group.
+            argv = _launch_argv(app["command"])
+            handle = subprocess.Popen(argv if argv else app["command"], shell=argv is None,
+                                      start_new_session=os.name != "nt")
+            app_key = app["name"].lower()
             try:
-                print(f"🚀 Launching {app['name']}...")
-                subprocess.Popen(app["command"], shell=True)
+                root = psutil.Process(handle.pid)
+                root.create_time()  # cache it while the process is certainly ours
+                _track(app_key, root)
+            except psutil.NoSuchProcess:
                 return True
-            except Exception as e:
-                print(f"⚠️ Failed to launch {app['name']}: {e}")
-                return False
+            Thread(target=_adopt_children, args=(app_key, handle, root), daemon=True).start()
+            return True
+        except Exception as e:
+            print(f"⚠️ Failed to launch {app['name']}: {e}")
+            return False
     print(f"❌ App '{app_name}' not found in registry.")
     return False
 
 
 def close_app(app_name):
-    """Close app by name or alias using process names or window title (for web apps)"""
-    apps = load_apps()
+    """
+    Close app by name or alias.
+    Processes we launched are closed directly by PID; a name-indexed process
+    snapshot is only used for apps started elsewhere. Web apps close by window title.
+    """
+    app = find_app(app_name)
+    if not app:
+        print(f"❌ App '{app_name}' not found in registry.")
+        return False
     app_name_lower = app_name.lower()
 
-    for app in apps:
-        if app_name_lower == app["name"].lower() or app_name_lower in [a.lower() for a in app.get("aliases", [])]:
-
-            # --- Special handling for browser-based apps ---
-            if app.get("is_web_app", False):
-                try:
-                    windows = gw.getWindowsWithTitle(app_name)
-                    if not windows:
-                        print(f"⚠️ No window found with title containing '{app_name}'")
-                        return False
-                    for win in windows:
-                        print(f"🛑 Closing window: {win.title}")
-                        win.close()
-                    return True
-                except Exception as e:
-                    print(f"⚠️ Failed to close window '{app_name}': {e}")
-                    return False
-
-            # ✅ Special handling for Calculator (UWP app)
-            if app_name_lower in ["calculator", "calc"]:
-                try:
-                    print(f"🛑 Closing Calculator via taskkill...")
-                    ret_code = os.system("taskkill /IM Calculator.exe /F >nul 2>&1")
-                    if ret_code == 0:
-                        print(f"✅ Calculator closed successfully.")
-                        return True
-                    else:
-                        print(f"⚠️ Calculator was not running.")
-                        return False
-                except Exception as e:
-                    print(f"⚠️ Failed to close Calculator: {e}")
-                    return False
-
-            # Use "processes" field if exists, else fallback to basename of command
-            process_names = app.get("processes", [])
-            if not process_names:
-                cmd_path = app.get("command", "")
-                if cmd_path:
-                    process_names = [Path(cmd_path).name]  # e.g., notepad.exe
-                else:
-                    print(f"⚠️ No process names or command defined for {app['name']}")
-                    return False
-
-            closed = False
-            for proc in psutil.process_iter(["pid", "name"]):
-                try:
-                    if proc.info["name"] and proc.info["name"].lower() in [p.lower() for p in process_names]:
-                        print(f"🛑 Closing {proc.info['name']} (PID: {proc.info['pid']})...")
-                        proc.terminate()
-                        closed = True
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            if closed:
-                print(f"✅ {app['name']} closed successfully.")
+    # --- Special handling for browser-based apps ---
+    if app.get("is_web_app", False):
+        if gw is None:
+            print("⚠️ Window-level closing is not available on this platform")
+            return False
+        try:
+            windows = gw.getWindowsWithTitle(app_name)
+            if not windows:
+                print(f"⚠️ No window found with title containing '{app_name}'")
+                return False
+            for win in windows:
+                print(f"🛑 Closing window: {win.title}")
+                win.close()
+            return True
+        except Exception as e:
+            print(f"⚠️ Failed to close window '{app_name}': {e}")
+            return False
+
+    # ✅ Special handling for Calculator (UWP app)
+    if app_name_lower in ["calculator", "calc"]:
+        try:
+            print(f"🛑 Closing Calculator via taskkill...")
+            ret_code = os.system("taskkill /IM Calculator.exe /F >nul 2>&1")
+            if ret_code == 0:
+                print(f"✅ Calculator closed successfully.")
                 return True
             else:
-                print(f"⚠️ No running processes found for {app['name']}.")
+                print(f"⚠️ Calculator was not running.")
                 return False
+        except Exception as e:
+            print(f"⚠️ Failed to close Calculator: {e}")
+            return False
 
-    print(f"❌ App '{app_name}' not found in registry.")
+    # --- Processes we launched ourselves ---
+    procs = _alive_tracked(app["name"].lower())
+
+    # --- Fallback: name-indexed snapshot of the process table ---
+    if not procs:
+        # Use "processes" field if exists, else fallback to basename of command
+        process_names = app.get("processes", [])
+        if not process_names:
+            cmd_path = app.get("command", "")
+            if cmd_path:
+                process_names = [Path(cmd_path).name]  # e.g., notepad.exe
+            else:
+                print(f"⚠️ No process names or command defined for {app['name']}")
+                return False
+        snapshot = _snapshot_by_name(process_names)
+        procs = [proc for name in process_names for proc in snapshot.get(name.lower(), [])]
+
+    if procs and _terminate_all(procs):
+        print(f"✅ {app['name']} closed successfully.")
+        return True
+    print(f"⚠️ No running processes found for {app['name']}.")
     return False
 
 
+def check(settle=1.0):
+    """
+    Launch and close every app in the registry, checking each one was tracked
+    by PID and that all of its tracked processes are gone after close_app().
+    """
+    ok = True
+    for app in load_apps():
+        key = app["name"].lower()
+        launch_app(app["name"])
+        time.sleep(settle)  # let launchers exit and adoption finish
+        pids = launched_apps().get(key, [])
+        closed = close_app(app["name"])
+        left = [pid for pid in pids if psutil.pid_exists(pid) and psutil.Process(pid).status() != psutil.STATUS_ZOMBIE]
+        passed = bool(pids) and closed and not left
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {app['name']}: tracked {pids}, still running {left}")
+    return ok
+
+
 # ✅ Simple CLI test harness
+# Usage: python -m apps.launcher_service            (interactive)
+#        python -m apps.launcher_service --check    (launch/close apps.test.json, or OMEGA_APPS_FILE)
 if __name__ == "__main__":
+    if "--check" in sys.argv:
+        if "OMEGA_APPS_FILE" not in os.environ:
+            APPS_FILE = TEST_APPS_FILE
+        sys.exit(0 if check() else 1)
+
     while True:
         action = input("Enter command (open/close/exit): ").strip().lower()
         if action in ["exit", "quit"]:
@@ -0,0 +1,11 @@
+# core/__main__.py
+
+# Usage: python -m core
+# Entry point of the assistant. Spawned processes re-run the parent's main script, so
+# `python core/main.py` would make each audio worker process import core.main again
+# (sounddevice, pyautogui, the RPA stack). A package's __main__ is not re-run, so
+# started from here the workers import only voice.audio_worker and what it needs.
+if __name__ == "__main__":
+    from core import main
+
+    main.main()
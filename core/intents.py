@@ -0,0 +1,175 @@
+# core/intents.py
+
+import string
+import time
+from collections import deque
+
+# Punctuation is ignored when matching so "wi-fi"/"notepad." still hit their keywords
+_STRIP_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every registered keyword.
+    One pass over the transcript finds all keyword hits, however many keywords exist.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = True
+
+    def add(self, keyword, payload):
+        keyword = keyword.lower().translate(_STRIP_PUNCTUATION).strip()
+        if not keyword:
+            return
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((keyword, payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth-first)."""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+
+    def find(self, text, whole_words=True):
+        """Yield (start, end, keyword, payload) for every keyword occurrence in text."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword, payload in out[state]:
+                start, end = i - len(keyword) + 1, i + 1
+                if whole_words and not _is_word_boundary(text, start, end):
+                    continue
+                yield start, end, keyword, payload
+
+
+def _is_word_boundary(text, start, end):
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+class Intent:
+    def __init__(self, name, handler, keywords=(), priority=100, fallback=False, whole_words=True):
+        self.name = name
+        self.handler = handler          # handler(text) -> True if the command was handled
+        self.keywords = list(keywords)
+        self.priority = priority        # lower runs first
+        self.fallback = fallback        # also tried when no keyword matched
+        self.whole_words = whole_words
+
+
+class IntentRouter:
+    """
+    Registered-intent dispatcher.
+    All intent keywords are compiled into one KeywordMatcher; a transcript is
+    resolved to a ranked list of candidate intents in a single pass and only
+    those handlers run. Per-intent dispatch time is recorded.
+    """
+
+    def __init__(self):
+        self.intents = {}
+        self._matcher = None
+        self._fallbacks = []
+        self.stats = {}
+        self.resolve_time = 0.0
+        self.resolves = 0
+
+    def register(self, name, handler, keywords=(), priority=100, fallback=False, whole_words=True):
+        self.intents[name] = Intent(name, handler, keywords, priority, fallback, whole_words)
+        self.stats.setdefault(name, {"calls": 0, "handled": 0, "total_time": 0.0})
+        self._matcher = None
+
+    def compile(self):
+        matcher = KeywordMatcher()
+        for intent in self.intents.values():
+            for keyword in intent.keywords:
+                matcher.add(keyword, intent.name)
+        matcher.build()
+        self._matcher = matcher
+        self._fallbacks = sorted(
+            (i for i in self.intents.values() if i.fallback), key=lambda i: i.priority
+        )
+
+    def resolve(self, text):
+        """Return [(intent, matched keywords)] ranked by priority, then longest keyword hit."""
+        if self._matcher is None:
+            self.compile()
+        start = time.perf_counter()
+        hits = {}
+        text = text.lower().translate(_STRIP_PUNCTUATION)
+        for _s, _e, keyword, name in self._matcher.find(text, whole_words=False):
+            intent = self.intents[name]
+            if intent.whole_words and not _is_word_boundary(text, _s, _e):
+                continue
+            hits.setdefault(name, []).append(keyword)
+        for intent in self._fallbacks:
+            hits.setdefault(intent.name, [])
+        ranked = sorted(
+            ((self.intents[name], keywords) for name, keywords in hits.items()),
+            key=lambda item: (item[0].priority, -max((len(k) for k in item[1]), default=0)),
+        )
+        self.resolve_time += time.perf_counter() - start
+        self.resolves += 1
+        return ranked
+
+    def dispatch(self, text):
+        """Run candidate handlers in rank order until one handles the text. Returns its name or None."""
+        for intent, _keywords in self.resolve(text):
+            record = self.stats[intent.name]
+            start = time.perf_counter()
+            try:
+                handled = intent.handler(text)
+            finally:
+                record["calls"] += 1
+                record["total_time"] += time.perf_counter() - start
+            if handled:
+                record["handled"] += 1
+                return intent.name
+        return None
+
+    def vocabulary(self):
+        """Every registered keyword, highest-priority intents first (for ASR vocabulary prompts)."""
+        words = []
+        for intent in sorted(self.intents.values(), key=lambda i: i.priority):
+            words.extend(k for k in intent.keywords if k not in words)
+        return words
+
+    def report(self):
+        """Per-intent call counts and mean dispatch time in milliseconds."""
+        lines = [f"resolve: {self.resolves} calls, "
+                 f"{(self.resolve_time / self.resolves * 1000) if self.resolves else 0:.3f} ms avg"]
+        for name, record in sorted(self.stats.items()):
+            if not record["calls"]:
+                continue
+            avg = record["total_time"] / record["calls"] * 1000
+            lines.append(f"{name}: {record['handled']}/{record['calls']} handled, {avg:.3f} ms avg")
+        return "\n".join(lines)
@@ -2,10 +2,10 @@ import sys
 import os
 import time
 import ctypes
+import queue
 import subprocess
 import numpy as np
 import sounddevice as sd
-import whisper
 from threading import Thread
 import string  # ✅ For punctuation removal
 
@@ -13,10 +13,17 @@ import string  # ✅ For punctuation removal
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from voice import speaker
+from voice import asr_engine
+from voice import capture
+from voice.wake_gate import WakeGate
+from voice.ring_buffer import BackgroundCapture
+from voice.audio_worker import AudioWorker
 from apps import launcher_service
 from web import search_service, site_service
-from rpa import voice_rpa
-from rpa import youtube_tools
+from RPA import voice_rpa
+from RPA import youtube_tools
+from core.intents import IntentRouter
+from core.tasks import TaskManager
 
 # Wake words / aliases
 WAKE_ALIASES = ["omega", "hello", "hey omega", "okay omega"]
@@ -29,15 +36,75 @@ CLOSE_KEYWORDS = ["close", "quit"]
 EXIT_COMMANDS = ["bye"]   # Normal shutdown
 SLEEP_COMMANDS = ["thanks", "thank you"]
 
-# Whisper setup
-MODEL = whisper.load_model("small")
+# Speech recognition engine (backend + model) comes from voice/asr_config.json; see voice.asr_engine
+# Command mode: greedy decoding biased towards the command vocabulary, full decoding only on low confidence
+COMMAND_MODE = True
+COMMAND_PROMPT = None  # built with the router in main()
+PROMPT_INDEX_VERSION = None  # session index version COMMAND_PROMPT was last refreshed for
 SAMPLE_RATE = 16000
 CHANNELS = 1
 
+# Stream the mic and stop on trailing silence instead of fixed windows
+STREAMING_CAPTURE = True
+
+# Echo gate: there is no echo cancellation, so the mic hears the assistant. Speech while it talks
+# (and shortly after) is taken as its own voice: it is not transcribed and does not barge in.
+# Without a continuous buffer, listening waits until it has finished talking (up to ECHO_WAIT seconds).
+ECHO_GATE = True
+ECHO_WAIT = 10
+
+# Keep the mic open on a background thread (ring buffer) so speech during decoding/TTS is kept.
+# Created in main(), like everything below: the audio worker's spawned processes may re-import this module.
+CONTINUOUS_CAPTURE = True
+MIC = None
+
+# Stop talking as soon as the user starts speaking. Only with the echo gate off (headset or
+# echo-cancelling audio), since the gate ignores any speech that starts while the assistant talks.
+BARGE_IN = not ECHO_GATE
+
+# Capture and recognition in worker processes (voice.audio_worker), so RPA playback and input hooks
+# cannot starve the audio; the main loop only reads transcripts. Started in main().
+# Run the assistant with `python -m core`, so the spawned workers do not re-import this module.
+USE_AUDIO_WORKER = True
+AUDIO_WORKER = None
+
+# Cheap VAD + keyword-spotting gate in sleep mode; the full ASR engine only runs after it passes.
+# Exit commands are spotted too so "bye" still works while asleep.
+USE_WAKE_GATE = True
+WAKE_GATE = None
+
+# Fixed responses, rendered to audio at startup so they play without synthesis delay
+GREETING = "Omega is online. Say 'omega' or 'hello' to wake me up, 'thanks' to pause, or 'bye' to exit."
+LISTENING = "Yes, I'm listening. You can give multiple commands. Say 'thanks' to pause, 'stop' to exit, or switch to admin/normal mode."
+NOT_HEARD = "I didn’t hear anything."
+UNKNOWN_COMMAND = "Sorry, I don’t know that command yet."
+SLEEPING = "You're welcome! Returning to sleep mode."
+GOODBYE = "Shutting down completely. Goodbye!"
+STATIC_RESPONSES = [GREETING, LISTENING, NOT_HEARD, UNKNOWN_COMMAND, SLEEPING, GOODBYE,
+                    "Switched to normal mode.", "Switched to admin mode successfully."]
+
 # Track admin mode and dry-run mode
 IS_ADMIN_MODE = False
 DRY_RUN_MODE = False
 
+# Follow-up command dispatcher (built in main())
+ROUTER = None
+
+# Long-running work (RPA sessions, ad watching) runs as named, cancellable background tasks
+# so the voice loop stays responsive; at most one automation and one video watcher at a time
+TASKS = None
+
+# Also read commands typed on the console (e.g. "what's running", "stop automation")
+CONSOLE_COMMANDS = True
+# Typed lines are queued and dispatched by the main loop between voice commands, so console and
+# voice never drive the router (or read the microphone, as "switch to admin" does) at the same time.
+# While asleep, voice reads return every CONSOLE_POLL seconds so typed commands are not held up.
+CONSOLE_QUEUE = queue.Queue()
+CONSOLE_POLL = 0.5
+
+# listen_command() result when its timeout passed before anything was heard
+LISTEN_TIMEOUT = object()
+
 
 def is_admin():
     """Check if running as administrator (Windows only)."""
@@ -53,6 +120,8 @@ def run_as_admin():
     if not is_admin():
         print("⚠️ Restarting with administrator privileges...")
         speaker.speak("Restarting with administrator rights. Please approve.")
+        speaker.wait(timeout=5)
+        stop_audio_worker()  # release the microphone for the elevated instance
         ctypes.windll.shell32.ShellExecuteW(
             None, "runas", sys.executable, " ".join(sys.argv), None, 1
         )
@@ -137,14 +206,67 @@ def disable_wifi(interface_name):
     return True
 
 
-def listen_command(duration=5) -> str | None:
-    """Record audio and transcribe with Whisper."""
-    print("🎙 Listening...")
+def record_audio(duration=5, streaming=None):
+    """
+    Capture one command from the microphone.
+    Streaming mode ends on trailing silence; otherwise records a fixed window.
+    """
+    if streaming is None:
+        streaming = STREAMING_CAPTURE
+    if streaming and CONTINUOUS_CAPTURE:
+        MIC.start()
+        return MIC.next_utterance()
+    wait_until_quiet()
+    if streaming:
+        return capture.capture_utterance(sample_rate=SAMPLE_RATE)
     audio = sd.rec(int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="float32")
     sd.wait()
+    return audio.flatten()
+
+
+def wait_until_quiet():
+    """Echo gate for captures that open the mic fresh: let the assistant finish talking first."""
+    if ECHO_GATE:
+        speaker.wait(timeout=ECHO_WAIT)
+
+
+def stop_audio_worker():
+    if AUDIO_WORKER is not None:
+        AUDIO_WORKER.stop()
+
+
+def discard_pending_audio():
+    """Forget audio captured so far, so the next command is only what is said from now on."""
+    if AUDIO_WORKER is not None:
+        AUDIO_WORKER.skip_to_now()
+    elif CONTINUOUS_CAPTURE:
+        MIC.skip_to_now()
+
+
+def listen_command(duration=5, timeout=None) -> str | None:
+    """
+    Record audio and transcribe with the configured ASR engine.
+    With the audio worker, `timeout` bounds the wait: LISTEN_TIMEOUT is returned when
+    no result arrived in time (listening goes on; call again to keep waiting).
+    """
+    if AUDIO_WORKER is not None:
+        if AUDIO_WORKER.mode != "command":
+            print("🎙 Listening...")
+            AUDIO_WORKER.set_mode("command")
+        text = AUDIO_WORKER.next_transcript(timeout=timeout, default=LISTEN_TIMEOUT)
+        if text and text is not LISTEN_TIMEOUT:
+            print(f"🗣 Heard: {text}")
+        return text
+    print("🎙 Listening...")
+    audio = record_audio(duration)
+    if audio is None:
+        return None
 
     try:
-        result = MODEL.transcribe(audio.flatten(), fp16=False, language="en")
+        if COMMAND_MODE:
+            result = asr_engine.transcribe_command(audio, COMMAND_PROMPT, language="en")
+        else:
+            result = asr_engine.transcribe(audio, language="en")
         text = result.get("text", "").strip()
         if text:
             print(f"🗣 Heard: {text}")
@@ -186,138 +308,364 @@ def handle_web_search(followup: str):
         speaker.speak("I couldn’t understand the search request.")
 
 
-def main():
-    global IS_ADMIN_MODE, DRY_RUN_MODE
-    speaker.speak(
-        "Omega is online. Say 'omega' or 'hello' to wake me up, 'thanks' to pause, or 'bye' to exit."
+def stop_tasks(timeout=2):
+    """Cancel background tasks and give them a moment to stop."""
+    if TASKS is not None and TASKS.cancel():
+        TASKS.wait(timeout)
+
+
+def shutdown(_text=None):
+    if ROUTER:
+        print(f"📊 Intent dispatch:\n{ROUTER.report()}")
+    stop_tasks()
+    print(f"📊 Tasks: {TASKS.report()}")
+    speaker.speak(GOODBYE)
+    speaker.wait(timeout=5)
+    speaker.flush()
+    print(f"📊 Speech queue: {speaker.get_speaker().report()}")
+    if COMMAND_MODE and AUDIO_WORKER is None:
+        print(f"📊 Command decoding: {asr_engine.profile_stats()}")
+    if AUDIO_WORKER is not None:
+        print(f"📊 Audio worker: {AUDIO_WORKER.stats()}")
+    stop_audio_worker()
+    try:
+        sys.exit(0)
+    except SystemExit:
+        os._exit(0)
+
+
+def go_to_sleep(_text=None):
+    speaker.speak(SLEEPING)
+    return True
+
+
+def switch_to_admin(_text=None):
+    if IS_ADMIN_MODE:
+        return False
+    speaker.speak("This action requires administrative privileges. Please say yes to proceed.")
+    # The answer must come after the question, not from audio buffered before it
+    speaker.wait(timeout=10)
+    discard_pending_audio()
+    approval = listen_command()
+    if approval and "yes" in approval:
+        run_as_admin()
+        speaker.speak("Switched to admin mode successfully.")
+    else:
+        speaker.speak("Continuing in normal mode.")
+    return True
+
+
+def switch_to_normal(_text=None):
+    global IS_ADMIN_MODE
+    if not IS_ADMIN_MODE:
+        return False
+    IS_ADMIN_MODE = False
+    speaker.speak("Switched to normal mode.")
+    return True
+
+
+def enable_dry_run(_text=None):
+    global DRY_RUN_MODE
+    DRY_RUN_MODE = True
+    speaker.speak("Dry run mode enabled. RPA sessions will only log actions.")
+    return True
+
+
+def disable_dry_run(_text=None):
+    global DRY_RUN_MODE
+    DRY_RUN_MODE = False
+    speaker.speak("Dry run mode disabled. RPA sessions will perform real actions.")
+    return True
+
+
+def handle_wifi(followup):
+    """Wi-Fi / Internet control (dynamic)."""
+    wifi_name = get_wifi_interface()
+    last_profile = get_last_connected_wifi()
+    if "on" in followup or "enable" in followup:
+        enable_wifi(wifi_name, last_profile)
+        return True
+    elif "off" in followup or "disable" in followup:
+        disable_wifi(wifi_name)
+        return True
+    elif "connect" in followup:
+        os.system("start ms-settings:network-wifi")
+        speaker.speak("Opening Wi-Fi connection panel")
+        return True
+    return False
+
+
+def handle_launch(followup):
+    app_name = clean_app_name(followup, LAUNCH_KEYWORDS)
+    if launcher_service.launch_app(app_name):
+        speaker.speak(f"Launching {app_name}")
+        return True
+    return False
+
+
+def handle_close(followup):
+    """Close app (web-app-safe)."""
+    app_name = clean_app_name(followup, CLOSE_KEYWORDS)
+    if launcher_service.close_app(app_name):
+        speaker.speak(f"Closing {app_name}")
+        return True
+    return False
+
+
+def _run_automation(task, followup, dry_run):
+    voice_rpa.run_session(followup, dry_run=dry_run, should_stop=task.should_stop)
+
+
+def handle_rpa(followup):
+    """Run the matching RPA session (with dry_run) as a background automation task."""
+    if not voice_rpa.find_session(followup):
+        return False
+    task = TASKS.submit(followup, "automation", _run_automation, followup, DRY_RUN_MODE)
+    if task is None:
+        running = TASKS.running("automation")[0]
+        speaker.speak(f"Automation '{running.name}' is still running. Say 'stop automation' to cancel it.")
+    else:
+        speaker.speak(f"Running automation session: {followup}")
+    return True
+
+
+def handle_site(followup):
+    site_name = clean_app_name(followup, LAUNCH_KEYWORDS)
+    site = site_service.open_site(site_name)
+    if site:
+        speaker.speak(f"Opening {site}")
+        return True
+    return False
+
+
+def handle_search(followup):
+    handle_web_search(followup)
+    return True
+
+
+def _watch_video(task, duration):
+    watcher = youtube_tools.auto_skip_ads(duration)
+    while watcher.running and not task.wait_cancelled(0.5):
+        pass
+
+
+def handle_youtube(_text=None):
+    speaker.speak("Playing YouTube video...")
+    if TASKS.running("video"):
+        # Shared watcher: repeated commands extend it instead of stacking tasks
+        youtube_tools.auto_skip_ads(300)
+        return True
+    TASKS.submit("youtube ad skipper", "video", _watch_video, 300,
+                 on_cancel=lambda: youtube_tools.get_watcher().stop())
+    return True
+
+
+def tasks_status(_text=None):
+    speaker.speak(TASKS.summary())
+    return True
+
+
+def cancel_tasks(text):
+    """Cancel automation, video, or (by default) every background task."""
+    if "automation" in text:
+        kind = "automation"
+    elif "video" in text or "watching" in text:
+        kind = "video"
+    else:
+        kind = None
+    cancelled = TASKS.cancel(kind)
+    if cancelled:
+        speaker.speak("Stopped " + ", ".join(task.name for task in cancelled) + ".")
+    else:
+        speaker.speak(f"No {kind or 'background'} task is running.")
+    return True
+
+
+def console_loop():
+    """Queue commands typed on stdin (e.g. "what's running") for the main loop."""
+    for line in sys.stdin:
+        text = line.strip().lower()
+        if text:
+            CONSOLE_QUEUE.put(text)
+
+
+def run_console_commands():
+    """Dispatch the commands typed since the last call (main loop only). Returns the last handled intent."""
+    handled = None
+    while True:
+        try:
+            text = CONSOLE_QUEUE.get_nowait()
+        except queue.Empty:
+            return handled
+        print(f"⌨️ Typed: {text}")
+        handled = ROUTER.dispatch(text)
+        if not handled:
+            print(f"⚠️ Unknown command: {text}")
+
+
+def build_router():
+    """
+    Register every follow-up intent with its trigger keywords.
+    Priorities keep the original evaluation order; registry names
+    (apps, sites, sessions, engines) are read once here.
+    """
+    router = IntentRouter()
+    app_names = []
+    for app in launcher_service.load_apps():
+        app_names.append(app["name"])
+        app_names.extend(app.get("aliases", []))
+    site_names = list(site_service.load_sites().keys())
+
+    router.register("exit", shutdown, EXIT_COMMANDS, priority=0, whole_words=False)
+    router.register("sleep", go_to_sleep, SLEEP_COMMANDS, priority=10, whole_words=False)
+    router.register("tasks_status", tasks_status, ["what's running", "what is running", "task status"],
+                    priority=15, whole_words=False)
+    router.register("cancel_tasks", cancel_tasks, ["stop automation", "cancel automation", "stop video",
+                                                   "stop watching", "stop everything", "cancel everything"],
+                    priority=16, whole_words=False)
+    router.register("admin_mode", switch_to_admin, ["switch to admin"], priority=20, whole_words=False)
+    router.register("normal_mode", switch_to_normal, ["switch to normal"], priority=21, whole_words=False)
+    router.register("dry_run_on", enable_dry_run, ["enable dry run"], priority=30, whole_words=False)
+    router.register("dry_run_off", disable_dry_run, ["disable dry run"], priority=31, whole_words=False)
+    router.register("wifi", handle_wifi, ["wifi", "internet"], priority=40, whole_words=False)
+    router.register("launch_app", handle_launch, app_names, priority=50)
+    router.register("close_app", handle_close, app_names, priority=60)
+    # Session names are fuzzy-matched, so RPA is also tried when no keyword hits; find_session
+    # re-indexes the sessions folder, so only the fixed aliases are keywords (no session parsing here)
+    router.register("rpa_session", handle_rpa, list(voice_rpa.VOICE_COMMANDS), priority=70, fallback=True)
+    router.register("open_site", handle_site, site_names, priority=80)
+    router.register("web_search", handle_search, ["search", "google", "bing", "duckduckgo"], priority=90,
+                    whole_words=False)
+    router.register("youtube", handle_youtube, ["play video", "youtube"], priority=100, whole_words=False)
+    router.compile()
+    return router
+
+
+def build_command_prompt(router):
+    """
+    ASR vocabulary prompt: wake words and verbs first, then the registry names (apps, sites,
+    engines, sessions indexed so far), then the remaining intent keywords. The prompt has a
+    length cap, so the names Whisper cannot guess come before the common phrases.
+    """
+    engines = list(search_service.load_engines().keys())
+    registry = [keyword for name in ("launch_app", "open_site", "rpa_session")
+                for keyword in router.intents[name].keywords]
+    return asr_engine.vocabulary_prompt(
+        WAKE_ALIASES + LAUNCH_KEYWORDS + CLOSE_KEYWORDS + registry + engines
+        + voice_rpa.SESSION_INDEX.phrases(refresh=False) + router.vocabulary()
     )
 
+
+def refresh_command_prompt():
+    """Rebuild the ASR prompt (and hand it to the audio worker) when the session index has changed."""
+    global COMMAND_PROMPT, PROMPT_INDEX_VERSION
+    version = voice_rpa.SESSION_INDEX.version
+    if version == PROMPT_INDEX_VERSION:
+        return
+    PROMPT_INDEX_VERSION = version
+    COMMAND_PROMPT = build_command_prompt(ROUTER)
+    if AUDIO_WORKER is not None:
+        AUDIO_WORKER.set_prompt(COMMAND_PROMPT)
+
+
+def prepare_sessions():
+    """Index and compile RPA sessions, then add their names to the ASR prompt."""
+    voice_rpa.precompile_sessions()
+    refresh_command_prompt()
+
+
+def build_local_capture():
+    """Microphone ring buffer and wake gate, for when capture runs in this process (no audio worker)."""
+    global MIC, WAKE_GATE
+    MIC = BackgroundCapture(capacity_seconds=30, sample_rate=SAMPLE_RATE,
+                            on_speech_start=speaker.interrupt if BARGE_IN else None,
+                            echo_filter=speaker.overlaps_speech if ECHO_GATE else None)
+    WAKE_GATE = WakeGate(WAKE_ALIASES + EXIT_COMMANDS, sample_rate=SAMPLE_RATE,
+                         source=MIC if CONTINUOUS_CAPTURE else None)
+
+
+def main():
+    global ROUTER, COMMAND_PROMPT, AUDIO_WORKER, TASKS
+    TASKS = TaskManager()
+    ROUTER = build_router()
+    COMMAND_PROMPT = build_command_prompt(ROUTER)
+    # Index sessions and compile their plans in the background so neither the greeting
+    # nor the first replay waits for them
+    Thread(target=prepare_sessions, daemon=True, name="sessions").start()
+    if USE_AUDIO_WORKER and STREAMING_CAPTURE:
+        # The recognizer process loads the ASR model while the greeting is spoken
+        AUDIO_WORKER = AudioWorker(WAKE_ALIASES + EXIT_COMMANDS, WAKE_ALIASES, sample_rate=SAMPLE_RATE,
+                                   prompt=COMMAND_PROMPT, command_mode=COMMAND_MODE,
+                                   on_speech_start=speaker.interrupt if BARGE_IN else None,
+                                   echo_filter=speaker.overlaps_speech if ECHO_GATE else None)
+        AUDIO_WORKER.start()
+    else:
+        # Load the ASR model in the background while the greeting is spoken
+        asr_engine.warm_up()
+        build_local_capture()
+        if CONTINUOUS_CAPTURE:
+            MIC.start()
+    if CONSOLE_COMMANDS and sys.stdin and sys.stdin.isatty():
+        Thread(target=console_loop, daemon=True, name="console").start()
+    speaker.speak(GREETING)
+    speaker.prerender(STATIC_RESPONSES)
+
     while True:
-        command = listen_command()
+        run_console_commands()
+        if AUDIO_WORKER is not None:
+            if AUDIO_WORKER.mode != "wake":
+                AUDIO_WORKER.set_mode("wake")
+                AUDIO_WORKER.skip_to_now()  # follow-ups decoded in command mode are not wake commands
+            command = AUDIO_WORKER.next_transcript(timeout=CONSOLE_POLL)
+        elif USE_WAKE_GATE and STREAMING_CAPTURE:
+            if not CONTINUOUS_CAPTURE:
+                wait_until_quiet()
+            command = WAKE_GATE.listen(timeout=CONSOLE_POLL if CONTINUOUS_CAPTURE else None)
+        else:
+            command = listen_command()
         if not command:
             continue
 
         # ✅ Global shutdown at top-level
         if any(exit_command in command for exit_command in EXIT_COMMANDS):
-            speaker.speak("Shutting down completely. Goodbye!")
-            try:
-                sys.exit(0)
-            except SystemExit:
-                os._exit(0)
+            shutdown()
 
         # ✅ Global sleep
         if any(sleep in command for sleep in SLEEP_COMMANDS):
-            speaker.speak("You're welcome! Returning to sleep mode.")
+            speaker.speak(SLEEPING)
             continue
 
         # ✅ Wake word detection
         if any(alias in command for alias in WAKE_ALIASES):
             print(f"✨ Wake word detected! Heard: {command}")
-            speaker.speak(
-                "Yes, I'm listening. You can give multiple commands. Say 'thanks' to pause, 'stop' to exit, or switch to admin/normal mode."
-            )
+            if AUDIO_WORKER is not None:
+                print(f"📊 Audio worker: {AUDIO_WORKER.stats()}")
+            else:
+                if USE_WAKE_GATE:
+                    print(f"📊 Wake gate: {WAKE_GATE.stats()}")
+                if CONTINUOUS_CAPTURE:
+                    print(f"📊 Capture buffer: {MIC.stats()}")
+            speaker.speak(LISTENING)
 
             while True:
-                followup = listen_command()
+                if run_console_commands() == "sleep":
+                    break
+                # Short polls, so typed commands run while waiting for a spoken one
+                followup = listen_command(timeout=CONSOLE_POLL)
+                if followup is LISTEN_TIMEOUT:
+                    continue
                 if not followup:
-                    speaker.speak("I didn’t hear anything.")
+                    speaker.speak(NOT_HEARD)
                     continue
 
                 print(f"🎯 User said: {followup}")
 
-                # ✅ Global shutdown inside follow-up loop
-                if any(exit_command in followup for exit_command in EXIT_COMMANDS):
-                    speaker.speak("Shutting down completely. Goodbye!")
-                    try:
-                        sys.exit(0)
-                    except SystemExit:
-                        os._exit(0)
-
-                # ✅ Sleep mode inside follow-up
-                if any(sleep_cmd in followup for sleep_cmd in SLEEP_COMMANDS):
-                    speaker.speak("You're welcome! Returning to sleep mode.")
+                handled = ROUTER.dispatch(followup)
+                refresh_command_prompt()  # sessions recorded since startup join the vocabulary
+                if handled == "sleep":
                     break
-
-                # ✅ Admin mode switching
-                if "switch to admin" in followup and not IS_ADMIN_MODE:
-                    speaker.speak("This action requires administrative privileges. Please say yes to proceed.")
-                    approval = listen_command()
-                    if approval and "yes" in approval:
-                        run_as_admin()
-                        speaker.speak("Switched to admin mode successfully.")
-                    else:
-                        speaker.speak("Continuing in normal mode.")
-                    continue
-
-                if "switch to normal" in followup and IS_ADMIN_MODE:
-                    IS_ADMIN_MODE = False
-                    speaker.speak("Switched to normal mode.")
-                    continue
-
-                # ✅ Dry-run mode switching
-                if "enable dry run" in followup:
-                    DRY_RUN_MODE = True
-                    speaker.speak("Dry run mode enabled. RPA sessions will only log actions.")
-                    continue
-
-                if "disable dry run" in followup:
-                    DRY_RUN_MODE = False
-                    speaker.speak("Dry run mode disabled. RPA sessions will perform real actions.")
-                    continue
-
-                # 👉 Wi-Fi / Internet control (dynamic)
-                if "wifi" in followup or "internet" in followup:
-                    wifi_name = get_wifi_interface()
-                    last_profile = get_last_connected_wifi()
-                    if "on" in followup or "enable" in followup:
-                        enable_wifi(wifi_name, last_profile)
-                        continue
-                    elif "off" in followup or "disable" in followup:
-                        disable_wifi(wifi_name)
-                        continue
-                    elif "connect" in followup:
-                        os.system("start ms-settings:network-wifi")
-                        speaker.speak("Opening Wi-Fi connection panel")
-                        continue
-
-                # 👉 Launch app
-                app_name = clean_app_name(followup, LAUNCH_KEYWORDS)
-                if launcher_service.launch_app(app_name):
-                    speaker.speak(f"Launching {app_name}")
-                    continue
-
-                # 👉 Close app (web-app-safe)
-                app_name = clean_app_name(followup, CLOSE_KEYWORDS)
-                if launcher_service.close_app(app_name):
-                    speaker.speak(f"Closing {app_name}")
-                    continue
-
-                # 👉 Try RPA session with dry_run
-                if voice_rpa.run_session(followup, dry_run=DRY_RUN_MODE):
-                    speaker.speak(f"Running automation session: {followup}")
-                    continue
-
-                # 👉 Open site
-                site_name = clean_app_name(followup, LAUNCH_KEYWORDS)
-                site = site_service.open_site(site_name)
-                if site:
-                    speaker.speak(f"Opening {site}")
-                    continue
-
-                # 👉 Web search
-                if any(word in followup for word in ["search", "google", "bing", "duckduckgo"]):
-                    handle_web_search(followup)
-                    continue
-
-                # 👉 YouTube video commands
-                if "play video" in followup or "youtube" in followup:
-                    speaker.speak("Playing YouTube video...")
-                    Thread(target=youtube_tools.auto_skip_ads, args=(300, 2), daemon=True).start()
-                    continue
-
-                # If nothing matched
-                speaker.speak("Sorry, I don’t know that command yet.")
-
+                if not handled:
+                    speaker.speak(UNKNOWN_COMMAND)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
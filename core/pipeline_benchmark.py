@@ -0,0 +1,504 @@
+# core/pipeline_benchmark.py
+
+import functools
+import json
+import os
+import platform
+import string
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from voice import asr_engine
+from voice import capture
+
+# Recorded commands: 16 kHz mono 16-bit WAVs. The expected transcript is the file name
+# ("open_notepad.wav" -> "open notepad") unless manifest.json maps the file to
+# {"text": "...", "intent": "..."}; intent "wake" marks wake phrases.
+# The shipped manifest lists the commands to record (--record); WAVs are per machine/voice.
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "voice", "fixtures")
+MANIFEST = "manifest.json"
+
+# One JSON file per run
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "benchmarks")
+
+# ASR engine specs ("backend:model[:compute_type]"); a bare size means openai-whisper
+ENGINES = [
+    "whisper:tiny", "whisper:base", "whisper:small",
+    "faster-whisper:tiny:int8", "faster-whisper:base:int8", "faster-whisper:small:int8",
+]
+
+# Decoding profiles: "default" is open-ended transcription, "command" the
+# vocabulary-biased greedy profile core/main uses (voice.asr_engine.transcribe_command)
+PROFILES = ["default", "command"]
+
+# Auto-tune keeps the fastest engine whose fixture WER stays at or below this
+MAX_WER = 0.15
+
+# Fewer recorded fixtures than this are too few to choose an engine by; auto-tune only reports
+MIN_TUNE_FIXTURES = 10
+
+
+# --- Corpus ---
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    manifest_path = os.path.join(fixtures_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def missing_recordings(fixtures_dir=FIXTURES_DIR):
+    """Manifest entries that have no WAV yet."""
+    return [name for name in load_manifest(fixtures_dir)
+            if not os.path.exists(os.path.join(fixtures_dir, name))]
+
+
+def load_corpus(fixtures_dir=FIXTURES_DIR):
+    """List of {"path", "text", "intent"} for every WAV in the fixtures directory."""
+    manifest = load_manifest(fixtures_dir)
+    corpus = []
+    names = os.listdir(fixtures_dir) if os.path.isdir(fixtures_dir) else []
+    for name in sorted(names):
+        if not name.endswith(".wav"):
+            continue
+        entry = manifest.get(name, {})
+        corpus.append({
+            "path": os.path.join(fixtures_dir, name),
+            "text": entry.get("text", os.path.splitext(name)[0].replace("_", " ")),
+            "intent": entry.get("intent"),
+        })
+    return corpus
+
+
+def require_corpus(fixtures_dir=FIXTURES_DIR):
+    """The corpus, or FileNotFoundError saying which manifest commands still need recording."""
+    corpus = load_corpus(fixtures_dir)
+    missing = missing_recordings(fixtures_dir)
+    if not corpus:
+        hint = f" ({len(missing)} manifest commands not recorded yet)" if missing else ""
+        raise FileNotFoundError(f"No WAV fixtures in {fixtures_dir}{hint}; "
+                                f"record them with: python -m core.pipeline_benchmark --record")
+    if missing:
+        print(f"⚠️ {len(missing)} manifest commands have no recording yet: {', '.join(missing)}")
+    return corpus
+
+
+def record_fixtures(fixtures_dir=FIXTURES_DIR, overwrite=False):
+    """
+    Record every manifest command that has no WAV yet (all of them with
+    `overwrite`) from the microphone, one endpointed utterance each.
+    Returns the paths written.
+    """
+    written = []
+    for name, entry in load_manifest(fixtures_dir).items():
+        path = os.path.join(fixtures_dir, name)
+        if os.path.exists(path) and not overwrite:
+            continue
+        input(f"🎙️ Press Enter, then say: \"{entry['text']}\" ")
+        audio = capture.capture_utterance()
+        if audio is None:
+            print(f"⚠️ Nothing heard, skipped {name}")
+            continue
+        capture.write_wav(path, audio)
+        written.append(path)
+        print(f"✅ Saved {name} ({len(audio) / capture.SAMPLE_RATE:.1f}s)")
+    return written
+
+
+def _normalize(text):
+    return text.lower().translate(str.maketrans("", "", string.punctuation)).split()
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = _normalize(reference), _normalize(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref)
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    arr = np.array(values) * 1000
+    return {"p50": round(float(np.percentile(arr, 50)), 2),
+            "p95": round(float(np.percentile(arr, 95)), 2),
+            "max": round(float(arr.max()), 2)}
+
+
+# --- Offline transcription (process pool) ---
+
+def command_prompt():
+    """The vocabulary prompt core/main decodes commands with (once the sessions are indexed)."""
+    from core import main
+    main.voice_rpa.SESSION_INDEX.refresh(force=True)
+    return main.build_command_prompt(main.build_router())
+
+
+def _transcribe_fixture(job):
+    """Worker: transcribe one fixture with one engine and profile (the registry keeps the model per worker)."""
+    spec, profile, prompt, path = job
+    engine = asr_engine.create_engine(spec)
+    engine.load()  # a worker's first job must not count the model load as decode time
+    audio = capture.WavInputStream(path, pad_seconds=0).samples
+    start = time.perf_counter()
+    if profile == "command":
+        result = asr_engine.transcribe_command(audio, prompt, engine=engine, language="en")
+    else:
+        result = engine.transcribe(audio, language="en")
+    return {"text": result.get("text", "").strip(), "asr_time": time.perf_counter() - start,
+            "audio_seconds": len(audio) / capture.SAMPLE_RATE, "profile": result.get("profile", profile)}
+
+
+def transcribe_corpus(corpus, engines, workers=None, profiles=("default",), prompt=None):
+    """
+    Transcribe every fixture with every engine and profile in parallel;
+    returns {(spec, profile): [result, ...]}.
+    """
+    jobs = [(spec, profile, prompt, item["path"]) for spec in engines for profile in profiles for item in corpus]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Jobs are grouped by engine, so chunks mostly reuse the model a worker already loaded
+        results = list(pool.map(_transcribe_fixture, jobs, chunksize=max(1, len(corpus) // 4)))
+    by_config = {}
+    for (spec, profile, _prompt, _path), result in zip(jobs, results):
+        by_config.setdefault((spec, profile), []).append(result)
+    return by_config
+
+
+def offline_report(corpus, results):
+    wers = [word_error_rate(item["text"], r["text"]) for item, r in zip(corpus, results)]
+    audio = sum(r["audio_seconds"] for r in results)
+    return {
+        "wer": round(float(np.mean(wers)), 4),
+        "exact": round(sum(w == 0 for w in wers) / len(wers), 4),
+        "rtf": round(sum(r["asr_time"] for r in results) / audio, 4) if audio else None,
+        "asr_ms": _percentiles([r["asr_time"] for r in results]),
+        # Command-profile decodes that were redone with full decoding
+        "fallback_rate": round(sum(r.get("profile") == "fallback" for r in results) / len(results), 4),
+    }
+
+
+def compare_profiles(corpus, offline, engines):
+    """Command profile against the default, per engine: decode speedup and WER change."""
+    comparison = {}
+    for spec in engines:
+        if (spec, "default") not in offline or (spec, "command") not in offline:
+            continue
+        default = offline_report(corpus, offline[(spec, "default")])
+        command = offline_report(corpus, offline[(spec, "command")])
+        default_ms, command_ms = default["asr_ms"]["p50"], command["asr_ms"]["p50"]
+        comparison[spec] = {
+            "default_p50_ms": default_ms,
+            "command_p50_ms": command_ms,
+            "speedup": round(default_ms / command_ms, 2) if command_ms else None,
+            "default_wer": default["wer"],
+            "command_wer": command["wer"],
+            "fallback_rate": command["fallback_rate"],
+        }
+    return comparison
+
+
+# --- Online path: listen_command -> ROUTER.dispatch with fakes ---
+
+class FakeEffects:
+    """Records what the assistant would have done (TTS, browser, apps, RPA, Wi-Fi) with timestamps."""
+
+    def __init__(self):
+        self.calls = []
+
+    def record(self, kind, *args):
+        self.calls.append((time.perf_counter(), kind, args))
+
+    def first_after(self, t):
+        return next((when for when, _kind, _args in self.calls if when >= t), None)
+
+    def install(self, stack, main):
+        from apps import launcher_service
+        from RPA import voice_rpa, youtube_tools
+        from voice import speaker
+
+        def fake(kind, result=True):
+            return lambda *args, **kwargs: (self.record(kind, *args), result)[1]
+
+        def fake_launch(name):
+            self.record("launch_app", name)
+            return launcher_service.find_app(name) is not None
+
+        stack.enter_context(mock.patch.object(speaker, "speak", fake("speak", None)))
+        stack.enter_context(mock.patch("webbrowser.open", fake("browser")))
+        stack.enter_context(mock.patch.object(launcher_service, "launch_app", fake_launch))
+        stack.enter_context(mock.patch.object(launcher_service, "close_app", fake("close_app")))
+        stack.enter_context(mock.patch.object(voice_rpa, "play_session", fake("rpa_session", None)))
+        stack.enter_context(mock.patch.object(youtube_tools, "auto_skip_ads", fake("youtube", None)))
+        stack.enter_context(mock.patch.object(main, "get_wifi_interface", lambda: "Wi-Fi"))
+        stack.enter_context(mock.patch.object(main, "get_last_connected_wifi", lambda: None))
+        stack.enter_context(mock.patch.object(main, "enable_wifi", fake("wifi_on")))
+        stack.enter_context(mock.patch.object(main, "disable_wifi", fake("wifi_off")))
+        stack.enter_context(mock.patch.object(main, "run_as_admin", fake("run_as_admin", None)))
+        stack.enter_context(mock.patch.object(main, "shutdown", fake("shutdown")))
+        stack.enter_context(mock.patch.object(main.os, "system", fake("system", 0)))
+
+
+class _TimedEngine:
+    """Engine wrapper that records how long each decode takes."""
+
+    def __init__(self, engine, times):
+        self.engine = engine
+        self.times = times
+
+    def transcribe(self, audio, **options):
+        start = time.perf_counter()
+        try:
+            return self.engine.transcribe(audio, **options)
+        finally:
+            self.times.append(time.perf_counter() - start)
+
+
+def run_online(corpus, spec, streaming=True, realtime=True, command_mode=False, prompt=None):
+    """
+    Feed each fixture through core.main.listen_command and ROUTER.dispatch, with the
+    microphone replaced by the WAV file and every side effect faked.
+    Returns per-utterance stage timings.
+    """
+    from core import main
+    from core.tasks import TaskManager
+
+    effects = FakeEffects()
+    current = {}
+    capture_stats = {}
+    asr_times = []
+
+    def stream_factory(**kwargs):
+        return capture.WavInputStream(current["path"], realtime=realtime, **kwargs)
+
+    def fake_rec(frames, **kwargs):
+        samples = capture.WavInputStream(current["path"], pad_seconds=0).samples[:frames]
+        return np.pad(samples, (0, frames - len(samples))).reshape(-1, 1)
+
+    engine = asr_engine.create_engine(spec)
+
+    rows = []
+    with ExitStack() as stack:
+        effects.install(stack, main)
+        stack.enter_context(mock.patch.object(main, "STREAMING_CAPTURE", streaming))
+        stack.enter_context(mock.patch.object(main, "CONTINUOUS_CAPTURE", False))
+        stack.enter_context(mock.patch.object(main, "COMMAND_MODE", command_mode))
+        stack.enter_context(mock.patch.object(main, "COMMAND_PROMPT", prompt))
+        stack.enter_context(mock.patch.object(main, "TASKS", TaskManager()))  # created by main() otherwise
+        stack.enter_context(mock.patch.object(capture, "_default_stream_factory", stream_factory))
+        stack.enter_context(mock.patch.object(
+            capture, "capture_utterance", functools.partial(capture.capture_utterance, stats=capture_stats)))
+        stack.enter_context(mock.patch.object(main.sd, "rec", fake_rec))
+        stack.enter_context(mock.patch.object(main.sd, "wait", lambda: None))
+        timed = _TimedEngine(engine, asr_times)
+        stack.enter_context(mock.patch.object(asr_engine, "get_engine", lambda: timed))
+
+        router = main.build_router()
+        stack.enter_context(mock.patch.object(main, "ROUTER", router))
+        engine.load()  # load time is not part of the command latency
+
+        for item in corpus:
+            current["path"] = item["path"]
+            capture_stats.clear()
+            asr_times.clear()
+            effects.calls.clear()
+
+            start = time.perf_counter()
+            text = main.listen_command() or ""
+            heard = time.perf_counter()
+            if item["intent"] == "wake":
+                intent = "wake" if any(alias in text for alias in main.WAKE_ALIASES) else None
+            else:
+                intent = router.dispatch(text) if text else None
+            done = time.perf_counter()
+
+            asr = sum(asr_times)
+            endpoint = capture_stats.get("endpoint_latency") or 0.0
+            action = effects.first_after(heard)
+            rows.append({
+                "fixture": os.path.basename(item["path"]),
+                "expected": item["text"],
+                "heard": text,
+                "wer": word_error_rate(item["text"], text),
+                "intent": intent,
+                "intent_ok": None if item["intent"] is None else intent == item["intent"],
+                "capture": heard - start - asr,
+                "endpoint": endpoint,
+                "asr": asr,
+                "dispatch": done - heard,
+                # End of speech -> first side effect (or end of dispatch when nothing fired)
+                "end_to_action": endpoint + asr + ((action or done) - heard),
+            })
+    return rows
+
+
+def online_report(rows):
+    checked = [r["intent_ok"] for r in rows if r["intent_ok"] is not None]
+    return {
+        "wer": round(float(np.mean([r["wer"] for r in rows])), 4),
+        "intent_accuracy": round(sum(checked) / len(checked), 4) if checked else None,
+        "stages_ms": {stage: _percentiles([r[stage] for r in rows])
+                      for stage in ("capture", "endpoint", "asr", "dispatch", "end_to_action")},
+    }
+
+
+def run(fixtures_dir=FIXTURES_DIR, engines=ENGINES, workers=None, realtime=True, fixed_window=False,
+        results_dir=RESULTS_DIR, profiles=PROFILES):
+    """Benchmark every ASR engine, decoding profile (and capture mode); returns (results, saved path)."""
+    corpus = require_corpus(fixtures_dir)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "fixtures": len(corpus),
+        "realtime": realtime,
+        "configs": [],
+    }
+    prompt = command_prompt() if "command" in profiles else None
+    offline = transcribe_corpus(corpus, engines, workers, profiles, prompt)
+    for spec in engines:
+        for profile in profiles:
+            for streaming in ([True, False] if fixed_window else [True]):
+                rows = run_online(corpus, spec, streaming=streaming, realtime=realtime,
+                                  command_mode=profile == "command", prompt=prompt)
+                results["configs"].append({
+                    "engine": spec,
+                    "profile": profile,
+                    "capture": "streaming" if streaming else "fixed",
+                    "offline": offline_report(corpus, offline[(spec, profile)]),
+                    "online": online_report(rows),
+                    "utterances": rows,
+                })
+    results["profiles"] = compare_profiles(corpus, offline, engines)
+
+    os.makedirs(results_dir, exist_ok=True)
+    out_path = os.path.join(results_dir, f"voice_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    return results, out_path
+
+
+def autotune(fixtures_dir=FIXTURES_DIR, engines=ENGINES, max_wer=MAX_WER, workers=None, save=True,
+             profile="command"):
+    """
+    Decode the fixtures with every engine (using `profile`, the one core/main decodes
+    commands with by default) and pick the fastest (median decode time) whose WER is
+    at most max_wer; the most accurate one if none qualifies.
+    Saves the choice as the ASR config unless fewer than MIN_TUNE_FIXTURES are recorded.
+    Returns (chosen spec, {spec: offline report}, saved).
+    """
+    corpus = require_corpus(fixtures_dir)
+    if save and len(corpus) < MIN_TUNE_FIXTURES:
+        print(f"⚠️ Only {len(corpus)} fixtures (need {MIN_TUNE_FIXTURES}); reporting without saving the ASR config")
+        save = False
+    prompt = command_prompt() if profile == "command" else None
+    offline = transcribe_corpus(corpus, engines, workers, [profile], prompt)
+    reports = {spec: offline_report(corpus, offline[(spec, profile)]) for spec in engines}
+    passing = [spec for spec in engines if reports[spec]["wer"] <= max_wer]
+    if passing:
+        chosen = min(passing, key=lambda spec: (reports[spec]["asr_ms"]["p50"], reports[spec]["wer"]))
+    else:
+        print(f"⚠️ No engine reached WER <= {max_wer:.0%}; using the most accurate one")
+        chosen = min(engines, key=lambda spec: (reports[spec]["wer"], reports[spec]["asr_ms"]["p50"]))
+    if save:
+        asr_engine.save_config({
+            "engine": chosen,
+            "profile": profile,
+            "max_wer": max_wer,
+            "wer": reports[chosen]["wer"],
+            "asr_p50_ms": reports[chosen]["asr_ms"]["p50"],
+            "fixtures": len(corpus),
+            "tuned": datetime.now().isoformat(timespec="seconds"),
+        })
+    return chosen, reports, save
+
+
+def print_autotune(chosen, reports):
+    print("⏱️ ASR auto-tune (offline decode of the fixtures)")
+    for spec, report in reports.items():
+        mark = "✅" if spec == chosen else "  "
+        print(f"  {mark} {spec:<26} WER {report['wer']:.2%} | RTF {report['rtf']} "
+              f"| decode p50 {report['asr_ms']['p50']} ms, p95 {report['asr_ms']['p95']} ms")
+
+
+def print_results(results):
+    print(f"⏱️ Voice pipeline benchmark: {results['fixtures']} fixtures, {results['platform']}")
+    for config in results["configs"]:
+        offline, online = config["offline"], config["online"]
+        e2a = online["stages_ms"]["end_to_action"]
+        accuracy = online["intent_accuracy"]
+        print(f"  {config['engine']:<26} {config['profile']:<8} {config['capture']:<9} | WER {offline['wer']:.2%} | RTF {offline['rtf']} "
+              f"| intents {'n/a' if accuracy is None else f'{accuracy:.0%}'} "
+              f"| end->action p50 {e2a['p50']} ms, p95 {e2a['p95']} ms")
+        for stage, p in online["stages_ms"].items():
+            print(f"      {stage:<13} p50 {p['p50']:>8} ms  p95 {p['p95']:>8} ms  max {p['max']:>8} ms")
+    if results.get("profiles"):
+        print("⚡ Command profile vs default (offline decode)")
+        for spec, c in results["profiles"].items():
+            print(f"  {spec:<26} p50 {c['default_p50_ms']} -> {c['command_p50_ms']} ms (x{c['speedup']}) "
+                  f"| WER {c['default_wer']:.2%} -> {c['command_wer']:.2%} | fallbacks {c['fallback_rate']:.0%}")
+
+
+# Usage: python -m core.pipeline_benchmark [--fixtures DIR] [--engines whisper:small,faster-whisper:small:int8]
+#                                          [--workers N] [--fast] [--fixed-window]
+#                                          [--profiles default,command]
+#        python -m core.pipeline_benchmark --autotune [--max-wer 0.15] [--engines ...] [--profile command] [--dry]
+#        python -m core.pipeline_benchmark --record [--fixtures DIR] [--overwrite]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    if "--record" in args:
+        fixtures_dir = option("--fixtures", FIXTURES_DIR)
+        written = record_fixtures(fixtures_dir, overwrite="--overwrite" in args)
+        print(f"✅ Recorded {len(written)} fixtures in {fixtures_dir}")
+        sys.exit(0)
+
+    engines = option("--engines", ",".join(ENGINES)).split(",")
+    if "--autotune" in args:
+        try:
+            chosen, reports, saved = autotune(
+                fixtures_dir=option("--fixtures", FIXTURES_DIR),
+                engines=engines,
+                max_wer=float(option("--max-wer", MAX_WER)),
+                workers=int(option("--workers", 0)) or None,
+                save="--dry" not in args,
+                profile=option("--profile", "command"),
+            )
+        except FileNotFoundError as e:
+            print(f"❌ {e}; the ASR config is unchanged")
+            sys.exit(1)
+        print_autotune(chosen, reports)
+        if saved:
+            print(f"✅ ASR engine set to {chosen} in {asr_engine.CONFIG_FILE}")
+        sys.exit(0)
+
+    try:
+        results, out_path = run(
+            fixtures_dir=option("--fixtures", FIXTURES_DIR),
+            engines=engines,
+            workers=int(option("--workers", 0)) or None,
+            realtime="--fast" not in args,
+            fixed_window="--fixed-window" in args,
+            profiles=option("--profiles", ",".join(PROFILES)).split(","),
+        )
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print_results(results)
+    print(f"✅ Results saved to {out_path}")
@@ -0,0 +1,163 @@
+# core/tasks.py
+
+import threading
+import time
+from itertools import count
+
+# Max tasks of one kind running at once; kinds not listed use DEFAULT_LIMIT
+KIND_LIMITS = {"automation": 1, "video": 1}
+DEFAULT_LIMIT = 2
+
+# Finished tasks kept for status queries
+HISTORY_SIZE = 20
+
+
+class Task:
+    """
+    One named unit of background work. Cancellation is cooperative: the work
+    checks should_stop() (or waits with wait_cancelled()), and `on_cancel`
+    can stop work that has its own stop switch.
+    """
+
+    def __init__(self, task_id, name, kind, on_cancel=None):
+        self.id = task_id
+        self.name = name
+        self.kind = kind
+        self.on_cancel = on_cancel
+        self.status = "pending"  # pending -> running -> done / cancelled / failed
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def cancel(self):
+        if self._cancel.is_set():
+            return
+        self._cancel.set()
+        if self.on_cancel:
+            try:
+                self.on_cancel()
+            except Exception as e:
+                print(f"⚠️ Error cancelling '{self.name}': {e}")
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def should_stop(self):
+        return self._cancel.is_set()
+
+    def wait_cancelled(self, timeout):
+        """Sleep up to `timeout` seconds; True as soon as the task is cancelled."""
+        return self._cancel.wait(timeout)
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def info(self):
+        return {"id": self.id, "name": self.name, "kind": self.kind, "status": self.status,
+                "elapsed": round(self.elapsed(), 1), "error": self.error}
+
+
+class TaskManager:
+    """
+    Runs long actions (RPA sessions, ad watching, ...) on background threads so
+    the voice loop stays responsive. Tasks are named, limited per kind, can be
+    listed and cancelled, and keep a short history.
+    """
+
+    def __init__(self, limits=None, default_limit=DEFAULT_LIMIT):
+        self.limits = dict(KIND_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+        self._active = {}  # id -> Task
+        self._history = []
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "rejected": 0, "done": 0, "cancelled": 0, "failed": 0}
+
+    def limit(self, kind):
+        return self.limits.get(kind, self.default_limit)
+
+    def submit(self, name, kind, target, *args, on_cancel=None, **kwargs):
+        """
+        Run `target(task, *args, **kwargs)` on a new thread.
+        Returns the Task, or None when `kind` is already at its concurrency limit.
+        """
+        with self._lock:
+            if len([t for t in self._active.values() if t.kind == kind]) >= self.limit(kind):
+                self.stats["rejected"] += 1
+                return None
+            task = Task(next(self._ids), name, kind, on_cancel)
+            task._thread = threading.Thread(target=self._run, args=(task, target, args, kwargs), daemon=True,
+                                            name=f"task-{kind}-{task.id}")
+            task.status = "running"
+            task.started = time.monotonic()
+            self._active[task.id] = task
+            self.stats["submitted"] += 1
+            # Started under the lock, so wait() never sees an unstarted thread; _run's
+            # bookkeeping waits for the lock, so the task is published before it can finish
+            task._thread.start()
+        return task
+
+    def _run(self, task, target, args, kwargs):
+        try:
+            task.result = target(task, *args, **kwargs)
+            task.status = "cancelled" if task.cancelled else "done"
+        except Exception as e:
+            task.status = "failed"
+            task.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Task '{task.name}' failed: {task.error}")
+        finally:
+            task.finished = time.monotonic()
+            with self._lock:
+                self._active.pop(task.id, None)
+                self._history.append(task)
+                del self._history[:-HISTORY_SIZE]
+                self.stats[task.status] += 1
+
+    def running(self, kind=None):
+        """Active tasks (optionally of one kind), oldest first."""
+        with self._lock:
+            return [t for t in self._active.values() if kind is None or t.kind == kind]
+
+    def cancel(self, kind=None, name=None):
+        """Cancel active tasks matching `kind` and/or `name` (all when neither is given). Returns them."""
+        tasks = [t for t in self.running(kind) if name is None or t.name == name]
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    def wait(self, timeout=None):
+        """Wait for active tasks to finish. Returns False if some are still running after `timeout`."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for task in self.running():
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return False
+            if task._thread is not None:
+                task._thread.join(remaining)
+        return not self.running()
+
+    def history(self):
+        with self._lock:
+            return list(self._history)
+
+    def summary(self):
+        """One sentence for speech: what is running and for how long."""
+        tasks = self.running()
+        if not tasks:
+            return "Nothing is running."
+        parts = [f"{t.name} ({t.kind}, {int(t.elapsed())} seconds)" for t in tasks]
+        return "Running: " + ", ".join(parts) + "."
+
+    def report(self):
+        return {**self.stats, "running": [t.info() for t in self.running()],
+                "recent": [t.info() for t in self.history()[-5:]]}
@@ -0,0 +1,262 @@
+# voice/asr_engine.py
+
+import json
+import os
+import threading
+import time
+
+from voice import model_registry
+
+# Which engine recognises speech. Written by the auto-tuner
+# (python -m core.pipeline_benchmark --autotune) or edited by hand.
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "asr_config.json")
+
+# Used when there is no config file: the original openai-whisper path
+DEFAULT_ENGINE = f"whisper:{model_registry.DEFAULT_MODEL}"
+
+# "Command" decoding profile for short commands from a known vocabulary: greedy,
+# no temperature fallback, no conditioning on earlier text, and a short token budget
+COMMAND_OPTIONS = {
+    "temperature": 0.0,
+    "beam_size": None,
+    "condition_on_previous_text": False,
+    "without_timestamps": True,
+    "sample_len": 32,
+}
+
+# A command decode below these is redone with the default (beam/fallback) profile
+MIN_COMMAND_LOGPROB = -0.7
+MAX_COMMAND_COMPRESSION = 2.4
+
+# Vocabulary prompts are cut to this length (Whisper keeps at most ~224 prompt tokens)
+PROMPT_CHARS = 600
+
+# Whisper transcribe() options faster-whisper spells differently, or does not take
+_FASTER_RENAMES = {"logprob_threshold": "log_prob_threshold", "sample_len": "max_new_tokens"}
+_FASTER_IGNORED = {"fp16", "verbose"}
+
+
+def parse_spec(spec):
+    """"backend:model[:compute_type]" -> (backend, model, compute_type). A bare size means Whisper."""
+    parts = spec.split(":")
+    if len(parts) == 1:
+        return "whisper", parts[0], None
+    backend, model = parts[0], parts[1]
+    if backend not in model_registry.LOADERS:
+        raise ValueError(f"Unknown ASR backend: {backend}")
+    compute_type = parts[2] if len(parts) > 2 else None
+    if backend != "whisper":
+        compute_type = compute_type or model_registry.DEFAULT_COMPUTE_TYPE
+    return backend, model, compute_type
+
+
+def _segment(text, avg_logprob, no_speech_prob, compression_ratio):
+    return {"text": text, "avg_logprob": avg_logprob, "no_speech_prob": no_speech_prob,
+            "compression_ratio": compression_ratio}
+
+
+class WhisperEngine:
+    """openai-whisper (PyTorch) on CPU with fp32 decoding."""
+
+    backend = "whisper"
+
+    def __init__(self, model=model_registry.DEFAULT_MODEL):
+        self.model = model
+        self.spec = f"whisper:{model}"
+
+    def load(self):
+        return model_registry.get_model(self.model)
+
+    def warm_up(self, background=True):
+        return model_registry.warm_up(self.model, background)
+
+    def transcribe(self, audio, **options):
+        """Whisper-style result: {"text", "segments", "language"}."""
+        result = model_registry.transcribe(audio, self.model, **options)
+        result["segments"] = [
+            _segment(s.get("text", ""), s.get("avg_logprob"), s.get("no_speech_prob"), s.get("compression_ratio"))
+            for s in result.get("segments", [])
+        ]
+        return result
+
+
+class FasterWhisperEngine:
+    """
+    faster-whisper (CTranslate2) with quantized weights, int8 by default.
+    Same checkpoints as Whisper, several times faster on CPU.
+    """
+
+    backend = "faster-whisper"
+
+    def __init__(self, model=model_registry.DEFAULT_MODEL, compute_type=model_registry.DEFAULT_COMPUTE_TYPE):
+        self.model = model
+        self.compute_type = compute_type
+        self.spec = f"faster-whisper:{model}:{compute_type}"
+
+    def load(self):
+        return model_registry.get_model(self.model, "faster-whisper", self.compute_type)
+
+    def warm_up(self, background=True):
+        return model_registry.warm_up(self.model, background, "faster-whisper", self.compute_type)
+
+    def transcribe(self, audio, **options):
+        """Takes openai-whisper's transcribe() options and returns a result shaped like its output."""
+        options = {_FASTER_RENAMES.get(k, k): v for k, v in options.items() if k not in _FASTER_IGNORED}
+        options.setdefault("language", "en")
+        # openai-whisper's transcribe() decodes greedily unless asked otherwise; faster-whisper defaults to beam 5
+        if options.get("beam_size") is None:
+            options["beam_size"] = 1
+        segments, info = self.load().transcribe(audio, **options)
+        segments = [_segment(s.text, s.avg_logprob, s.no_speech_prob, s.compression_ratio) for s in segments]
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": info.language}
+
+
+def create_engine(spec=DEFAULT_ENGINE):
+    """Engine for a spec such as "whisper:small" or "faster-whisper:small:int8"."""
+    backend, model, compute_type = parse_spec(spec)
+    if backend == "faster-whisper":
+        return FasterWhisperEngine(model, compute_type)
+    return WhisperEngine(model)
+
+
+def load_config(path=CONFIG_FILE):
+    """Saved engine config ({"engine": spec, ...}), or the default."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"engine": DEFAULT_ENGINE}
+
+
+def save_config(config, path=CONFIG_FILE):
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+# Process-wide engine used by transcribe()
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            spec = load_config().get("engine", DEFAULT_ENGINE)
+            try:
+                _engine = create_engine(spec)
+            except ValueError as e:
+                print(f"⚠️ Bad ASR config ({e}), using {DEFAULT_ENGINE}")
+                _engine = create_engine(DEFAULT_ENGINE)
+        return _engine
+
+
+def set_engine(engine):
+    """Replace the shared engine (an engine object or a spec string)."""
+    global _engine
+    with _engine_lock:
+        _engine = create_engine(engine) if isinstance(engine, str) else engine
+        return _engine
+
+
+def warm_up(background=True):
+    """Load the configured engine's model ahead of the first command."""
+    return get_engine().warm_up(background)
+
+
+def transcribe(audio, **options):
+    """Transcribe with the configured engine (English unless told otherwise)."""
+    options.setdefault("language", "en")
+    return get_engine().transcribe(audio, **options)
+
+
+# --- Command profile ---
+
+def vocabulary_prompt(phrases, max_chars=PROMPT_CHARS):
+    """
+    Comma-separated prompt of unique phrases, in the given order, within max_chars.
+    Phrases that no longer fit are left out (shorter later ones may still fit) and reported.
+    """
+    seen = set()
+    dropped = []
+    prompt = ""
+    for phrase in phrases:
+        phrase = phrase.strip().lower()
+        if not phrase or phrase in seen:
+            continue
+        seen.add(phrase)
+        candidate = f"{prompt}, {phrase}" if prompt else phrase
+        if len(candidate) > max_chars:
+            dropped.append(phrase)
+            continue
+        prompt = candidate
+    if dropped:
+        print(f"⚠️ Vocabulary prompt is full ({max_chars} chars); left out {len(dropped)}: {', '.join(dropped)}")
+    return prompt
+
+
+def confidence(result):
+    """(mean avg_logprob, worst compression ratio) over the result's segments."""
+    segments = result.get("segments") or []
+    logprobs = [s["avg_logprob"] for s in segments if s.get("avg_logprob") is not None]
+    ratios = [s["compression_ratio"] for s in segments if s.get("compression_ratio") is not None]
+    return (sum(logprobs) / len(logprobs) if logprobs else None), (max(ratios) if ratios else None)
+
+
+def is_confident(result, min_logprob=MIN_COMMAND_LOGPROB, max_compression=MAX_COMMAND_COMPRESSION):
+    if not result.get("text", "").strip():
+        return True  # nothing said; a slower decode will not find words either
+    logprob, compression = confidence(result)
+    if logprob is not None and logprob < min_logprob:
+        return False
+    return compression is None or compression <= max_compression
+
+
+def _fmt(value):
+    return "n/a" if value is None else f"{value:.2f}"
+
+
+# Command-profile counters for the session report
+PROFILE_STATS = {"command": 0, "fallback": 0, "command_time": 0.0, "fallback_time": 0.0}
+
+
+def transcribe_command(audio, prompt=None, engine=None, **options):
+    """
+    Fast decode of a short command, biased towards `prompt` (see vocabulary_prompt).
+    Falls back to the default profile when the result is not confident.
+    result["profile"] is "command" or "fallback".
+    """
+    engine = engine or get_engine()
+    options.setdefault("language", "en")
+    # An explicit prompt wins over one passed in options; both decodes keep it
+    options["initial_prompt"] = prompt or options.get("initial_prompt")
+    start = time.perf_counter()
+    result = engine.transcribe(audio, **{**options, **COMMAND_OPTIONS})
+    PROFILE_STATS["command_time"] += time.perf_counter() - start
+    PROFILE_STATS["command"] += 1
+    if is_confident(result):
+        result["profile"] = "command"
+        return result
+
+    logprob, compression = confidence(result)
+    print(f"🔁 Low-confidence command decode ('{result.get('text', '').strip()}', "
+          f"logprob {_fmt(logprob)}, compression {_fmt(compression)}), retrying with full decoding")
+    start = time.perf_counter()
+    result = engine.transcribe(audio, **options)
+    PROFILE_STATS["fallback_time"] += time.perf_counter() - start
+    PROFILE_STATS["fallback"] += 1
+    result["profile"] = "fallback"
+    return result
+
+
+def profile_stats():
+    stats = dict(PROFILE_STATS)
+    runs = stats["command"]
+    stats["fallback_rate"] = round(stats["fallback"] / runs, 3) if runs else 0.0
+    stats["avg_command_ms"] = round(stats["command_time"] / runs * 1000, 1) if runs else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    engine = get_engine()
+    print(f"🎧 ASR engine: {engine.spec} (config: {CONFIG_FILE if os.path.exists(CONFIG_FILE) else 'default'})")
@@ -0,0 +1,308 @@
+# voice/audio_worker.py
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from threading import Thread
+
+from voice import capture
+
+# Seconds of audio the shared ring buffer holds
+CAPACITY_SECONDS = 30
+
+# Supervisor: how often the worker processes are checked, and how long to wait before a restart.
+# A process that dies within STABLE_SECONDS of starting doubles the delay, up to MAX_RESTART_DELAY.
+SUPERVISE_INTERVAL = 0.5
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+STABLE_SECONDS = 10.0
+
+# The recognizer waits at most this long for speech before checking for stop/skip/mode changes
+LISTEN_POLL = 0.5
+
+# stop(): how long a worker process gets to exit, before and after terminate()
+STOP_TIMEOUT = 1.0
+
+# Spawn everywhere: the same behaviour as on Windows, and no forking of a process with threads
+_ctx = multiprocessing.get_context("spawn")
+
+
+# --- Worker processes ---
+
+def _capture_main(shm_name, capacity, sample_rate, stream_factory, stop):
+    """Capture process: microphone -> shared ring buffer. Does nothing else, so it is never starved."""
+    from voice.ring_buffer import SharedAudioRingBuffer
+
+    ring = SharedAudioRingBuffer(capacity, name=shm_name)
+    frame_size = int(sample_rate * capture.FRAME_MS / 1000)
+    stream_factory = stream_factory or capture._default_stream_factory
+    with stream_factory(samplerate=sample_rate, channels=capture.CHANNELS,
+                        dtype="float32", blocksize=frame_size) as stream:
+        while not stop.is_set():
+            data, _overflowed = stream.read(frame_size)
+            ring.write(data[:, 0] if data.ndim > 1 else data)
+
+
+def _control_loop(control, state, stop):
+    while not stop.is_set():
+        try:
+            key, value = control.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        state[key] = value
+
+
+def _recognizer_main(shm_name, capacity, sample_rate, keywords, wake_aliases, mode, prompt, command_mode,
+                     control, results, stop):
+    """
+    Recognizer process: endpoints utterances from the shared ring buffer and
+    transcribes them. In "wake" mode audio goes through the wake gate, in
+    "command" mode every utterance is decoded (with the command profile when
+    command_mode is set). Sends ("transcript", mode, text, t, span), span being
+    the utterance's wall-clock (start, end) for the main process's echo gate.
+    """
+    from voice import asr_engine
+    from voice.ring_buffer import BackgroundCapture, SharedAudioRingBuffer
+    from voice.wake_gate import WakeGate
+
+    ring = SharedAudioRingBuffer(capacity, name=shm_name)
+    source = BackgroundCapture(sample_rate=sample_rate, buffer=ring,
+                               on_speech_start=lambda: results.put(("speech_start", time.time())))
+    gate = WakeGate(keywords, sample_rate=sample_rate, source=source)
+    asr_engine.warm_up(background=False)
+    source.skip_to_now()
+    results.put(("ready", os.getpid()))
+
+    state = {"mode": mode, "prompt": prompt}
+    Thread(target=_control_loop, args=(control, state, stop), daemon=True).start()
+    waiting_since = None  # command mode: when the wait for the current command began
+    while not stop.is_set():
+        if state.pop("skip", False):
+            source.skip_to_now()
+            waiting_since = None
+        current = state["mode"]
+        if current != "command":
+            waiting_since = None
+        try:
+            source.last_span = None
+            if current == "wake":
+                text = gate.listen(timeout=LISTEN_POLL)
+                if not text:
+                    continue
+                # Go straight to command decoding; the main loop will ask for it anyway
+                if any(alias in text for alias in wake_aliases):
+                    state["mode"] = "command"
+            else:
+                audio = source.next_utterance(timeout=LISTEN_POLL)
+                if audio is None and source.last_reason == "timeout":
+                    # Nobody has spoken yet: keep waiting, and report "nothing heard" only after
+                    # the usual no-speech timeout
+                    waiting_since = waiting_since or time.monotonic()
+                    if time.monotonic() - waiting_since < capture.NO_SPEECH_TIMEOUT:
+                        continue
+                waiting_since = None
+                text = None
+                if audio is not None:
+                    if command_mode:
+                        result = asr_engine.transcribe_command(audio, state["prompt"], language="en")
+                    else:
+                        result = asr_engine.transcribe(audio, language="en")
+                    text = result.get("text", "").strip().lower() or None
+        except Exception as e:
+            results.put(("error", f"{type(e).__name__}: {e}"))
+            continue
+        results.put(("transcript", current, text, time.time(), source.last_span))
+
+
+# --- Main-process side ---
+
+class AudioWorker:
+    """
+    Runs microphone capture and speech recognition in two child processes, so
+    RPA playback, input hooks and decoding in this process cannot starve the
+    audio callback. Audio goes from the capture process to the recognizer
+    through a SharedAudioRingBuffer; transcripts come back over a queue and
+    are read with next_transcript(). Crashed processes are restarted.
+    """
+
+    def __init__(self, keywords, wake_aliases, sample_rate=capture.SAMPLE_RATE,
+                 capacity_seconds=CAPACITY_SECONDS, prompt=None, command_mode=True, on_speech_start=None,
+                 stream_factory=None, echo_filter=None):
+        self.keywords = list(keywords)
+        self.wake_aliases = list(wake_aliases)
+        self.sample_rate = sample_rate
+        self.capacity = int(capacity_seconds * sample_rate)
+        self.prompt = prompt
+        self.command_mode = command_mode
+        self.mode = "wake"
+        # Called in this process when the user starts speaking (barge-in)
+        self.on_speech_start = on_speech_start
+        # Echo gate, run in this process: echo_filter(start, end) (wall clock) is True while the
+        # assistant was talking; such speech starts and transcripts are dropped (see BackgroundCapture)
+        self.echo_filter = echo_filter
+        # Must be picklable (e.g. functools.partial(capture.WavInputStream, path)): it is sent to the capture process
+        self.stream_factory = stream_factory
+        self.ring = None
+        self._capture = None
+        self._recognizer = None
+        self._control = None
+        self._results = None
+        self._stop = None
+        self._transcripts = queue.Queue()
+        self._running = threading.Event()
+        self._lock = threading.Lock()
+        self.counters = {"transcripts": 0, "errors": 0, "echo_dropped": 0,
+                         "capture_restarts": 0, "recognizer_restarts": 0}
+        # Per process: when it was last started, current back-off delay, pending restart time
+        self._restart = {name: {"started": 0.0, "delay": RESTART_DELAY, "at": None}
+                         for name in ("capture", "recognizer")}
+        self.latency = 0.0  # sum of worker -> main loop delivery times
+
+    def _spawn_capture(self):
+        self._capture = _ctx.Process(target=_capture_main, name="omega-capture", daemon=True,
+                                     args=(self.ring.name, self.capacity, self.sample_rate, self.stream_factory,
+                                           self._stop))
+        self._capture.start()
+        self._restart["capture"]["started"] = time.monotonic()
+
+    def _spawn_recognizer(self):
+        # Fresh queues: a killed process can leave a queue's lock held
+        self._control = _ctx.Queue()
+        self._results = _ctx.Queue()
+        self._recognizer = _ctx.Process(
+            target=_recognizer_main, name="omega-recognizer", daemon=True,
+            args=(self.ring.name, self.capacity, self.sample_rate, self.keywords, self.wake_aliases,
+                  self.mode, self.prompt, self.command_mode, self._control, self._results, self._stop),
+        )
+        self._recognizer.start()
+        self._restart["recognizer"]["started"] = time.monotonic()
+
+    def start(self):
+        from voice.ring_buffer import SharedAudioRingBuffer
+
+        if self._running.is_set():
+            return
+        self.ring = SharedAudioRingBuffer(self.capacity, create=True)
+        self._stop = _ctx.Event()
+        self._running.set()
+        with self._lock:
+            self._spawn_capture()
+            self._spawn_recognizer()
+        Thread(target=self._receive, daemon=True, name="audio-worker-results").start()
+        Thread(target=self._supervise, daemon=True, name="audio-worker-supervisor").start()
+        atexit.register(self.stop)
+        print(f"🎧 Audio worker started (capture pid {self._capture.pid}, recognizer pid {self._recognizer.pid})")
+
+    def _receive(self):
+        while self._running.is_set():
+            try:
+                message = self._results.get(timeout=0.2)
+            except (queue.Empty, OSError, EOFError):
+                continue
+            kind = message[0]
+            if kind == "transcript":
+                _kind, mode, text, sent, span = message
+                if span and self._is_echo(*span):
+                    self.counters["echo_dropped"] += 1
+                    self._send("mode", self.mode)  # its own "omega" must not switch it to command mode
+                    continue
+                self._transcripts.put((text, sent))
+            elif kind == "speech_start":
+                if self.on_speech_start and not self._is_echo(message[1], message[1]):
+                    self.on_speech_start()
+            elif kind == "ready":
+                print(f"✅ Recognizer ready (pid {message[1]})")
+            elif kind == "error":
+                self.counters["errors"] += 1
+                print(f"⚠️ Recognizer error: {message[1]}")
+
+    def _is_echo(self, start, end):
+        return self.echo_filter is not None and self.echo_filter(start, end)
+
+    def _supervise(self):
+        while self._running.is_set():
+            time.sleep(SUPERVISE_INTERVAL)
+            with self._lock:
+                if not self._running.is_set():
+                    return
+                self._check("capture", self._capture, self._spawn_capture)
+                self._check("recognizer", self._recognizer, self._spawn_recognizer)
+
+    def _check(self, name, process, spawn):
+        """Schedule a restart for a dead process, and restart it once its delay has passed."""
+        if process.is_alive():
+            return
+        restart = self._restart[name]
+        now = time.monotonic()
+        if restart["at"] is None:
+            quick = now - restart["started"] < STABLE_SECONDS
+            restart["delay"] = min(restart["delay"] * 2, MAX_RESTART_DELAY) if quick else RESTART_DELAY
+            restart["at"] = now + restart["delay"]
+            print(f"♻️ {name.capitalize()} process exited ({process.exitcode}), "
+                  f"restarting in {restart['delay']:.1f}s")
+        elif now >= restart["at"]:
+            restart["at"] = None
+            self.counters[f"{name}_restarts"] += 1
+            spawn()
+
+    def _send(self, key, value):
+        try:
+            self._control.put((key, value))
+        except (OSError, ValueError):
+            pass  # recognizer is being restarted; it starts with the current value
+
+    def set_mode(self, mode):
+        """"wake" (wake gate only) or "command" (decode every utterance)."""
+        self.mode = mode
+        self._send("mode", mode)
+
+    def set_prompt(self, prompt):
+        self.prompt = prompt
+        self._send("prompt", prompt)
+
+    def skip_to_now(self):
+        """Drop audio captured so far and transcripts not yet read."""
+        self._send("skip", True)
+        while True:
+            try:
+                self._transcripts.get_nowait()
+            except queue.Empty:
+                break
+
+    def next_transcript(self, timeout=None, default=None):
+        """
+        Next transcript (lowercase), or None if the utterance had no words
+        (`default` if nothing arrived within `timeout`).
+        """
+        try:
+            text, sent = self._transcripts.get(timeout=timeout)
+        except queue.Empty:
+            return default
+        self.counters["transcripts"] += 1
+        self.latency += max(0.0, time.time() - sent)
+        return text
+
+    def stop(self):
+        if not self._running.is_set():
+            return
+        self._running.clear()
+        self._stop.set()
+        with self._lock:
+            for process in (self._capture, self._recognizer):
+                process.join(timeout=STOP_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(timeout=STOP_TIMEOUT)
+        self.ring.close()
+
+    def stats(self):
+        info = dict(self.counters)
+        info["mode"] = self.mode
+        info["pending"] = self._transcripts.qsize()
+        info["avg_delivery_ms"] = round(self.latency / info["transcripts"] * 1000, 1) if info["transcripts"] else 0.0
+        if self.ring is not None and self._running.is_set():
+            info["buffer"] = self.ring.stats()
+        return info
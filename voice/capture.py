@@ -0,0 +1,273 @@
+# voice/capture.py
+
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHANNELS = 1
+
+# Endpointing defaults
+FRAME_MS = 30                # VAD frame size
+START_SPEECH_MS = 90         # consecutive speech needed to open an utterance
+TRAILING_SILENCE_MS = 700    # silence that closes an utterance
+PRE_ROLL_MS = 300            # audio kept before speech onset (soft consonants)
+MAX_UTTERANCE_SECONDS = 10   # hard cap on a single command
+NO_SPEECH_TIMEOUT = 5        # give up if nobody speaks at all
+
+
+class EnergyVAD:
+    """
+    Frame-level voice-activity detector based on RMS energy
+    with an adaptive noise floor.
+    """
+
+    def __init__(self, min_rms=0.01, ratio=3.0, floor_decay=0.95):
+        self.min_rms = min_rms
+        self.ratio = ratio
+        self.floor_decay = floor_decay
+        self.noise_floor = min_rms / ratio
+        self.frames_total = 0
+        self.frames_speech = 0
+
+    def is_speech(self, frame):
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float32)))) if len(frame) else 0.0
+        threshold = max(self.min_rms, self.noise_floor * self.ratio)
+        speech = rms >= threshold
+        self.frames_total += 1
+        self.frames_speech += speech
+        if not speech:
+            # Only silent frames move the noise floor, so speech does not raise it
+            self.noise_floor = self.floor_decay * self.noise_floor + (1 - self.floor_decay) * rms
+        return speech
+
+
+class Endpointer:
+    """
+    Consumes fixed-size frames and decides where an utterance starts and ends.
+    Only the speech span (plus a short pre-roll) is kept.
+    """
+
+    def __init__(self, vad=None, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS,
+                 start_ms=START_SPEECH_MS, trailing_ms=TRAILING_SILENCE_MS,
+                 pre_roll_ms=PRE_ROLL_MS, max_seconds=MAX_UTTERANCE_SECONDS,
+                 no_speech_timeout=NO_SPEECH_TIMEOUT):
+        self.vad = vad or EnergyVAD()
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.trailing_frames = max(1, trailing_ms // frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.timeout_frames = int(no_speech_timeout * 1000 / frame_ms) if no_speech_timeout else None
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms) + self.start_frames)
+        self._speech = []
+        self._speech_run = 0
+        self._silence_run = 0
+        self.frames_seen = 0
+        self.started = False
+        self.done = False
+        self.reason = None
+        self.speech_start = None   # seconds into the stream
+        self.speech_end = None     # seconds into the stream (last speech frame)
+        self.span_frames = None    # (first, end) frame indices of the kept span
+
+    def reset(self):
+        """Forget the current utterance and start over with the same settings (and VAD)."""
+        self._pre_roll.clear()
+        self._speech = []
+        self._speech_run = 0
+        self._silence_run = 0
+        self.frames_seen = 0
+        self.started = False
+        self.done = False
+        self.reason = None
+        self.speech_start = None
+        self.speech_end = None
+        self.span_frames = None
+
+    def _seconds(self, frames):
+        return frames * self.frame_size / self.sample_rate
+
+    def feed(self, frame):
+        """Feed one frame. Returns True once the utterance is complete."""
+        if self.done:
+            return True
+        self.frames_seen += 1
+        speech = self.vad.is_speech(frame)
+
+        if not self.started:
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.start_frames:
+                self.started = True
+                self.speech_start = self._seconds(self.frames_seen - self._speech_run)
+                self.span_frames = (self.frames_seen - len(self._pre_roll), self.frames_seen)
+                self._speech.extend(self._pre_roll)
+                self._pre_roll.clear()
+            elif self.timeout_frames and self.frames_seen >= self.timeout_frames:
+                self.done, self.reason = True, "no_speech"
+            return self.done
+
+        self._speech.append(frame)
+        self.span_frames = (self.span_frames[0], self.frames_seen)
+        if speech:
+            self._silence_run = 0
+            self.speech_end = self._seconds(self.frames_seen)
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.trailing_frames:
+            self.done, self.reason = True, "silence"
+            # Drop most of the trailing silence, keep a little tail for the recognizer
+            keep_tail = min(self._silence_run, max(1, self.start_frames))
+            del self._speech[len(self._speech) - self._silence_run + keep_tail:]
+            self.span_frames = (self.span_frames[0], self.frames_seen - self._silence_run + keep_tail)
+        elif len(self._speech) >= self.max_frames:
+            self.done, self.reason = True, "max_length"
+        return self.done
+
+    def audio(self):
+        """Return the captured speech span as a flat float32 array (None if nothing was said)."""
+        if not self._speech:
+            return None
+        return np.concatenate(self._speech).astype(np.float32, copy=False)
+
+    def span(self):
+        """Return (start, end) sample offsets of the kept span relative to the first frame fed."""
+        if self.span_frames is None:
+            return None
+        first, end = self.span_frames
+        return first * self.frame_size, end * self.frame_size
+
+
+class WavInputStream:
+    """
+    Stand-in for sounddevice.InputStream backed by a WAV file.
+    With realtime=True reads are paced like a live microphone, so
+    end-of-speech latency can be measured without audio hardware.
+    """
+
+    def __init__(self, path, samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="float32",
+                 blocksize=None, realtime=False, pad_seconds=2.0, **_):
+        with wave.open(path, "rb") as wav:
+            if wav.getframerate() != samplerate:
+                raise ValueError(f"{path}: expected {samplerate} Hz, got {wav.getframerate()} Hz")
+            width = wav.getsampwidth()
+            raw = wav.readframes(wav.getnframes())
+            wav_channels = wav.getnchannels()
+        if width != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        if wav_channels > 1:
+            samples = samples.reshape(-1, wav_channels).mean(axis=1)
+        # Pad with silence so endpointing can close an utterance that runs to the end of the file
+        samples = np.concatenate([samples, np.zeros(int(pad_seconds * samplerate), dtype=np.float32)])
+        self.samples = samples
+        self.samplerate = samplerate
+        self.channels = channels
+        self.realtime = realtime
+        self.position = 0
+        self._started_at = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.close()
+
+    def start(self):
+        self._started_at = time.perf_counter()
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self, frames):
+        chunk = self.samples[self.position:self.position + frames]
+        if len(chunk) < frames:
+            chunk = np.concatenate([chunk, np.zeros(frames - len(chunk), dtype=np.float32)])
+        self.position += frames
+        if self.realtime and self._started_at is not None:
+            due = self._started_at + self.position / self.samplerate
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        return chunk.reshape(-1, 1), False
+
+
+def write_wav(path, samples, samplerate=SAMPLE_RATE):
+    """Save float32 samples as a mono 16-bit PCM WAV (the format WavInputStream reads)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(pcm.tobytes())
+
+
+def _default_stream_factory(**kwargs):
+    import sounddevice as sd
+    return sd.InputStream(**kwargs)
+
+
+def capture_utterance(stream_factory=None, endpointer=None, sample_rate=SAMPLE_RATE, stats=None):
+    """
+    Capture a single utterance from an input stream and stop on trailing silence.
+    Returns the speech span as float32 samples, or None if nothing was said.
+
+    `stream_factory` defaults to sounddevice.InputStream; pass e.g.
+    `lambda **kw: WavInputStream("cmd.wav", realtime=True, **kw)` to run without a microphone.
+    If a dict is given as `stats`, it is filled with endpointing timings.
+    """
+    stream_factory = stream_factory or _default_stream_factory
+    endpointer = endpointer or Endpointer(sample_rate=sample_rate)
+    frame_size = endpointer.frame_size
+
+    start = time.perf_counter()
+    speech_end_wall = None
+    with stream_factory(samplerate=sample_rate, channels=CHANNELS, dtype="float32",
+                        blocksize=frame_size) as stream:
+        while not endpointer.done:
+            data, _overflowed = stream.read(frame_size)
+            had_speech_end = endpointer.speech_end
+            endpointer.feed(data[:, 0] if data.ndim > 1 else data)
+            if endpointer.speech_end != had_speech_end:
+                speech_end_wall = time.perf_counter()
+    finished = time.perf_counter()
+
+    if stats is not None:
+        stats.update({
+            "reason": endpointer.reason,
+            "speech_start": endpointer.speech_start,
+            "speech_end": endpointer.speech_end,
+            "captured_seconds": round(endpointer._seconds(endpointer.frames_seen), 3),
+            "wall_time": round(finished - start, 3),
+            # Time from the last speech frame to the endpoint decision
+            "endpoint_latency": round(finished - speech_end_wall, 3) if speech_end_wall else None,
+        })
+    return endpointer.audio()
+
+
+# ✅ Simple CLI test harness: measure endpointing on a WAV file
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m voice.capture <16kHz-mono.wav>")
+        sys.exit(1)
+
+    info = {}
+    audio = capture_utterance(
+        stream_factory=lambda **kw: WavInputStream(sys.argv[1], realtime=True, **kw),
+        stats=info,
+    )
+    speech_len = len(audio) / SAMPLE_RATE if audio is not None else 0
+    print(f"Speech span: {speech_len:.2f}s")
+    for key, value in info.items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,134 @@
+# voice/model_registry.py
+
+import threading
+import time
+from threading import Thread
+
+# Default Whisper size used across core, voice and RPA
+DEFAULT_MODEL = "small"
+
+# CTranslate2 weight type for faster-whisper models ("int8" is the quantized CPU path)
+DEFAULT_COMPUTE_TYPE = "int8"
+
+# Process-wide cache: model name -> loaded model
+_models = {}
+_load_stats = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _resident_memory():
+    """Return resident memory of this process in bytes (None if unavailable)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def _lock_for(name):
+    with _registry_lock:
+        return _load_locks.setdefault(name, threading.Lock())
+
+
+def _load_whisper(name, compute_type):
+    import whisper  # heavy import, only paid when a model is actually needed
+    return whisper.load_model(name)
+
+
+def _load_faster_whisper(name, compute_type):
+    from faster_whisper import WhisperModel
+    return WhisperModel(name, device="cpu", compute_type=compute_type or DEFAULT_COMPUTE_TYPE)
+
+
+# Backend name -> loader(name, compute_type)
+LOADERS = {
+    "whisper": _load_whisper,
+    "faster-whisper": _load_faster_whisper,
+}
+
+
+def model_key(name=DEFAULT_MODEL, backend="whisper", compute_type=None):
+    """Registry key: plain Whisper models keep their size as key, others are "backend:size:type"."""
+    if backend == "whisper":
+        return name
+    return f"{backend}:{name}:{compute_type or DEFAULT_COMPUTE_TYPE}"
+
+
+def get_model(name=DEFAULT_MODEL, backend="whisper", compute_type=None):
+    """
+    Return the shared model for `name` (and backend/compute type), loading it on first use.
+    Concurrent callers wait on the same load instead of loading twice.
+    """
+    key = model_key(name, backend, compute_type)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock_for(key):
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        print(f"⏳ Loading Whisper '{key}' model...")
+        rss_before = _resident_memory()
+        start = time.perf_counter()
+        model = LOADERS[backend](name, compute_type)
+        load_time = time.perf_counter() - start
+        rss_after = _resident_memory()
+
+        _models[key] = model
+        _load_stats[key] = {
+            "load_time": round(load_time, 3),
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "rss_delta": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        }
+        print(f"✅ Whisper '{key}' loaded in {load_time:.2f}s")
+    return model
+
+
+def warm_up(name=DEFAULT_MODEL, background=True, backend="whisper", compute_type=None):
+    """
+    Load a model ahead of the first transcription.
+    With background=True the load runs on a daemon thread (e.g. while the greeting is spoken)
+    and the thread is returned.
+    """
+    key = model_key(name, backend, compute_type)
+    if key in _models:
+        return None
+    if not background:
+        get_model(name, backend, compute_type)
+        return None
+    thread = Thread(target=get_model, args=(name, backend, compute_type), daemon=True,
+                    name=f"whisper-warmup-{key}")
+    thread.start()
+    return thread
+
+
+def is_loaded(name=DEFAULT_MODEL, backend="whisper", compute_type=None):
+    """True if the model is already resident."""
+    return model_key(name, backend, compute_type) in _models
+
+
+def transcribe(audio, name=DEFAULT_MODEL, **options):
+    """Transcribe audio with the shared model. Defaults to CPU-safe English decoding."""
+    options.setdefault("fp16", False)
+    options.setdefault("language", "en")
+    return get_model(name).transcribe(audio, **options)
+
+
+def stats():
+    """Return load time and resident memory figures for every loaded model."""
+    return {name: dict(info) for name, info in _load_stats.items()}
+
+
+if __name__ == "__main__":
+    import sys
+
+    size = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL
+    get_model(size)
+    for model_name, info in stats().items():
+        delta = info["rss_delta"]
+        delta_mb = f"{delta / (1024 * 1024):.0f} MB" if delta is not None else "n/a"
+        print(f"{model_name}: load {info['load_time']}s, resident +{delta_mb}")
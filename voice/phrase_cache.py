@@ -0,0 +1,166 @@
+# voice/phrase_cache.py
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Rendered phrases live here, one WAV per (text, rate, volume, voice)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".phrase_cache")
+INDEX_FILE = "index.json"
+
+# Total size of cached audio; least-used phrases are evicted beyond it
+SIZE_BUDGET = 50 * 1024 * 1024
+
+# A phrase that is not pre-rendered is cached once it has been asked for this many times
+CACHE_AFTER_REPEATS = 2
+
+
+def phrase_key(text, settings):
+    """Cache key for text spoken with the given voice settings (rate, volume, voice)."""
+    payload = json.dumps([text, settings.get("rate"), settings.get("volume"), settings.get("voice")])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class PhraseCache:
+    """
+    Disk cache of synthesised phrases. Entries are WAV files plus an index with
+    hit counts, so eviction can drop the least-used ones and the report can show
+    how much synthesis time the hits saved. Hits only update the index in memory;
+    it is written on the next render/forget and by flush() (also run at exit).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, size_budget=SIZE_BUDGET, cache_after=CACHE_AFTER_REPEATS):
+        self.cache_dir = cache_dir
+        self.size_budget = size_budget
+        self.cache_after = cache_after
+        self._lock = threading.Lock()
+        self._seen = {}
+        self.stats = {"hits": 0, "misses": 0, "renders": 0, "evictions": 0, "time_saved": 0.0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._dirty = False
+        atexit.register(self.flush)
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        # Forget entries whose audio file has gone
+        return {key: entry for key, entry in index.items() if os.path.exists(self.path(key))}
+
+    def _save_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path())
+        self._dirty = False
+
+    def flush(self):
+        """Write hit counts recorded since the index was last saved."""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self._save_index()
+            except OSError as e:
+                print(f"⚠️ Could not save phrase cache index: {e}")
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def contains(self, text, settings):
+        key = phrase_key(text, settings)
+        return key in self._index and os.path.exists(self.path(key))
+
+    def get(self, text, settings):
+        """Path of the cached audio for text, or None (counts a hit or a miss)."""
+        key = phrase_key(text, settings)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or not os.path.exists(self.path(key)):
+                if self._index.pop(key, None) is not None:
+                    self._dirty = True
+                self.stats["misses"] += 1
+                self._seen[key] = self._seen.get(key, 0) + 1
+                return None
+            entry["hits"] += 1
+            entry["last_used"] = time.time()
+            self.stats["hits"] += 1
+            self.stats["time_saved"] += entry["render_time"]
+            self._dirty = True
+            return self.path(key)
+
+    def should_cache(self, text, settings):
+        """True once a phrase has been asked for often enough to be worth rendering."""
+        return self._seen.get(phrase_key(text, settings), 0) >= self.cache_after
+
+    def render(self, synthesize, text, settings):
+        """
+        Synthesise text into the cache with `synthesize(text, path)` and return the path.
+        Evicts least-used entries to stay within the size budget.
+        """
+        key = phrase_key(text, settings)
+        path = self.path(key)
+        tmp = path + ".tmp.wav"
+        start = time.perf_counter()
+        synthesize(text, tmp)
+        render_time = time.perf_counter() - start
+        os.replace(tmp, path)
+        with self._lock:
+            self._index[key] = {
+                "text": text,
+                "size": os.path.getsize(path),
+                "hits": 0,
+                "last_used": time.time(),
+                "render_time": round(render_time, 4),
+            }
+            self._seen.pop(key, None)
+            self.stats["renders"] += 1
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _evict(self, keep=None):
+        total = sum(entry["size"] for entry in self._index.values())
+        # Least hits first, oldest use breaking ties
+        for key in sorted(self._index, key=lambda k: (self._index[k]["hits"], self._index[k]["last_used"])):
+            if total <= self.size_budget:
+                break
+            if key == keep:
+                continue
+            total -= self._index.pop(key)["size"]
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def forget(self, text, settings):
+        """Drop a phrase (e.g. its audio could not be played)."""
+        key = phrase_key(text, settings)
+        with self._lock:
+            if self._index.pop(key, None) is not None:
+                self._save_index()
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def report(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "time_saved": round(self.stats["time_saved"], 3),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+            }
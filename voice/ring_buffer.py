@@ -0,0 +1,296 @@
+# voice/ring_buffer.py
+
+import threading
+import time
+from threading import Thread
+
+import numpy as np
+
+from voice import capture
+
+# How often a reader in another process checks the shared buffer for new audio
+POLL_INTERVAL = 0.005
+
+
+class AudioRingBuffer:
+    """
+    Preallocated single-writer ring buffer for float32 audio.
+
+    Every sample is written twice (at i and i + capacity), so any span of up to
+    `capacity` samples is contiguous in memory and can be handed out as a NumPy
+    view without copying. Positions are absolute sample counts since start.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._cond = threading.Condition()
+        self.written = 0        # absolute index of the next sample to write
+        self.read_pos = 0       # oldest sample the consumer still needs
+        self.overruns = 0       # writes that overwrote unread audio
+        self.overrun_samples = 0
+        self.underruns = 0      # reads that timed out waiting for audio not yet captured
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        total = len(samples)
+        if not total:
+            return
+        cap = self.capacity
+        # Only the last `capacity` samples of a longer write can be kept; the rest count as overrun
+        skipped = max(0, total - cap)
+        samples = samples[skipped:]
+        n = len(samples)
+        start = (self.written + skipped) % cap
+        first = min(n, cap - start)
+        rest = n - first
+        buf = self._buf
+        buf[start:start + first] = samples[:first]
+        buf[start + cap:start + cap + first] = samples[:first]
+        if rest:
+            buf[:rest] = samples[first:]
+            buf[cap:cap + rest] = samples[first:]
+
+        with self._cond:
+            self.written += total
+            lost = self.written - self.read_pos - cap
+            if lost > 0:
+                self.overruns += 1
+                self.overrun_samples += lost
+                self.read_pos = self.written - cap
+            self._cond.notify_all()
+
+    def is_valid(self, start):
+        """True while samples from `start` on have not been overwritten."""
+        return start >= self.written - self.capacity
+
+    def view(self, start, end):
+        """Zero-copy view of samples [start, end). Raises if the span was overwritten or is too long."""
+        if end - start > self.capacity:
+            raise ValueError("Requested span is longer than the ring buffer")
+        if not self.is_valid(start):
+            raise IndexError("Requested audio has already been overwritten")
+        if end > self.written:
+            raise IndexError("Requested audio has not been captured yet")
+        offset = start % self.capacity
+        return self._buf[offset:offset + (end - start)]
+
+    def wait_view(self, start, end, timeout=None):
+        """Like view(), but blocks until [start, end) has been captured. Returns None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written >= end, timeout):
+                self.underruns += 1
+                return None
+            if not self.is_valid(start):
+                self.overruns += 1
+                return None
+        return self.view(start, end)
+
+    def release(self, position):
+        """Tell the writer everything before `position` may be overwritten."""
+        with self._cond:
+            self.read_pos = max(self.read_pos, position)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "written": self.written,
+            "buffered": self.written - self.read_pos,
+            "overruns": self.overruns,
+            "overrun_samples": self.overrun_samples,
+            "underruns": self.underruns,
+        }
+
+
+def _header_field(index):
+    """Counter stored in the shared header, so every process sees the same value."""
+    return property(lambda self: int(self._header[index]),
+                    lambda self, value: self._header.__setitem__(index, value))
+
+
+class SharedAudioRingBuffer(AudioRingBuffer):
+    """
+    AudioRingBuffer in multiprocessing shared memory, so one process can capture
+    while another reads. The counters live in a header in the same block, and
+    readers in other processes poll for new audio instead of waiting on the
+    condition. create=True allocates the block; other processes attach by name.
+    """
+
+    _FIELDS = ("written", "read_pos", "overruns", "overrun_samples", "underruns")
+
+    def __init__(self, capacity, name=None, create=False):
+        from multiprocessing import shared_memory
+
+        self.capacity = int(capacity)
+        header_bytes = 8 * len(self._FIELDS)
+        size = header_bytes + 2 * self.capacity * 4
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+        self._header = np.ndarray((len(self._FIELDS),), dtype=np.int64, buffer=self.shm.buf)
+        self._buf = np.ndarray((2 * self.capacity,), dtype=np.float32, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self._header[:] = 0
+        self._cond = threading.Condition()
+
+    written = _header_field(0)
+    read_pos = _header_field(1)
+    overruns = _header_field(2)
+    overrun_samples = _header_field(3)
+    underruns = _header_field(4)
+
+    def wait_view(self, start, end, timeout=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.written < end:
+            if deadline is not None and time.monotonic() >= deadline:
+                self.underruns += 1
+                return None
+            time.sleep(POLL_INTERVAL)
+        if not self.is_valid(start):
+            self.overruns += 1
+            return None
+        return self.view(start, end)
+
+    def close(self):
+        """Detach (and free the block if this process created it)."""
+        self._header = self._buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # views handed out are still alive; the mapping goes with the process
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class BackgroundCapture:
+    """
+    Keeps the microphone open on a background thread and writes into an
+    AudioRingBuffer, so speech during decoding or TTS is not lost.
+    Utterances are returned as zero-copy views into the buffer.
+    """
+
+    def __init__(self, capacity_seconds=30, sample_rate=capture.SAMPLE_RATE,
+                 frame_ms=capture.FRAME_MS, stream_factory=None, on_speech_start=None, buffer=None,
+                 echo_filter=None):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        # An existing buffer (e.g. a SharedAudioRingBuffer filled by another process) can be read instead
+        self.buffer = buffer if buffer is not None else AudioRingBuffer(int(capacity_seconds * sample_rate))
+        self.stream_factory = stream_factory or capture._default_stream_factory
+        self.cursor = 0
+        # Called (from the reading thread) as soon as an utterance starts, e.g. to stop TTS (barge-in)
+        self.on_speech_start = on_speech_start
+        # Echo gate: echo_filter(start, end) with wall-clock times is True when the assistant was
+        # talking then; such speech does not fire on_speech_start and such utterances are skipped
+        self.echo_filter = echo_filter
+        self.echo_dropped = 0
+        self.last_span = None  # wall-clock (start, end) of the last utterance returned
+        self.last_reason = None  # why the last read ended: endpointer reason, "timeout" or "overrun"
+        self._thread = None
+        self._running = threading.Event()
+
+    def _run(self):
+        with self.stream_factory(samplerate=self.sample_rate, channels=capture.CHANNELS,
+                                 dtype="float32", blocksize=self.frame_size) as stream:
+            while self._running.is_set():
+                data, _overflowed = stream.read(self.frame_size)
+                self.buffer.write(data[:, 0] if data.ndim > 1 else data)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running.set()
+        self._thread = Thread(target=self._run, daemon=True, name="mic-capture")
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def skip_to_now(self):
+        """Drop everything captured so far (e.g. the assistant's own voice)."""
+        self.cursor = self.buffer.written
+        self.buffer.release(self.cursor)
+
+    def _wall_time(self, position):
+        # The mic writes in real time, so a sample's age is how far behind the writer it is
+        return time.time() - (self.buffer.written - position) / self.sample_rate
+
+    def _is_echo(self, start, end):
+        return self.echo_filter is not None and self.echo_filter(self._wall_time(start), self._wall_time(end))
+
+    def next_utterance(self, endpointer=None, timeout=None):
+        """
+        Return the next utterance as a view into the ring buffer, or None if nothing was said
+        (within `timeout` seconds, if given) or the audio was overwritten before it could be read.
+        Utterances the echo filter rejects are skipped and listening goes on.
+        The view stays valid until the writer laps it; transcribe it before reading further.
+        """
+        endpointer = endpointer or capture.Endpointer(sample_rate=self.sample_rate)
+        if endpointer.frame_size != self.frame_size:
+            raise ValueError("Endpointer frame size must match the capture frame size")
+
+        base = max(self.cursor, self.buffer.written - self.buffer.capacity)
+        position = base
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            while not endpointer.done:
+                # The timeout only bounds the wait for speech; an utterance under way is read to its end
+                remaining = deadline - time.monotonic() if deadline and not endpointer.started else None
+                if remaining is not None and remaining <= 0:
+                    break
+                frame = self.buffer.wait_view(position, position + self.frame_size, remaining)
+                if frame is None:
+                    if not self.buffer.is_valid(position):
+                        # Fell behind the writer: resync to the oldest sample still held
+                        position = base = self.buffer.written - self.buffer.capacity
+                        endpointer.reset()
+                        continue
+                    break
+                was_started = endpointer.started
+                endpointer.feed(frame)
+                position += self.frame_size
+                if endpointer.started and not was_started and self.on_speech_start \
+                        and not self._is_echo(position, position):
+                    self.on_speech_start()
+                if not endpointer.started:
+                    # Nothing before the pre-roll window is needed any more
+                    self.buffer.release(position - self.frame_size * (endpointer._pre_roll.maxlen or 1))
+
+            self.last_reason = endpointer.reason if endpointer.done else "timeout"
+            if not endpointer.done:
+                # Timed out: resume at the pre-roll, which may hold the start of the next utterance
+                position = max(base, position - self.frame_size * len(endpointer._pre_roll))
+            self.cursor = position
+            span = endpointer.span() if endpointer.done and endpointer.reason != "no_speech" else None
+            if not span:
+                self.buffer.release(position)
+                return None
+            start, end = base + span[0], base + span[1]
+            if not self.buffer.is_valid(start):
+                self.last_reason = "overrun"
+                return None
+            if self._is_echo(start, end):
+                # The assistant's own voice: drop it and listen for the next utterance
+                self.echo_dropped += 1
+                self.buffer.release(position)
+                base = position
+                endpointer.reset()
+                continue
+            self.buffer.release(start)
+            self.last_span = (self._wall_time(start), self._wall_time(end))
+            return self.buffer.view(start, end)
+
+    def stats(self):
+        info = self.buffer.stats()
+        if self.echo_filter is not None:
+            info["echo_dropped"] = self.echo_dropped
+        return info
@@ -1,12 +1,310 @@
-import pyttsx3
+# voice/speaker.py
+
+import threading
+import time
+import wave
+from collections import deque
+
+from voice.phrase_cache import PhraseCache
+
+# pyttsx3 voice settings
+RATE = 175     # speed of speech
+VOLUME = 0     # volume (0.0 to 1.0)
+
+# At most this many messages wait behind the one being spoken; older ones are dropped as stale
+MAX_PENDING = 2
+
+# Play repeated phrases from pre-rendered audio instead of synthesising them again
+USE_PHRASE_CACHE = True
+
+# Echo gate: mic audio within this many seconds after the assistant stops talking still counts
+# as its own voice (room reverb, output latency)
+ECHO_TAIL = 0.3
+
+
+class Pyttsx3Engine:
+    """
+    pyttsx3 wrapper. Created on the speech thread, which is the only thread that may drive it.
+    With a PhraseCache, cached phrases are played from their WAV instead of being synthesised.
+    """
+
+    def __init__(self, rate=RATE, volume=VOLUME, cache=None):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self.engine.setProperty("rate", rate)
+        self.engine.setProperty("volume", volume)
+        self.cache = cache
+        self.settings = {"rate": rate, "volume": volume, "voice": self.engine.getProperty("voice")}
+        self._interrupt = threading.Event()
+        # pyttsx3 can only be stopped from inside its own loop, so check on every word
+        self.engine.connect("started-word", self._on_word)
+
+    def _on_word(self, *_):
+        if self._interrupt.is_set():
+            self.engine.stop()
+
+    def _synthesize(self, text, path):
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+    def _play(self, path):
+        import numpy as np
+        import sounddevice as sd
+
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("cached phrase is not 16-bit PCM")
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            data = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").reshape(-1, channels)
+        sd.play(data, rate)
+        deadline = time.monotonic() + len(data) / rate + 0.5
+        while time.monotonic() < deadline and sd.get_stream().active:
+            if self._interrupt.wait(0.02):
+                break
+        sd.stop()
+
+    def prerender(self, text):
+        """Synthesise a phrase into the cache ahead of its first use."""
+        if self.cache is not None and not self.cache.contains(text, self.settings):
+            self.cache.render(self._synthesize, text, self.settings)
+
+    def say(self, text):
+        self._interrupt.clear()
+        if self.cache is not None:
+            path = self.cache.get(text, self.settings)
+            if path is None and self.cache.should_cache(text, self.settings):
+                path = self.cache.render(self._synthesize, text, self.settings)
+            if path:
+                try:
+                    self._play(path)
+                    return
+                except Exception as e:
+                    print(f"⚠️ Cached phrase unplayable, synthesising: {e}")
+                    self.cache.forget(text, self.settings)
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def stop(self):
+        self._interrupt.set()
+
+
+class FakeEngine:
+    """Silent engine for tests/benchmarks: 'speaks' for a time proportional to the text, records what was said."""
+
+    def __init__(self, seconds_per_char=0.0):
+        self.seconds_per_char = seconds_per_char
+        self.spoken = []
+        self.interrupted = []
+        self._interrupt = threading.Event()
+
+    def say(self, text):
+        self._interrupt.clear()
+        if self._interrupt.wait(len(text) * self.seconds_per_char):
+            self.interrupted.append(text)
+        else:
+            self.spoken.append(text)
+
+    def stop(self):
+        self._interrupt.set()
+
+
+class Speaker:
+    """
+    Asynchronous speech queue: speak() returns immediately and a worker thread
+    talks. Repeated messages are collapsed, stale ones dropped, and interrupt()
+    cuts the current sentence and the queue (barge-in).
+    """
+
+    def __init__(self, engine_factory=None, max_pending=MAX_PENDING):
+        self.engine_factory = engine_factory or _default_engine
+        self.max_pending = max_pending
+        self.engine = None
+        self._pending = deque()  # (text, queued_at)
+        self._prerender = deque()  # phrases to render into the cache while idle
+        self._cond = threading.Condition()
+        self._current = None
+        self._thread = None
+        self._talk_started = None  # wall time the current message started playing
+        self._talks = deque(maxlen=8)  # (start, end) wall times of recent messages, for the echo gate
+        self.metrics = {"queued": 0, "spoken": 0, "collapsed": 0, "dropped": 0, "interrupted": 0,
+                        "max_depth": 0, "wait_time": 0.0, "max_wait": 0.0, "speak_time": 0.0}
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="tts")
+            self._thread.start()
+
+    def speak(self, text):
+        """Queue text and return at once."""
+        with self._cond:
+            self._ensure_thread()
+            if text == self._current or any(text == queued for queued, _ in self._pending):
+                self.metrics["collapsed"] += 1
+                return
+            self._pending.append((text, time.perf_counter()))
+            self.metrics["queued"] += 1
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self.metrics["dropped"] += 1
+            self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self._pending))
+            self._cond.notify()
+
+    def interrupt(self):
+        """Barge-in: drop queued messages and stop the sentence being spoken."""
+        with self._cond:
+            self.metrics["dropped"] += len(self._pending)
+            self._pending.clear()
+            speaking = self._current is not None
+        if speaking:
+            self.metrics["interrupted"] += 1
+            if self.engine:
+                self.engine.stop()
+        return speaking
+
+    def prerender(self, phrases):
+        """Render phrases into the engine's phrase cache whenever nothing is waiting to be said."""
+        with self._cond:
+            self._ensure_thread()
+            self._prerender.extend(phrases)
+            self._cond.notify()
+
+    @property
+    def speaking(self):
+        return self._current is not None
+
+    def overlaps(self, start, end, tail=ECHO_TAIL):
+        """
+        True if the wall-clock interval [start, end] (time.time()) overlaps the assistant
+        talking, plus `tail` seconds after each message: mic audio there is likely its own voice.
+        """
+        with self._cond:
+            talks = list(self._talks)
+            if self._talk_started is not None:
+                talks.append((self._talk_started, time.time()))
+        return any(start <= talk_end + tail and end >= talk_start for talk_start, talk_end in talks)
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken. Returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._pending or self._current is not None:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        try:
+            self.engine = self.engine_factory()
+        except Exception as e:
+            print(f"⚠️ TTS engine unavailable: {e}")
+        while True:
+            with self._cond:
+                while not self._pending and not self._prerender:
+                    self._cond.wait()
+                if not self._pending:
+                    phrase = self._prerender.popleft()
+                else:
+                    phrase = None
+                    text, queued_at = self._pending.popleft()
+                    self._current = text
+                    self._talk_started = time.time()
+            if phrase is not None:
+                try:
+                    if hasattr(self.engine, "prerender"):
+                        self.engine.prerender(phrase)
+                except Exception as e:
+                    print(f"⚠️ Could not pre-render '{phrase}': {e}")
+                continue
+            waited = time.perf_counter() - queued_at
+            start = time.perf_counter()
+            try:
+                if self.engine:
+                    self.engine.say(text)
+            except Exception as e:
+                print(f"⚠️ TTS failed: {e}")
+            with self._cond:
+                self._talks.append((self._talk_started, time.time()))
+                self._current = None
+                self._talk_started = None
+                self.metrics["spoken"] += 1
+                self.metrics["wait_time"] += waited
+                self.metrics["max_wait"] = max(self.metrics["max_wait"], waited)
+                self.metrics["speak_time"] += time.perf_counter() - start
+                self._cond.notify_all()
+
+    def flush(self):
+        """Persist the phrase cache's hit counts (call before a hard exit)."""
+        cache = getattr(self.engine, "cache", None)
+        if cache is not None:
+            cache.flush()
+
+    def report(self):
+        m = dict(self.metrics)
+        m["depth"] = self.depth()
+        m["avg_wait_ms"] = round(m["wait_time"] / m["spoken"] * 1000, 1) if m["spoken"] else 0.0
+        cache = getattr(self.engine, "cache", None)
+        if cache is not None:
+            m["phrase_cache"] = cache.report()
+        return m
+
+
+def _default_engine():
+    return Pyttsx3Engine(cache=PhraseCache() if USE_PHRASE_CACHE else None)
+
+
+# Process-wide speaker used by speak()
+_speaker = None
+_speaker_lock = threading.Lock()
+
+
+def get_speaker():
+    global _speaker
+    with _speaker_lock:
+        if _speaker is None:
+            _speaker = Speaker()
+        return _speaker
+
+
+def set_engine(engine_factory):
+    """Replace the shared speaker with one using `engine_factory` (e.g. FakeEngine in tests)."""
+    global _speaker
+    with _speaker_lock:
+        _speaker = Speaker(engine_factory)
+        return _speaker
 
-# Initialize TTS engine
-engine = pyttsx3.init()
-engine.setProperty("rate", 175)   # speed of speech
-engine.setProperty("volume", 0)   # volume (0.0 to 1.0)
 
 def speak(text: str):
-    """Speak text aloud"""
+    """Speak text aloud (queued; returns immediately)"""
     print(f"🗣️ Omega says: {text}")
-    engine.say(text)
-    engine.runAndWait()
\ No newline at end of file
+    get_speaker().speak(text)
+
+
+def prerender(phrases):
+    """Render fixed responses to audio in the background so their first use is a cache hit."""
+    get_speaker().prerender(phrases)
+
+
+def interrupt():
+    """Stop talking now (e.g. the user started speaking)."""
+    return get_speaker().interrupt()
+
+
+def overlaps_speech(start, end):
+    """Echo gate check: did the assistant talk during [start, end] (wall-clock seconds)?"""
+    return get_speaker().overlaps(start, end)
+
+
+def wait(timeout=None):
+    """Wait until everything queued has been said."""
+    return get_speaker().wait(timeout)
+
+
+def flush():
+    """Save speech state that is written lazily (phrase cache hit counts)."""
+    get_speaker().flush()
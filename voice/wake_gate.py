@@ -0,0 +1,169 @@
+# voice/wake_gate.py
+
+import difflib
+import string
+import time
+
+from voice import asr_engine
+from voice import capture
+
+# Small model used only to spot the wake phrase (on the configured engine's backend);
+# the full model runs after it passes
+KWS_MODEL = "tiny"
+
+# Wake phrases are short: anything outside this span is not worth decoding
+MIN_WAKE_SECONDS = 0.25
+MAX_WAKE_SECONDS = 3.0
+
+# Similarity (0-100) a heard word span needs against a keyword
+KWS_THRESHOLD = 75
+
+
+def _normalize(text):
+    return text.lower().translate(str.maketrans("", "", string.punctuation)).split()
+
+
+def keyword_score(text, keyword):
+    """Best fuzzy score (0-100) of `keyword` against any same-length word span in `text`."""
+    words = _normalize(text)
+    target = _normalize(keyword)
+    if not words or not target:
+        return 0
+    joined_target = " ".join(target)
+    best = 0.0
+    span = len(target)
+    for i in range(max(1, len(words) - span + 1)):
+        window = " ".join(words[i:i + span])
+        if window == joined_target:
+            return 100
+        best = max(best, difflib.SequenceMatcher(None, window, joined_target).ratio())
+    return int(best * 100)
+
+
+class WakeGate:
+    """
+    Three-stage gate in front of the full ASR engine:
+      1. energy VAD drops silent frames before anything is decoded,
+      2. utterances too short/long for a wake phrase are dropped,
+      3. a tiny model on the full engine's backend, prompted with the keywords, spots the wake phrase.
+    Only audio that passes all three reaches the full engine.
+    """
+
+    def __init__(self, keywords, kws_model=KWS_MODEL, full_engine=None,
+                 threshold=KWS_THRESHOLD, min_seconds=MIN_WAKE_SECONDS, max_seconds=MAX_WAKE_SECONDS,
+                 stream_factory=None, sample_rate=capture.SAMPLE_RATE, source=None):
+        self.keywords = list(keywords)
+        self.kws_model = kws_model
+        self.kws_engine = None  # built on first use, see _kws()
+        # None: the process-wide engine from voice.asr_engine
+        self.full_engine = full_engine
+        self.threshold = threshold
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.stream_factory = stream_factory
+        self.sample_rate = sample_rate
+        # Optional always-on capture (voice.ring_buffer.BackgroundCapture) to read utterances from
+        self.source = source
+        # One VAD for the lifetime of the gate so the noise floor keeps adapting
+        self.vad = capture.EnergyVAD()
+        self.counters = {
+            "frames_total": 0,
+            "frames_rejected_energy": 0,
+            "frames_rejected_length": 0,
+            "frames_rejected_kws": 0,
+            "frames_passed": 0,
+            "kws_runs": 0,
+            "full_asr_runs": 0,
+        }
+        self.kws_time = 0.0
+        self.full_asr_time = 0.0
+
+    def _frames(self, audio, frame_size):
+        return -(-len(audio) // frame_size)
+
+    def _kws(self):
+        """Keyword-spotting engine: KWS_MODEL on the same backend as the full engine."""
+        if self.kws_engine is None:
+            backend = (self.full_engine or asr_engine.get_engine()).backend
+            self.kws_engine = asr_engine.create_engine(f"{backend}:{self.kws_model}")
+        return self.kws_engine
+
+    def spot(self, audio):
+        """Run the keyword-spotting stage. Returns (matched keyword or None, heard text)."""
+        self.counters["kws_runs"] += 1
+        start = time.perf_counter()
+        try:
+            result = self._kws().transcribe(
+                audio,
+                initial_prompt=", ".join(self.keywords),
+                temperature=0.0,
+                condition_on_previous_text=False,
+                without_timestamps=True,
+            )
+        finally:
+            self.kws_time += time.perf_counter() - start
+        heard = result.get("text", "")
+        for keyword in self.keywords:
+            if keyword_score(heard, keyword) >= self.threshold:
+                return keyword, heard
+        return None, heard
+
+    def listen(self, timeout=None):
+        """
+        Capture one utterance and pass it through the gate.
+        Returns the full-model transcript (lowercase) if the wake phrase was spotted, else None
+        (also when nobody started speaking within `timeout` seconds; needs a `source`).
+        """
+        endpointer = capture.Endpointer(vad=self.vad, sample_rate=self.sample_rate,
+                                        max_seconds=self.max_seconds + 1)
+        frames_before = self.vad.frames_total
+        speech_before = self.vad.frames_speech
+        if self.source is not None:
+            audio = self.source.next_utterance(endpointer, timeout)
+        else:
+            audio = capture.capture_utterance(self.stream_factory, endpointer, self.sample_rate)
+
+        seen = self.vad.frames_total - frames_before
+        speech = self.vad.frames_speech - speech_before
+        self.counters["frames_total"] += seen
+        self.counters["frames_rejected_energy"] += seen - speech
+        if audio is None:
+            return None
+
+        span_frames = self._frames(audio, endpointer.frame_size)
+        seconds = len(audio) / self.sample_rate
+        # Stage 1 already counted the silent frames; later stages account for the speech ones
+        if seconds < self.min_seconds or seconds > self.max_seconds:
+            self.counters["frames_rejected_length"] += speech
+            return None
+
+        try:
+            keyword, heard = self.spot(audio)
+        except Exception as e:
+            print(f"⚠️ Wake phrase spotting failed: {e}")
+            return None
+        if not keyword:
+            self.counters["frames_rejected_kws"] += speech
+            return None
+
+        print(f"✨ Wake gate passed ('{keyword}', heard '{heard.strip()}', {span_frames} frames)")
+        self.counters["frames_passed"] += speech
+        self.counters["full_asr_runs"] += 1
+        start = time.perf_counter()
+        try:
+            engine = self.full_engine or asr_engine.get_engine()
+            result = engine.transcribe(audio, language="en")
+        except Exception as e:
+            print(f"⚠️ Whisper transcription failed: {e}")
+            return None
+        finally:
+            self.full_asr_time += time.perf_counter() - start
+        text = result.get("text", "").strip()
+        return text.lower() if text else None
+
+    def stats(self):
+        """Counters per stage plus time spent in each model."""
+        info = dict(self.counters)
+        info["kws_time"] = round(self.kws_time, 3)
+        info["full_asr_time"] = round(self.full_asr_time, 3)
+        return info
@@ -5,6 +5,9 @@ import os
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "search_engines.json")
 
+# Parsed config, reloaded only when the file changes
+_cache = {"mtime": None, "engines": {}}
+
 def load_engines():
     """Load search engines from JSON config"""
     if not os.path.exists(CONFIG_FILE):
@@ -18,8 +21,12 @@ def load_engines():
             json.dump(default, f, indent=4)
         return default
 
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    mtime = os.path.getmtime(CONFIG_FILE)
+    if _cache["mtime"] != mtime:
+        with open(CONFIG_FILE, "r") as f:
+            _cache["engines"] = json.load(f)
+        _cache["mtime"] = mtime
+    return _cache["engines"]
 
 def search_web(query, engine="google"):
     """Perform a web search using the chosen engine"""
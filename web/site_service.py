@@ -4,6 +4,9 @@ import os
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "sites.json")
 
+# Parsed config, reloaded only when the file changes
+_cache = {"mtime": None, "sites": {}}
+
 def load_sites():
     """Load site mappings from JSON config"""
     if not os.path.exists(CONFIG_FILE):
@@ -20,8 +23,12 @@ def load_sites():
             json.dump(default, f, indent=4)
         return default
 
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    mtime = os.path.getmtime(CONFIG_FILE)
+    if _cache["mtime"] != mtime:
+        with open(CONFIG_FILE, "r") as f:
+            _cache["sites"] = json.load(f)
+        _cache["mtime"] = mtime
+    return _cache["sites"]
 
 def open_site(site_name):
     """Open a known website from config"""